@@ -49,7 +49,7 @@ CONFIG = {
     # 报告配置
     "report": {
         "template_dir": PROJECT_ROOT / "templates",
-        "output_format": "json",  # json, html, txt
+        "output_format": "json",  # json, jsonl, html, txt
         "include_details": True,
         "timestamp_format": "%Y-%m-%d %H:%M:%S",
     }
@@ -62,6 +62,7 @@ def load_env_overrides():
         "EVAL_TIMEOUT": ("evaluation", "response_timeout"),
         "EVAL_RETRIES": ("evaluation", "max_retries"),
         "LOG_LEVEL": ("logging", "level"),
+        "REPORT_OUTPUT_FORMAT": ("report", "output_format"),
     }
     
     for env_key, (section, key) in env_mappings.items():
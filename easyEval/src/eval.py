@@ -10,15 +10,19 @@ import time
 import subprocess
 import logging
 import os
+import itertools
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from tqdm import tqdm
 
 # 导入配置
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 from config.config import CONFIG
+from src.journal import ResultJournal
+from src.suite_loader import iter_suite
+from src.online_stats import QuantileSketch, RunningStats
 
 class EasyEvalCore:
     """easyEval 核心评估类"""
@@ -44,19 +48,28 @@ class EasyEvalCore:
         self.logger = logging.getLogger(__name__)
         
     def load_test_cases(self) -> List[Dict]:
-        """加载测试用例"""
+        """加载全部测试用例"""
+        return list(self.iter_test_cases())
+        
+    def iter_test_cases(self) -> Iterator[Dict]:
+        """流式加载测试用例
+        
+        支持JSON列表、包含test_cases字段的JSON对象和JSONL测试集，
+        用例在迭代时逐个解析，不会把整个测试集读入内存。
+        """
         test_file = self.config["test_cases_file"]
+        count = 0
         try:
-            with open(test_file, 'r', encoding='utf-8') as f:
-                test_cases = json.load(f)
-            self.logger.info(f"加载了 {len(test_cases)} 个测试用例")
-            return test_cases
+            for test_case in iter_suite(test_file):
+                count += 1
+                yield test_case
         except FileNotFoundError:
             self.logger.error(f"测试用例文件不存在: {test_file}")
-            return []
-        except json.JSONDecodeError as e:
+            return
+        except ValueError as e:
             self.logger.error(f"测试用例文件格式错误: {e}")
-            return []
+            return
+        self.logger.info(f"加载了 {count} 个测试用例")
             
     def run_single_test(self, test_case: Dict) -> Dict:
         """执行单个测试用例（带重试机制）"""
@@ -208,28 +221,74 @@ class EasyEvalCore:
                 
         return found_keywords
         
-    def run_evaluation(self) -> Dict:
-        """运行完整评估"""
+    def run_evaluation(self, resume_journal: Optional[str] = None) -> Dict:
+        """运行完整评估
+        
+        Args:
+            resume_journal: 中断评估的结果日志路径，提供时跳过日志中已完成的用例
+        """
         self.start_time = time.time()
         self.logger.info("开始运行评估")
         
-        # 加载测试用例
-        test_cases = self.load_test_cases()
-        if not test_cases:
+        # 流式加载测试用例，用例在执行过程中按需读取
+        test_cases = self.iter_test_cases()
+        first_case = next(test_cases, None)
+        if first_case is None:
             return {"error": "没有可用的测试用例"}
-            
-        print(f"\n🚀 开始执行 {len(test_cases)} 个测试用例...")
+        test_cases = itertools.chain([first_case], test_cases)
         
-        # 执行所有测试（带进度条）
+        # 每个完成的用例立即写入结果日志，中断后可用 --resume 继续
+        # jsonl 输出格式下结果日志即为结果文件，统计信息增量累加，不在内存中保留结果列表
+        streaming = self.config["report"]["output_format"] == "jsonl"
         results = []
-        failed_cases = []
+        if resume_journal:
+            _, results = ResultJournal.load(resume_journal)
+            done_ids = {r["test_id"] for r in results}
+            test_cases = (tc for tc in test_cases if tc.get("id", "unknown") not in done_ids)
+            journal = ResultJournal(resume_journal)
+            print(f"\n♻️  从日志恢复 {len(results)} 个已完成的用例")
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            journal = ResultJournal(
+                self.config["results_dir"] / f"eval_journal_{timestamp}.jsonl",
+                header={"test_cases_file": str(self.config["test_cases_file"])}
+            )
+        self.logger.info(f"结果日志: {journal.path}")
+            
+        print("\n🚀 开始执行测试用例（边读取边执行）...")
         
-        with tqdm(total=len(test_cases), desc="执行测试", unit="个") as pbar:
+        # 执行所有测试（带进度条）
+        failed_cases = [
+            {
+                "id": r["test_id"],
+                "reason": r.get("error") or "响应不符合预期",
+                "details": r.get("details", {})
+            }
+            for r in results if not r["success"]
+        ]
+        
+        acc = self._new_statistics()
+        for r in results:
+            self._update_statistics(acc, r)
+        resumed_count = len(results)
+        if streaming:
+            results = []
+        
+        # 流式读取时总数未知，进度条只显示已完成数量
+        with tqdm(initial=resumed_count, desc="执行测试", unit="个") as pbar:
             for i, test_case in enumerate(test_cases):
-                pbar.set_description(f"执行测试 [{i+1}/{len(test_cases)}]: {test_case.get('id', 'unknown')}")
+                pbar.set_description(f"执行测试 [{i+1}]: {test_case.get('id', 'unknown')}")
                 
-                result = self.run_single_test(test_case)
-                results.append(result)
+                try:
+                    result = self.run_single_test(test_case)
+                except KeyboardInterrupt:
+                    journal.close()
+                    print(f"\n⚠️  评估被中断，可使用 --resume {journal.path} 继续")
+                    raise
+                journal.append(result)
+                self._update_statistics(acc, result)
+                if not streaming:
+                    results.append(result)
                 
                 if not result["success"]:
                     failed_cases.append({
@@ -239,11 +298,10 @@ class EasyEvalCore:
                     })
                 
                 # 更新进度条状态
-                success_count = sum(1 for r in results if r["success"])
                 pbar.set_postfix({
-                    "成功": success_count,
-                    "失败": len(results) - success_count,
-                    "完成率": f"{success_count/len(results)*100:.1f}%" if results else "0%"
+                    "成功": acc["successful"],
+                    "失败": acc["total"] - acc["successful"],
+                    "完成率": f"{acc['successful']/acc['total']*100:.1f}%" if acc["total"] else "0%"
                 })
                 
                 pbar.update(1)
@@ -251,19 +309,24 @@ class EasyEvalCore:
                 # 短暂延迟，避免过快执行
                 time.sleep(0.1)
         
+        journal.close()
+        
         # 计算统计信息
-        stats = self._calculate_statistics(results)
+        stats = self._finalize_statistics(acc)
         total_time = time.time() - self.start_time
         
         # 生成报告
         report = {
             "timestamp": datetime.now().isoformat(),
-            "total_tests": len(results),
+            "total_tests": stats["total_tests"],
             "total_execution_time": total_time,
             "statistics": stats,
-            "failed_cases": failed_cases,
-            "results": results
+            "failed_cases": failed_cases
         }
+        if streaming:
+            report["results_file"] = str(journal.path)
+        else:
+            report["results"] = results
         
         # 保存结果
         self._save_results(report)
@@ -281,74 +344,83 @@ class EasyEvalCore:
         
     def _calculate_statistics(self, results: List[Dict]) -> Dict:
         """计算详细统计信息"""
-        total = len(results)
-        successful = sum(1 for r in results if r["success"])
-        failed = total - successful
-        
-        avg_time = sum(r["execution_time"] for r in results) / total if total > 0 else 0
-        total_retries = sum(r.get("retry_count", 0) for r in results)
-        
-        # 按分类统计
-        category_stats = {}
+        acc = self._new_statistics()
         for result in results:
-            category = result.get("category", "unknown")
-            if category not in category_stats:
-                category_stats[category] = {"total": 0, "successful": 0, "failed": 0}
-            
-            category_stats[category]["total"] += 1
-            if result["success"]:
-                category_stats[category]["successful"] += 1
-            else:
-                category_stats[category]["failed"] += 1
+            self._update_statistics(acc, result)
+        return self._finalize_statistics(acc)
         
-        # 计算每个分类的成功率
-        for category in category_stats:
-            stats = category_stats[category]
-            stats["success_rate"] = stats["successful"] / stats["total"] if stats["total"] > 0 else 0
+    def _new_statistics(self) -> Dict:
+        """创建增量统计的累加器（执行时间的均值/极值和分位数在线维护，与用例数量无关）"""
+        return {
+            "total": 0,
+            "successful": 0,
+            "execution_time": RunningStats(),
+            "execution_time_sketch": QuantileSketch(),
+            "total_retries": 0,
+            "category_stats": {},
+            "priority_stats": {}
+        }
         
-        # 按优先级统计
-        priority_stats = {}
-        for result in results:
-            priority = result.get("priority", "medium")
-            if priority not in priority_stats:
-                priority_stats[priority] = {"total": 0, "successful": 0, "failed": 0}
-            
-            priority_stats[priority]["total"] += 1
+    def _update_statistics(self, acc: Dict, result: Dict):
+        """把一个测试结果累加到统计中"""
+        acc["total"] += 1
+        if result["success"]:
+            acc["successful"] += 1
+        acc["total_retries"] += result.get("retry_count", 0)
+        
+        # 响应时间统计（没有执行的用例耗时为0，不计入）
+        if result["execution_time"] > 0:
+            acc["execution_time"].add(result["execution_time"])
+            acc["execution_time_sketch"].add(result["execution_time"])
+        
+        # 按分类和优先级统计
+        for key, group in (("category_stats", result.get("category", "unknown")),
+                           ("priority_stats", result.get("priority", "medium"))):
+            stats = acc[key].setdefault(group, {"total": 0, "successful": 0, "failed": 0})
+            stats["total"] += 1
             if result["success"]:
-                priority_stats[priority]["successful"] += 1
+                stats["successful"] += 1
             else:
-                priority_stats[priority]["failed"] += 1
-        
-        # 计算每个优先级的成功率
-        for priority in priority_stats:
-            stats = priority_stats[priority]
-            stats["success_rate"] = stats["successful"] / stats["total"] if stats["total"] > 0 else 0
-        
-        # 响应时间统计
-        execution_times = [r["execution_time"] for r in results if r["execution_time"] > 0]
-        min_time = min(execution_times) if execution_times else 0
-        max_time = max(execution_times) if execution_times else 0
+                stats["failed"] += 1
+        
+    def _finalize_statistics(self, acc: Dict) -> Dict:
+        """由累加器生成统计信息"""
+        total = acc["total"]
+        successful = acc["successful"]
+        execution_time = acc["execution_time"]
+        
+        # 计算每个分类/优先级的成功率
+        breakdowns = {}
+        for key in ("category_stats", "priority_stats"):
+            breakdowns[key] = {
+                group: {**stats, "success_rate": stats["successful"] / stats["total"] if stats["total"] > 0 else 0}
+                for group, stats in acc[key].items()
+            }
         
         return {
             "total_tests": total,
             "successful_tests": successful,
-            "failed_tests": failed,
+            "failed_tests": total - successful,
             "success_rate": successful / total if total > 0 else 0,
-            "average_execution_time": avg_time,
-            "min_execution_time": min_time,
-            "max_execution_time": max_time,
-            "total_retries": total_retries,
+            "average_execution_time": execution_time.total / total if total > 0 else 0,
+            "min_execution_time": execution_time.min or 0,
+            "max_execution_time": execution_time.max or 0,
+            "execution_time_percentiles": acc["execution_time_sketch"].quantiles(digits=3),
+            "total_retries": acc["total_retries"],
             "threshold_met": (successful / total) >= self.config["evaluation"]["success_threshold"] if total > 0 else False,
-            "category_breakdown": category_stats,
-            "priority_breakdown": priority_stats
+            "category_breakdown": breakdowns["category_stats"],
+            "priority_breakdown": breakdowns["priority_stats"]
         }
         
     def _save_results(self, report: Dict):
         """保存评估结果（JSON和文本格式）"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # 保存JSON格式报告
-        json_filename = f"eval_report_{timestamp}.json"
+        # 保存JSON格式报告（jsonl 格式下逐条结果已在结果日志中，只保存汇总）
+        if "results_file" in report:
+            json_filename = f"eval_report_{timestamp}.summary.json"
+        else:
+            json_filename = f"eval_report_{timestamp}.json"
         json_filepath = self.config["results_dir"] / json_filename
         
         with open(json_filepath, 'w', encoding='utf-8') as f:
@@ -389,6 +461,10 @@ class EasyEvalCore:
             f.write(f"平均执行时间: {stats['average_execution_time']:.2f}秒\n")
             f.write(f"最短执行时间: {stats['min_execution_time']:.2f}秒\n")
             f.write(f"最长执行时间: {stats['max_execution_time']:.2f}秒\n")
+            percentiles = stats.get("execution_time_percentiles")
+            if percentiles and percentiles["p50"] is not None:
+                f.write(f"执行时间分位数: p50 {percentiles['p50']:.2f}秒 / p90 {percentiles['p90']:.2f}秒 / "
+                        f"p99 {percentiles['p99']:.2f}秒\n")
             f.write(f"总重试次数: {stats['total_retries']}\n")
             f.write(f"是否达到阈值: {'✅ 是' if stats['threshold_met'] else '❌ 否'}\n\n")
             
@@ -430,11 +506,18 @@ class EasyEvalCore:
         
 def main():
     """主函数"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='easyEval - EasyChat 对话完成率评估工具')
+    parser.add_argument('--resume', metavar='JOURNAL',
+                        help='从结果日志(eval_journal_*.jsonl)继续中断的评估')
+    args = parser.parse_args()
+    
     print("🤖 easyEval - EasyChat 对话完成率评估工具")
     print("=" * 50)
     
     evaluator = EasyEvalCore()
-    report = evaluator.run_evaluation()
+    report = evaluator.run_evaluation(resume_journal=args.resume)
     
     if "error" in report:
         print(f"❌ 评估失败: {report['error']}")
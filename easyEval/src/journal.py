@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+easyEval 结果日志
+以追加方式把每个测试结果写入JSONL日志并同步到磁盘，用于中断后恢复
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+class ResultJournal:
+    """追加写入的测试结果日志
+
+    文件第一行为头部记录，之后每行一个测试结果，每次写入后 fsync。
+    """
+
+    def __init__(self, path: Path, header: Optional[Dict] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        is_new = not self.path.exists() or self.path.stat().st_size == 0
+        if not is_new:
+            self._truncate_partial_line()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+        if is_new:
+            self._write({"type": "header", "created_at": datetime.now().isoformat(), **(header or {})})
+
+    def _truncate_partial_line(self):
+        """去掉崩溃时写了一半的最后一行"""
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, result: Dict):
+        """追加一个测试结果"""
+        self._write({"type": "result", **result})
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    @staticmethod
+    def load(path: Path) -> Tuple[Dict, List[Dict]]:
+        """读取日志，返回 (头部信息, 测试结果列表)"""
+        header = {}
+        results = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.getLogger(__name__).warning(f"跳过日志中的不完整记录: {path}")
+                    continue
+                if record.pop("type", "result") == "header":
+                    header = record
+                else:
+                    results[record["test_id"]] = record
+        return header, list(results.values())
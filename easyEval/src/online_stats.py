@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+在线统计模块
+执行时间的Welford均值/方差和可合并的分位数草图，生成摘要时不需要再遍历结果。
+取自 easyEval2/src/online_stats.py 中的 RunningStats 和 QuantileSketch，修改时两处保持一致
+"""
+
+import math
+from typing import Dict, Optional, Sequence
+
+# 摘要中报告的分位数
+SUMMARY_QUANTILES = (50, 90, 99)
+
+class RunningStats:
+    """Welford算法维护的次数、总和、均值、方差和极值，可合并（Chan等人的并行算法）"""
+
+    __slots__ = ('count', 'total', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """把另一组统计合并进来"""
+        if not other.count:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """样本方差"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+class QuantileSketch:
+    """可合并的分位数草图（DDSketch）
+
+    正数按 gamma=(1+a)/(1-a) 的对数分桶，估计的分位数相对误差不超过 a；
+    零和负数计入零桶（用于耗时，不为负）。内存只与数值范围的数量级有关，与数据量无关。
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("分位数草图精度不一致，无法合并")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """第 q 百分位数（0-100），没有数据时为 None"""
+        if not self.count:
+            return None
+        rank = q / 100 * (self.count - 1)
+        if rank < self.zero_count:
+            return max(min(0.0, self.max), self.min)
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Sequence[float] = SUMMARY_QUANTILES, digits: int = 6) -> Dict[str, Optional[float]]:
+        """多个百分位数，键为 p50/p90/p99 这样的名称"""
+        result = {}
+        for q in qs:
+            value = self.quantile(q)
+            result[f'p{q}'] = round(value, digits) if value is not None else None
+        return result
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试用的EasyChat命令行替身
+
+easyEval 以子进程方式运行 easychat/main.py 并通过标准输入发送问题，
+本脚本模拟这一交互：逐行读取问题，转发给 BENCH_CHAT_URL 指向的替身 /chat 服务并输出回答，
+读到 exit 时退出。服务返回错误时以非零状态退出。
+"""
+
+import os
+import sys
+
+import requests
+
+def main():
+    url = os.environ['BENCH_CHAT_URL'].rstrip('/') + '/chat'
+    for line in sys.stdin:
+        prompt = line.strip()
+        if prompt == 'exit':
+            break
+        if not prompt:
+            continue
+        response = requests.post(url, json={'message': prompt}, timeout=30)
+        if response.status_code != 200:
+            print(f"EasyChat服务返回错误状态: {response.status_code}", file=sys.stderr)
+            sys.exit(1)
+        print(response.json()['response'])
+
+if __name__ == '__main__':
+    main()
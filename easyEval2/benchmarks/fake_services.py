@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试用的本地替身服务
+提供OpenAI兼容的评估模型接口和EasyChat /chat 接口，延迟分布、错误率和429比例可配置
+"""
+
+import re
+import json
+import math
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+# 批量评估请求中问答对的编号（见 config/prompts.py 的 BATCH_ITEM_TEMPLATE）
+_BATCH_ITEM = re.compile(r'【问答对 (\d+)】')
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """解析延迟分布，返回按分布采样延迟秒数的函数
+
+    支持的格式：
+    - const:0.05            固定延迟
+    - uniform:0.01,0.05     均匀分布
+    - normal:0.1,0.02       正态分布（均值, 标准差）
+    - lognormal:0.2,0.5     对数正态分布（中位数, sigma），长尾延迟
+    - exp:0.1               指数分布（均值）
+
+    Raises:
+        ValueError: 格式错误
+    """
+    name, _, args = spec.partition(':')
+    try:
+        params = [float(v) for v in args.split(',')] if args else []
+    except ValueError:
+        raise ValueError(f"延迟分布参数应为数字: {spec}")
+
+    samplers = {
+        'const': (1, lambda rng, v: v),
+        'uniform': (2, lambda rng, a, b: rng.uniform(a, b)),
+        'normal': (2, lambda rng, mean, std: rng.gauss(mean, std)),
+        'lognormal': (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma)),
+        'exp': (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0)
+    }
+    if name not in samplers:
+        raise ValueError(f"未知的延迟分布 {name}，可选: {', '.join(samplers)}")
+    arity, sampler = samplers[name]
+    if len(params) != arity:
+        raise ValueError(f"延迟分布 {name} 需要 {arity} 个参数: {spec}")
+    return lambda rng: max(sampler(rng, *params), 0.0)
+
+class FakeService:
+    """在后台线程中运行的替身HTTP服务
+
+    每个请求先按延迟分布等待，再按比例返回429或500，其余请求正常响应。
+    """
+
+    def __init__(self, kind: str, latency: str = 'const:0', error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, seed: Optional[int] = None,
+                 host: str = '127.0.0.1', port: int = 0):
+        """初始化服务
+
+        Args:
+            kind: 'judge'（OpenAI兼容评估接口）或 'chat'（EasyChat接口）
+            latency: 延迟分布，见 parse_latency
+            error_rate: 返回500的请求比例
+            throttle_rate: 返回429的请求比例
+            seed: 随机种子
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+        """
+        if kind not in ('judge', 'chat'):
+            raise ValueError(f"未知的服务类型: {kind}")
+        self.kind = kind
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'throttled': 0,
+            'errors': 0
+        }
+
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """服务地址"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeService':
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True,
+                                        name=f'fake-{self.kind}')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取服务统计"""
+        with self._lock:
+            return dict(self.stats)
+
+    def reset_stats(self):
+        """清零统计"""
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def _draw(self):
+        """为一个请求采样延迟和结果（429 / 500 / 正常）"""
+        with self._lock:
+            self.stats['requests'] += 1
+            delay = self.sample_latency(self._rng)
+            roll = self._rng.random()
+            if roll < self.throttle_rate:
+                self.stats['throttled'] += 1
+                return delay, 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.stats['errors'] += 1
+                return delay, 500
+            return delay, 200, self._rng.randint(40, 100)
+
+    def _make_handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # keep-alive连接上避免Nagle算法带来的额外延迟
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == '/health':
+                    self._send(200, {'status': 'ok', 'version': 'benchmark'})
+                else:
+                    self._send(404, {'error': 'not found'})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    self._send(400, {'error': 'invalid json'})
+                    return
+
+                delay, status, *score = service._draw()
+                time.sleep(delay)
+                if status != 200:
+                    message = 'rate limited' if status == 429 else 'internal error'
+                    self._send(status, {'error': {'message': message, 'type': 'benchmark'}})
+                elif service.kind == 'chat' and self.path == '/chat':
+                    self._send(200, {'response': f"关于“{body.get('message', '')}”的回答"})
+                elif service.kind == 'judge' and self.path.endswith('/chat/completions'):
+                    self._send(200, _completion(body, score[0]))
+                else:
+                    self._send(404, {'error': 'not found'})
+
+        return Handler
+
+def _completion(body: Dict[str, Any], score: int) -> Dict[str, Any]:
+    """构造OpenAI兼容的评估响应，批量评估请求返回JSON数组"""
+    prompt = ''.join(m.get('content', '') for m in body.get('messages', []))
+    # 维度分数之和与总分一致（表达质量补齐取整误差），与正常的评估模型输出相同
+    dimensions = {'relevance': round(score * 0.30), 'accuracy': round(score * 0.25),
+                  'completeness': round(score * 0.20), 'usefulness': round(score * 0.15)}
+    dimensions['expression'] = score - sum(dimensions.values())
+    evaluation = {
+        'score': score,
+        'reason': '基准测试评分',
+        'dimensions': dimensions
+    }
+    indices = [int(i) for i in _BATCH_ITEM.findall(prompt)]
+    if indices:
+        content = json.dumps([{'index': i, **evaluation} for i in indices], ensure_ascii=False)
+    else:
+        content = json.dumps(evaluation, ensure_ascii=False)
+
+    prompt_tokens = len(prompt) // 2
+    completion_tokens = len(content) // 2
+    return {
+        'id': 'benchmark',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'benchmark'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    }
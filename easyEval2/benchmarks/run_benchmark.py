@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端吞吐量基准测试
+
+在本地启动OpenAI兼容的评估模型替身和EasyChat替身（延迟分布、错误率、429比例可配置），
+分别以多个并发数和测试集规模运行 SemanticEvaluator 与 easyEval 的 EasyEvalCore，
+输出每秒用例数、p50/p95/p99延迟和峰值内存，结果为JSON，可在不同提交之间对比。
+
+每次运行在独立的子进程中进行，峰值内存和进程内共享的限流器、连接池互不影响。
+
+使用方法:
+    python benchmarks/run_benchmark.py                                       # 默认矩阵
+    python benchmarks/run_benchmark.py --sizes 100,1000 --concurrency 1,8,32 -o bench.json
+    python benchmarks/run_benchmark.py --target semantic --throttle-rate 0.05 \\
+        --judge-latency lognormal:0.3,0.6
+    python benchmarks/run_benchmark.py --baseline bench_old.json             # 与上次结果对比
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+EASYEVAL_ROOT = PROJECT_ROOT.parent / 'easyEval'
+
+sys.path.insert(0, str(BENCH_DIR))
+from fake_services import FakeService, parse_latency
+
+console = Console()
+
+SCENARIOS = ['general', 'knowledge', 'creative', 'technical']
+PRIORITIES = ['high', 'medium', 'low']
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """线性插值的百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def write_suite(target: str, size: int, directory: Path) -> Path:
+    """生成指定规模的测试集"""
+    if target == 'semantic':
+        path = directory / f'semantic_{size}.json'
+        suite = {
+            'metadata': {'name': '基准测试用例', 'total_cases': size},
+            'test_cases': [
+                {
+                    'id': f'bench_{i:06d}',
+                    'question': f'基准测试问题 {i}：请解释第 {i} 个概念的含义和应用场景。',
+                    'category': '基准测试',
+                    'scenario': SCENARIOS[i % len(SCENARIOS)],
+                    'expected_aspects': ['解释概念', '说明应用'],
+                    'priority': PRIORITIES[i % len(PRIORITIES)]
+                }
+                for i in range(size)
+            ]
+        }
+    else:
+        path = directory / f'easyeval_{size}.json'
+        suite = [
+            {
+                'id': f'bench_{i:06d}',
+                'description': '基准测试用例',
+                'prompt': f'基准测试问题 {i}',
+                'expected_keywords': ['回答'],
+                'category': 'benchmark',
+                'priority': PRIORITIES[i % len(PRIORITIES)]
+            }
+            for i in range(size)
+        ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(suite, f, ensure_ascii=False)
+    return path
+
+def _redirect_output(log_file: Path):
+    """把子进程的标准输出和错误输出重定向到日志文件，避免干扰基准测试的输出"""
+    fd = os.open(str(log_file), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    os.dup2(fd, 1)
+    os.dup2(fd, 2)
+    os.close(fd)
+
+def _peak_rss_mb() -> float:
+    """当前进程的峰值内存（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为KB，macOS 上为字节
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _run_semantic(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """在子进程中运行 SemanticEvaluator"""
+    workdir = Path(spec['workdir'])
+    _redirect_output(workdir / 'semantic.log')
+    os.environ.update(spec['env'])
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+    from src.semantic_eval import SemanticEvaluator
+
+    evaluator = SemanticEvaluator(use_cache=False, answer_policy='off')
+    run_name = f"semantic_{spec['size']}_{spec['concurrency']}"
+    streaming = spec['output_format'] == 'jsonl'
+    journal_file = workdir / f"{run_name}.{'jsonl' if streaming else 'journal.jsonl'}"
+    evaluator.open_journal(str(journal_file), streaming=streaming)
+
+    # 用例从迭代器取出时开始计时，完成（成功或失败）时结束
+    started: Dict[str, float] = {}
+    latencies: List[float] = []
+
+    def timed(test_cases):
+        for test_case in test_cases:
+            started[test_case.id] = time.perf_counter()
+            yield test_case
+
+    def on_progress(current, total, test_id):
+        latencies.append(time.perf_counter() - started.pop(test_id))
+
+    start = time.perf_counter()
+    evaluator.evaluate_batch(
+        timed(evaluator.iter_test_cases(spec['suite'])),
+        progress_callback=on_progress,
+        concurrency=spec['concurrency'],
+        judge_batch_size=spec['judge_batch_size']
+    )
+    wall_time = time.perf_counter() - start
+    evaluator.journal.close()
+
+    return {
+        'wall_time': wall_time,
+        'completed': evaluator.stats['completed_tests'],
+        'failed': evaluator.stats['failed_tests'],
+        'latencies': latencies,
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+def _run_easyeval(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """在子进程中运行 easyEval 的 EasyEvalCore"""
+    workdir = Path(spec['workdir'])
+    _redirect_output(workdir / 'easyeval.log')
+    os.environ.update(spec['env'])
+    sys.path.insert(0, str(EASYEVAL_ROOT))
+
+    from config.config import CONFIG
+    CONFIG['results_dir'] = workdir
+    CONFIG['test_cases_file'] = Path(spec['suite'])
+    CONFIG['easychat_main'] = BENCH_DIR / 'fake_easychat_cli.py'
+    CONFIG['easychat_root'] = BENCH_DIR
+    CONFIG['logging']['level'] = 'WARNING'
+    CONFIG['logging']['file'] = workdir / 'easyeval_core.log'
+    CONFIG['report']['output_format'] = spec['output_format']
+
+    from src.eval import EasyEvalCore
+    from src.journal import ResultJournal
+
+    core = EasyEvalCore()
+    start = time.perf_counter()
+    report = core.run_evaluation()
+    wall_time = time.perf_counter() - start
+
+    if 'results' in report:
+        results = report['results']
+    else:
+        _, results = ResultJournal.load(report['results_file'])
+
+    return {
+        'wall_time': wall_time,
+        'completed': sum(1 for r in results if r['success']),
+        'failed': sum(1 for r in results if not r['success']),
+        'latencies': [r['execution_time'] for r in results],
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+def run_once(target: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    """在全新的子进程中运行一次评估"""
+    func = _run_semantic if target == 'semantic' else _run_easyeval
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(func, spec).result()
+
+def summarize(target: str, size: int, concurrency: int, raw: Dict[str, Any],
+              judge: FakeService, chat: FakeService) -> Dict[str, Any]:
+    """整理一次运行的指标"""
+    latencies = raw['latencies']
+    cases = raw['completed'] + raw['failed']
+    return {
+        'target': target,
+        'size': size,
+        'concurrency': concurrency,
+        'cases': cases,
+        'completed': raw['completed'],
+        'failed': raw['failed'],
+        'wall_time': round(raw['wall_time'], 4),
+        'cases_per_sec': round(cases / raw['wall_time'], 3) if raw['wall_time'] else None,
+        'latency': {
+            'mean': round(sum(latencies) / len(latencies), 4) if latencies else None,
+            **{f'p{q}': round(percentile(latencies, q), 4) if latencies else None for q in (50, 95, 99)},
+            'max': round(max(latencies), 4) if latencies else None
+        },
+        'peak_rss_mb': round(raw['peak_rss_mb'], 1),
+        'servers': {
+            'judge': judge.snapshot(),
+            'chat': chat.snapshot()
+        }
+    }
+
+def run_key(run: Dict[str, Any]) -> tuple:
+    """用于与基线结果对应的运行标识"""
+    return run['target'], run['size'], run['concurrency']
+
+def print_runs(runs: List[Dict[str, Any]], baseline: Optional[Dict[tuple, Dict[str, Any]]] = None):
+    """以表格形式显示结果"""
+    table = Table(title="基准测试结果", show_header=True)
+    for column in ('目标', '规模', '并发', '用例/秒', 'p50(s)', 'p95(s)', 'p99(s)', '峰值内存(MB)', '失败'):
+        table.add_column(column, justify='right' if column not in ('目标',) else 'left')
+    if baseline:
+        table.add_column('吞吐变化', justify='right')
+
+    for run in runs:
+        latency = run['latency']
+        row = [
+            run['target'], str(run['size']), str(run['concurrency']),
+            f"{run['cases_per_sec']:.2f}",
+            *(f"{latency[q]:.3f}" if latency[q] is not None else '-' for q in ('p50', 'p95', 'p99')),
+            f"{run['peak_rss_mb']:.1f}",
+            str(run['failed'])
+        ]
+        if baseline:
+            base = baseline.get(run_key(run))
+            if base and base.get('cases_per_sec'):
+                change = (run['cases_per_sec'] / base['cases_per_sec'] - 1) * 100
+                color = 'green' if change >= 0 else 'red'
+                row.append(f"[{color}]{change:+.1f}%[/{color}]")
+            else:
+                row.append('-')
+        table.add_row(*row)
+
+    console.print(table)
+
+def git_revision() -> Optional[str]:
+    """当前代码的git提交"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_int_list(value: str) -> List[int]:
+    """解析逗号分隔的整数列表"""
+    try:
+        numbers = [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"应为逗号分隔的整数: {value}")
+    if not numbers or any(n <= 0 for n in numbers):
+        raise argparse.ArgumentTypeError(f"应为正整数: {value}")
+    return numbers
+
+def parse_latency_arg(value: str) -> str:
+    """校验延迟分布参数"""
+    try:
+        parse_latency(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+def create_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        description='easyEval / easyEval2 端到端吞吐量基准测试',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+延迟分布格式:
+  const:0.05  uniform:0.01,0.05  normal:0.1,0.02  lognormal:0.2,0.5（中位数,sigma）  exp:0.1（均值）
+        """
+    )
+    parser.add_argument('--target', choices=['semantic', 'easyeval', 'all'], default='all',
+                        help='评估器: semantic (easyEval2 SemanticEvaluator) / easyeval (easyEval EasyEvalCore) / all')
+    parser.add_argument('--sizes', type=parse_int_list, default=[50, 200],
+                        help='测试集规模，逗号分隔 (默认: 50,200)')
+    parser.add_argument('--concurrency', type=parse_int_list, default=[1, 4, 16],
+                        help='SemanticEvaluator 的并发数，逗号分隔 (默认: 1,4,16)；EasyEvalCore 固定为顺序执行')
+    parser.add_argument('--judge-batch-size', type=int, default=1,
+                        help='每次评估请求合并的问答对数量 (默认: 1)')
+    parser.add_argument('--output-format', choices=['json', 'jsonl'], default='json',
+                        help='结果输出格式，jsonl 时结果不在内存中保留 (默认: json)')
+    parser.add_argument('--judge-latency', type=parse_latency_arg, default='lognormal:0.05,0.5',
+                        help='评估模型替身的延迟分布 (默认: lognormal:0.05,0.5)')
+    parser.add_argument('--chat-latency', type=parse_latency_arg, default='lognormal:0.02,0.5',
+                        help='EasyChat替身的延迟分布 (默认: lognormal:0.02,0.5)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='替身服务返回500的请求比例 (默认: 0)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='评估模型替身返回429的请求比例 (默认: 0)')
+    parser.add_argument('--rps', type=float, default=1000,
+                        help='评估请求的限流速率上限，默认足够大使限流器不成为瓶颈 (默认: 1000)')
+    parser.add_argument('--seed', type=int, default=42, help='替身服务的随机种子 (默认: 42)')
+    parser.add_argument('--output', '-o', type=str,
+                        help='结果JSON输出路径 (默认: results/benchmark_YYYYMMDD_HHMMSS.json)')
+    parser.add_argument('--baseline', type=str, help='对比的基线结果JSON，显示吞吐量变化')
+    return parser
+
+def main():
+    args = create_parser().parse_args()
+    targets = ['semantic', 'easyeval'] if args.target == 'all' else [args.target]
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = {run_key(run): run for run in json.load(f)['runs']}
+
+    judge = FakeService('judge', args.judge_latency, args.error_rate, args.throttle_rate, seed=args.seed).start()
+    chat = FakeService('chat', args.chat_latency, args.error_rate, seed=args.seed + 1).start()
+    console.print(f"[blue]评估模型替身: {judge.url}  EasyChat替身: {chat.url}[/blue]")
+
+    runs = []
+    with tempfile.TemporaryDirectory(prefix='easyeval-bench-') as tmp:
+        workdir = Path(tmp)
+        env = {
+            'DEEPSEEK_API_KEY': 'benchmark',
+            'DEEPSEEK_BASE_URL': judge.url,
+            'EASYCHAT_URL': chat.url,
+            'BENCH_CHAT_URL': chat.url,
+            'JUDGE_CACHE_ENABLED': 'false',
+            'ANSWER_STORE_POLICY': 'off',
+            'RATE_LIMIT_RPS': str(args.rps),
+            'RATE_LIMIT_MAX_RPS': str(args.rps),
+            'LOG_FILE': str(workdir / 'semantic_eval.log')
+        }
+
+        for target in targets:
+            for size in args.sizes:
+                suite = write_suite(target, size, workdir)
+                # EasyEvalCore 顺序执行，只有一个并发级别
+                for concurrency in (args.concurrency if target == 'semantic' else [1]):
+                    console.print(f"[dim]运行 {target} 规模={size} 并发={concurrency}...[/dim]")
+                    judge.reset_stats()
+                    chat.reset_stats()
+                    spec = {
+                        'suite': str(suite),
+                        'size': size,
+                        'concurrency': concurrency,
+                        'judge_batch_size': args.judge_batch_size,
+                        'output_format': args.output_format,
+                        'workdir': str(workdir),
+                        'env': env
+                    }
+                    try:
+                        raw = run_once(target, spec)
+                    except Exception as e:
+                        console.print(f"[red]❌ {target} 规模={size} 并发={concurrency} 运行失败: {e}[/red]")
+                        continue
+                    runs.append(summarize(target, size, concurrency, raw, judge, chat))
+
+    judge.stop()
+    chat.stop()
+
+    report = {
+        'metadata': {
+            'timestamp': datetime.now().isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'settings': {
+                key: value for key, value in vars(args).items() if key not in ('output', 'baseline')
+            }
+        },
+        'runs': runs
+    }
+
+    output = args.output
+    if not output:
+        (PROJECT_ROOT / 'results').mkdir(exist_ok=True)
+        output = str(PROJECT_ROOT / 'results' / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_runs(runs, baseline)
+    console.print(f"[green]💾 基准测试结果已保存到: {output}[/green]")
+
+if __name__ == '__main__':
+    main()
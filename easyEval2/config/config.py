@@ -23,6 +23,13 @@ class SystemConfig:
         Args:
             config_file: 可选的配置文件路径（暂未使用）
         """
+        self.reload(config_file)
+    
+    def reload(self, config_file=None):
+        """从配置文件加载环境变量后重新初始化配置
+        
+        各模块共享全局配置实例，命令行指定的配置文件通过原地重新加载生效，不需要另建实例。
+        """
         # 重新加载环境变量（如果指定了配置文件）
         if config_file and os.path.exists(config_file):
             load_dotenv(config_file)
@@ -36,7 +43,9 @@ class SystemConfig:
         self.deepseek = type('obj', (object,), {
             'api_key': os.getenv('DEEPSEEK_API_KEY', ''),
             'base_url': os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com'),
-            'model': os.getenv('DEEPSEEK_MODEL', 'deepseek-chat')
+            'model': os.getenv('DEEPSEEK_MODEL', 'deepseek-chat'),
+            # 评估请求使用JSON输出模式（response_format=json_object），服务端不支持时自动关闭
+            'json_mode': os.getenv('DEEPSEEK_JSON_MODE', 'true').lower() in ('1', 'true', 'yes')
         })()
         
         # 请求配置
@@ -46,12 +55,84 @@ class SystemConfig:
             'interval': float(os.getenv('REQUEST_INTERVAL', '1.0'))
         })()
         
+        # 自适应限流配置（未设置RATE_LIMIT_RPS时按REQUEST_INTERVAL换算初始速率）
+        interval = self.request.interval
+        self.rate_limit = type('obj', (object,), {
+            'requests_per_second': float(os.getenv('RATE_LIMIT_RPS', str(1 / interval if interval > 0 else 5.0))),
+            'min_requests_per_second': float(os.getenv('RATE_LIMIT_MIN_RPS', '0.2')),
+            'max_requests_per_second': float(os.getenv('RATE_LIMIT_MAX_RPS', '20')),
+            'tokens_per_minute': int(os.getenv('RATE_LIMIT_TPM', '0'))
+        })()
+        
         # EasyChat 配置
         self.easychat = type('obj', (object,), {
             'url': os.getenv('EASYCHAT_URL', 'http://localhost:8000'),
             'timeout': int(os.getenv('EASYCHAT_TIMEOUT', '10'))
         })()
         
+        # HTTP连接池配置（EasyChat和本地API共享keep-alive连接）
+        self.http = type('obj', (object,), {
+            'pool_size': int(os.getenv('HTTP_POOL_SIZE', '16')),
+            'connect_timeout': float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+            'prewarm': os.getenv('HTTP_PREWARM', 'true').lower() in ('1', 'true', 'yes')
+        })()
+        
+        # 评估执行配置
+        self.evaluation = type('obj', (object,), {
+            'concurrency': int(os.getenv('EVAL_CONCURRENCY', '1')),
+            'answer_workers': int(os.getenv('EVAL_ANSWER_WORKERS', '0')),
+            'judge_workers': int(os.getenv('EVAL_JUDGE_WORKERS', '0')),
+            'queue_size': int(os.getenv('EVAL_QUEUE_SIZE', '0')),
+            'judge_batch_size': int(os.getenv('EVAL_JUDGE_BATCH_SIZE', '1')),
+            'judge_batch_wait': float(os.getenv('EVAL_JUDGE_BATCH_WAIT', '0.2')),
+            # 评估结果无法在本地解析或修复时，是否发送简短的格式修复请求
+            'repair_prompt': os.getenv('EVAL_REPAIR_PROMPT', 'true').lower() in ('1', 'true', 'yes'),
+            # 各场景平均分bootstrap置信区间的重抽样次数，0为不计算（需要NumPy）
+            'bootstrap_resamples': int(os.getenv('EVAL_BOOTSTRAP_RESAMPLES', '0'))
+        })()
+        
+        # 评估结果缓存配置
+        self.cache = type('obj', (object,), {
+            'enabled': os.getenv('JUDGE_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+            'path': project_root / os.getenv('JUDGE_CACHE_PATH', 'cache/judge_cache.sqlite'),
+            'max_entries': int(os.getenv('JUDGE_CACHE_MAX_ENTRIES', '200000')),
+            'max_age_days': float(os.getenv('JUDGE_CACHE_MAX_AGE_DAYS', '30'))
+        })()
+        
+        # EasyChat回答存储配置
+        self.answer_store = type('obj', (object,), {
+            'policy': os.getenv('ANSWER_STORE_POLICY', 'reuse'),
+            'path': project_root / os.getenv('ANSWER_STORE_PATH', 'cache/answer_store.sqlite'),
+            'max_entries': int(os.getenv('ANSWER_STORE_MAX_ENTRIES', '200000')),
+            'ttl_days': float(os.getenv('ANSWER_STORE_TTL_DAYS', '7'))
+        })()
+        
+        # 测试集索引配置
+        self.suite_index = type('obj', (object,), {
+            'enabled': os.getenv('SUITE_INDEX_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+            'dir': project_root / os.getenv('SUITE_INDEX_DIR', 'cache/suites')
+        })()
+        
+        # 结果输出配置
+        self.output = type('obj', (object,), {
+            'format': os.getenv('OUTPUT_FORMAT', 'json'),
+            'trace_file': os.getenv('TRACE_FILE', '')
+        })()
+        
+        # 运行状态服务配置（JSON和Prometheus文本格式的实时状态）
+        self.status = type('obj', (object,), {
+            'address': os.getenv('STATUS_ADDRESS', ''),
+            'window_seconds': float(os.getenv('STATUS_WINDOW_SECONDS', '60'))
+        })()
+        
+        # Token费用与预算配置
+        self.cost = type('obj', (object,), {
+            'currency': os.getenv('COST_CURRENCY', 'CNY'),
+            'price_table': os.getenv('PRICE_TABLE', ''),
+            'max_tokens': int(os.getenv('BUDGET_MAX_TOKENS', '0')),
+            'max_cost': float(os.getenv('BUDGET_MAX_COST', '0'))
+        })()
+        
         # 日志配置
         self.log = type('obj', (object,), {
             'level': os.getenv('LOG_LEVEL', 'INFO'),
@@ -26,8 +26,8 @@ class EvaluationPrompts:
   "dimensions": {
     "relevance": 26,
     "accuracy": 22,
-    "completeness": 18,
-    "usefulness": 13,
+    "completeness": 17,
+    "usefulness": 12,
     "expression": 8
   }
 }
@@ -49,6 +49,41 @@ class EvaluationPrompts:
 {answer}
 
 请根据评估标准给出评分和分析。
+"""
+    
+    # 批量评估的附加说明：一次请求评估多个问答对，按编号返回JSON数组
+    BATCH_INSTRUCTION = """
+
+批量评估：
+- 本次需要依次评估多个相互独立的问答对，每个问答对都有编号
+- 请对每个问答对分别按上述标准评分，互不影响
+- 必须只返回一个JSON数组，数组中每个元素对应一个问答对，格式如下：
+[
+  {"index": 1, "score": 85, "reason": "评分理由", "dimensions": {"relevance": 26, "accuracy": 22, "completeness": 17, "usefulness": 12, "expression": 8}},
+  {"index": 2, "score": 60, "reason": "评分理由", "dimensions": {"relevance": 20, "accuracy": 15, "completeness": 12, "usefulness": 8, "expression": 5}}
+]
+- index必须与问答对编号一致，不要遗漏任何问答对
+"""
+    
+    # 评估结果无法解析时的修复提示词：只整理格式，不重新评估
+    REPAIR_PROMPT = """
+下面是一段对问答质量的评估，但格式不符合要求。请把其中的评分整理为以下JSON格式，只输出JSON：
+{"score": 85, "reason": "评分理由", "dimensions": {"relevance": 26, "accuracy": 22, "completeness": 17, "usefulness": 12, "expression": 8}}
+
+注意：
+- 不要重新评估，只使用原文中已有的分数和理由
+- 维度满分依次为 relevance 30、accuracy 25、completeness 20、usefulness 15、expression 10，原文没有维度分数时省略dimensions
+- 原文中没有总分也没有维度分数时返回 {"score": null}
+"""
+    
+    # 批量评估中单个问答对的模板
+    BATCH_ITEM_TEMPLATE = """
+【问答对 {index}】
+【用户问题】
+{question}
+
+【AI回答】
+{answer}
 """
     
     # 特定场景的提示词
@@ -111,6 +146,20 @@ class EvaluationPrompts:
             answer=answer
         )
     
+    @classmethod
+    def get_batch_system_prompt(cls, scenario='general'):
+        """获取批量评估的系统提示词"""
+        return cls.get_system_prompt(scenario) + cls.BATCH_INSTRUCTION
+    
+    @classmethod
+    def get_batch_item_prompt(cls, index, question, answer):
+        """生成批量评估中单个问答对的提示词"""
+        return cls.BATCH_ITEM_TEMPLATE.format(
+            index=index,
+            question=question,
+            answer=answer
+        )
+    
     @classmethod
     def get_available_scenarios(cls):
         """获取可用的评估场景"""
@@ -127,18 +176,39 @@ class EvaluationPrompts:
         return "未知场景"
 
 class PromptBuilder:
-    """提示词构建器"""
+    """提示词构建器
+    
+    各场景的系统提示词在构建器创建时渲染一次；评估时通过 for_scenario 复用同一场景的构建器，
+    每次请求只拼接末尾的问题和回答。
+    """
+    
+    # 按场景共享的构建器
+    _shared = {}
     
     def __init__(self, scenario='general'):
-        self.scenario = scenario
         self.prompts = EvaluationPrompts()
+        self._render(scenario)
+    
+    @classmethod
+    def for_scenario(cls, scenario='general'):
+        """获取场景共享的构建器（系统提示词只渲染一次）"""
+        builder = cls._shared.get(scenario)
+        if builder is None:
+            builder = cls._shared.setdefault(scenario, cls(scenario))
+        return builder
+    
+    def _render(self, scenario):
+        """渲染场景固定不变的提示词前缀"""
+        self.scenario = scenario
+        self.system_prompt = self.prompts.get_system_prompt(scenario)
+        self.batch_system_prompt = self.prompts.get_batch_system_prompt(scenario)
     
     def build_messages(self, question, answer):
         """构建完整的消息列表"""
         return [
             {
                 "role": "system",
-                "content": self.prompts.get_system_prompt(self.scenario)
+                "content": self.system_prompt
             },
             {
                 "role": "user",
@@ -146,10 +216,45 @@ class PromptBuilder:
             }
         ]
     
+    def build_batch_messages(self, pairs):
+        """构建批量评估的消息列表
+        
+        Args:
+            pairs: (问题, 回答) 列表，编号从1开始
+        """
+        items = [
+            self.prompts.get_batch_item_prompt(i, question, answer)
+            for i, (question, answer) in enumerate(pairs, 1)
+        ]
+        return [
+            {
+                "role": "system",
+                "content": self.batch_system_prompt
+            },
+            {
+                "role": "user",
+                "content": f"请评估以下 {len(pairs)} 个问答对的质量：\n" + "".join(items) +
+                           "\n请按编号返回JSON数组。"
+            }
+        ]
+    
+    def build_repair_messages(self, content):
+        """构建评估结果的格式修复请求"""
+        return [
+            {
+                "role": "system",
+                "content": self.prompts.REPAIR_PROMPT
+            },
+            {
+                "role": "user",
+                "content": content
+            }
+        ]
+    
     def set_scenario(self, scenario):
         """设置评估场景"""
         if scenario in self.prompts.SCENARIO_PROMPTS:
-            self.scenario = scenario
+            self._render(scenario)
         else:
             raise ValueError(f"未知的评估场景: {scenario}")
     
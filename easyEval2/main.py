@@ -12,14 +12,30 @@ easyEval2 主运行脚本
     python main.py --verbose                # 详细输出模式
     python main.py --dry-run                # 干运行模式（不调用API）
     python main.py --scenario knowledge     # 指定评估场景
+    python main.py --concurrency 8          # 并发评估
+    python main.py --shard 0/4              # 只评估4个分片中的第0个
+    python main.py merge a.json b.json      # 合并各分片的评估结果
+    python main.py compare base.json new.json  # 与基线配对对比，显著回归时退出码为1
+    python main.py --compare-to base.json   # 评估的同时与基线对比，回归判定有结论时提前停止
+    python main.py --status-server 0.0.0.0:9108 --dashboard  # 提供实时运行状态并显示仪表盘
+    python main.py watch http://host:9108   # 在其他机器上查看运行状态
+    python main.py --coordinator 0.0.0.0:8765             # 作为协调者分发用例
+    python main.py --worker http://host:8765 --concurrency 4  # 作为worker领取用例评估
 """
 
 import argparse
+import json
 import sys
 import os
+import time
+import random
+import itertools
+from collections import Counter
+from dataclasses import asdict
 from pathlib import Path
 from datetime import datetime
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn
 from rich.table import Table
@@ -29,10 +45,17 @@ from rich.text import Text
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from config.config import SystemConfig
-from src.semantic_eval import SemanticEvaluator
-from src.deepseek_client import DeepSeekClient
-from src.local_api_client import LocalAPIClient
+# 启动时只导入轻量的模块；配置（dotenv）、评估器（requests、openai）、工作队列和运行状态服务
+# 在实际用到时才导入，--help、参数校验失败和 --cache-stats 等调用不承担这些导入开销
+from src.cache import JudgeCache, AnswerStore
+from src.sharding import parse_shard, shard_of, merge_shard_results, load_shard_results
+from src.suite_index import SuiteIndex
+from src.sequential import SequentialMonitor
+from src.compare import PairedComparison, VERDICT_NAMES, format_p_value
+from src import online_stats
+from src.sampling import StratifiedSample, parse_stratify
+from src.tracing import STAGE_NAMES
+from src import startup_profile
 
 console = Console()
 
@@ -50,6 +73,13 @@ def create_parser():
   %(prog)s --dry-run                         # 干运行（测试配置）
   %(prog)s --scenario knowledge              # 指定评估场景
   %(prog)s --limit 10                       # 限制测试数量
+  %(prog)s --concurrency 8                   # 8个用例并发评估
+  %(prog)s --shard 0/4                       # 只评估4个分片中的第0个
+  %(prog)s merge results/shard_*.json -o results/merged.json  # 合并分片结果
+  %(prog)s --status-server 0.0.0.0:9108      # 通过HTTP提供实时运行状态（/status, /metrics）
+  %(prog)s watch http://host:9108            # 查看其他机器上评估的实时运行状态
+  %(prog)s --coordinator 0.0.0.0:8765        # 协调者：通过租约队列分发用例
+  %(prog)s --worker http://host:8765         # worker：从协调者领取用例评估
         """
     )
     
@@ -67,6 +97,35 @@ def create_parser():
         help='输出文件路径 (默认: 自动生成时间戳文件名)'
     )
     
+    parser.add_argument(
+        '--output-format',
+        choices=['json', 'jsonl'],
+        help='结果格式: json 评估结束后写入完整报告; jsonl 逐条流式写入结果并另存汇总文件，'
+             '内存占用不随用例数增长 (默认: OUTPUT_FORMAT 配置)'
+    )
+    
+    parser.add_argument(
+        '--trace-file',
+        type=str,
+        metavar='PATH',
+        help='把每个用例的分阶段耗时以OpenTelemetry兼容的JSON格式(每行一个OTLP请求)追加写入该文件 '
+             '(默认: TRACE_FILE 配置，为空则不导出)'
+    )
+    
+    parser.add_argument(
+        '--status-server',
+        type=str,
+        metavar='[HOST:]PORT',
+        help='评估期间在该地址提供实时运行状态: /status 返回JSON, /metrics 返回Prometheus文本格式 '
+             '(默认: STATUS_ADDRESS 配置，为空则不启动)'
+    )
+    
+    parser.add_argument(
+        '--dashboard',
+        action='store_true',
+        help='在进度条下方显示实时仪表盘（吞吐量、错误率、重试、延迟百分位、平均分漂移、限流）'
+    )
+    
     # 运行模式选项
     parser.add_argument(
         '-v', '--verbose',
@@ -101,6 +160,39 @@ def create_parser():
         help='跳过前N个测试用例'
     )
     
+    parser.add_argument(
+        '--shard',
+        type=str,
+        metavar='i/N',
+        help='只评估第i个分片（共N个，i从0开始），按测试用例ID的稳定哈希分配，用于多机分布式评估'
+    )
+    
+    # 并发选项
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        help='同时评估的用例数量 (默认: EVAL_CONCURRENCY 配置，未设置时为1)'
+    )
+    
+    parser.add_argument(
+        '--answer-workers',
+        type=int,
+        help='流水线回答获取阶段的并发数 (默认与 --concurrency 相同)'
+    )
+    
+    parser.add_argument(
+        '--judge-workers',
+        type=int,
+        help='流水线语义评估阶段的并发数 (默认与 --concurrency 相同)'
+    )
+    
+    parser.add_argument(
+        '--judge-batch-size',
+        type=int,
+        metavar='K',
+        help='每次评估请求合并评估的问答对数量，适合回答较短的测试集 (默认: EVAL_JUDGE_BATCH_SIZE 配置)'
+    )
+    
     # API选择选项
     parser.add_argument(
         '--use-local-api',
@@ -115,6 +207,194 @@ def create_parser():
         help='本地API服务器地址（默认: http://localhost:8000）'
     )
     
+    # 缓存选项
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        '--cache',
+        dest='use_cache',
+        action='store_true',
+        default=None,
+        help='启用评估结果缓存 (默认: JUDGE_CACHE_ENABLED 配置)'
+    )
+    
+    cache_group.add_argument(
+        '--no-cache',
+        dest='use_cache',
+        action='store_false',
+        help='禁用评估结果缓存，所有用例重新请求评估模型'
+    )
+    
+    parser.add_argument(
+        '--answers',
+        dest='answer_policy',
+        choices=['reuse', 'refresh', 'off'],
+        help='EasyChat回答复用策略: reuse 复用已存储的回答, refresh 强制重新生成, off 不使用存储 '
+             '(默认: ANSWER_STORE_POLICY 配置)'
+    )
+    
+    parser.add_argument(
+        '--max-tokens-budget',
+        type=int,
+        metavar='N',
+        help='评估模型Token预算，预计超出时停止调度新用例，已开始的用例照常完成 (默认: BUDGET_MAX_TOKENS 配置，0为不限)'
+    )
+    
+    parser.add_argument(
+        '--max-cost',
+        type=float,
+        metavar='AMOUNT',
+        help='按价格表估算的费用预算，预计超出时停止调度新用例 (默认: BUDGET_MAX_COST 配置，0为不限)'
+    )
+    
+    sequential_group = parser.add_argument_group('抽样与顺序评估')
+    sequential_group.add_argument(
+        '--sample',
+        type=int,
+        metavar='N',
+        help='分层随机抽取N个用例评估，报告中估计整个测试集和各层的平均分及置信区间'
+    )
+    
+    sequential_group.add_argument(
+        '--stratify',
+        type=str,
+        default='',
+        metavar='FIELD[,FIELD...]',
+        help='分层字段，可选 category,scenario,priority (默认: 不分层，简单随机抽样)'
+    )
+    
+    sequential_group.add_argument(
+        '--allocation',
+        choices=['proportional', 'neyman'],
+        default='proportional',
+        help='样本量分配方式: proportional 按层大小, neyman 按层大小乘以分数标准差 (默认: proportional)'
+    )
+    
+    sequential_group.add_argument(
+        '--sample-prior',
+        type=str,
+        metavar='RESULTS',
+        help='以往的评估结果文件，Neyman分配用于估计各层的分数标准差'
+    )
+    
+    sequential_group.add_argument(
+        '--sequential',
+        action='store_true',
+        help='按随机顺序评估，各场景平均分的置信区间足够窄（或及格判定已有结论）时提前停止'
+    )
+    
+    sequential_group.add_argument(
+        '--ci-half-width',
+        type=float,
+        default=1.0,
+        metavar='POINTS',
+        help='顺序评估的目标置信区间半宽（分），0表示只按及格线判定 (默认: 1.0)'
+    )
+    
+    sequential_group.add_argument(
+        '--confidence',
+        type=float,
+        default=0.95,
+        help='置信水平 (默认: 0.95)'
+    )
+    
+    sequential_group.add_argument(
+        '--pass-threshold',
+        type=float,
+        metavar='SCORE',
+        help='及格线：整体平均分的置信区间完全高于或低于及格线时停止并给出判定'
+    )
+    
+    sequential_group.add_argument(
+        '--min-cases-per-scenario',
+        type=int,
+        default=10,
+        metavar='N',
+        help='停止前每个场景至少评估的用例数 (默认: 10)'
+    )
+    
+    sequential_group.add_argument(
+        '--compare-to',
+        type=str,
+        metavar='RESULTS',
+        help='与基线评估结果按用例ID配对对比，先按随机顺序评估基线中有的用例，回归判定有结论时提前停止，显著回归时退出码为1'
+    )
+    
+    sequential_group.add_argument(
+        '--regression-margin',
+        type=float,
+        default=1.0,
+        metavar='POINTS',
+        help='与基线对比时允许的平均分下降幅度（分） (默认: 1.0)'
+    )
+    
+    sequential_group.add_argument(
+        '--bootstrap',
+        type=int,
+        metavar='N',
+        help='报告中各场景平均分使用N次重抽样的bootstrap置信区间，需要NumPy (默认: EVAL_BOOTSTRAP_RESAMPLES 配置，0为使用t分布区间)'
+    )
+    
+    sequential_group.add_argument(
+        '--seed',
+        type=int,
+        help='抽样和随机顺序的种子，指定后可复现样本和评估顺序 (默认: 随机生成并记录在结果中)'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='增量评估：只重新评估与基线相比指纹（问题、场景、回答、评估提示词、评估模型）变化或基线中失败的用例'
+    )
+    
+    parser.add_argument(
+        '--baseline',
+        type=str,
+        metavar='RESULTS',
+        help='增量评估的基线结果文件（JSON报告或JSONL结果文件），未变化的结果沿用到新报告中'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        type=str,
+        metavar='JOURNAL',
+        help='从结果日志(*.journal.jsonl)继续中断的评估，跳过已完成的用例'
+    )
+    
+    # 分布式评估选项
+    distributed_group = parser.add_mutually_exclusive_group()
+    distributed_group.add_argument(
+        '--coordinator',
+        type=str,
+        metavar='[HOST:]PORT',
+        help='以协调者模式运行：通过租约队列向worker分发测试用例，全部完成后生成报告'
+    )
+    
+    distributed_group.add_argument(
+        '--worker',
+        type=str,
+        metavar='URL',
+        help='以worker模式运行：从指定协调者领取测试用例评估并提交结果'
+    )
+    
+    parser.add_argument(
+        '--lease-seconds',
+        type=float,
+        default=60,
+        help='协调者分发用例的租约时长，worker失联超过该时间后用例被重新分发 (默认: 60)'
+    )
+    
+    parser.add_argument(
+        '--worker-id',
+        type=str,
+        help='worker标识 (默认: 主机名-进程号)'
+    )
+    
+    parser.add_argument(
+        '--cache-stats',
+        action='store_true',
+        help='显示评估结果缓存统计信息后退出'
+    )
+    
     # 过滤选项
     parser.add_argument(
         '--category',
@@ -129,6 +409,36 @@ def create_parser():
         help='只处理指定优先级的测试用例'
     )
     
+    parser.add_argument(
+        '--only-scenario',
+        type=str,
+        metavar='SCENARIO',
+        help='只处理指定评估场景的测试用例'
+    )
+    
+    parser.add_argument(
+        '--ids',
+        type=lambda value: [i.strip() for i in value.split(',') if i.strip()],
+        metavar='ID[,ID...]',
+        help='只处理指定ID的测试用例（逗号分隔）'
+    )
+    
+    index_group = parser.add_mutually_exclusive_group()
+    index_group.add_argument(
+        '--index',
+        dest='use_index',
+        action='store_true',
+        default=None,
+        help='通过编译后的测试集索引过滤和切片，源文件变化时自动重新编译 (默认: SUITE_INDEX_ENABLED 配置)'
+    )
+    
+    index_group.add_argument(
+        '--no-index',
+        dest='use_index',
+        action='store_false',
+        help='不使用测试集索引，流式扫描源文件'
+    )
+    
     # 配置选项
     parser.add_argument(
         '--config',
@@ -142,6 +452,12 @@ def create_parser():
         help='不显示评估摘要'
     )
     
+    parser.add_argument(
+        '--print-startup-profile',
+        action='store_true',
+        help='以 -X importtime 运行本次命令（含 merge / watch / compare 子命令），结束后报告各模块的导入耗时'
+    )
+    
     return parser
 
 def print_banner():
@@ -175,6 +491,13 @@ def validate_args(args):
             except Exception as e:
                 errors.append(f"无法创建输出目录 {output_dir}: {e}")
     
+    if args.output_format == 'jsonl' and args.output and not args.output.endswith('.jsonl'):
+        errors.append("jsonl 输出格式的输出文件需以 .jsonl 结尾")
+    
+    # 检查结果日志
+    if args.resume and not os.path.exists(args.resume):
+        errors.append(f"结果日志不存在: {args.resume}")
+    
     # 检查配置文件
     if args.config and not os.path.exists(args.config):
         errors.append(f"配置文件不存在: {args.config}")
@@ -186,6 +509,82 @@ def validate_args(args):
     if args.skip < 0:
         errors.append("skip 参数不能为负数")
     
+    if args.shard:
+        try:
+            parse_shard(args.shard)
+        except ValueError as e:
+            errors.append(str(e))
+    
+    if args.coordinator:
+        try:
+            parse_address(args.coordinator)
+        except ValueError as e:
+            errors.append(str(e))
+    
+    if args.status_server:
+        try:
+            parse_address(args.status_server)
+        except ValueError as e:
+            errors.append(str(e))
+    if (args.coordinator or args.worker) and (args.status_server or args.dashboard):
+        errors.append("分布式模式不支持 --status-server / --dashboard，协调者的 /status 接口提供队列进度")
+    
+    if (args.coordinator or args.worker) and args.resume:
+        errors.append("分布式模式不支持 --resume，重新运行协调者即可从队列文件继续")
+    
+    if args.lease_seconds <= 0:
+        errors.append("lease-seconds 参数必须大于0")
+    
+    if args.incremental:
+        if not args.baseline:
+            errors.append("增量评估需要通过 --baseline 指定基线结果")
+        if args.coordinator or args.worker:
+            errors.append("分布式模式不支持 --incremental")
+    if args.baseline and not os.path.exists(args.baseline):
+        errors.append(f"基线结果不存在: {args.baseline}")
+    
+    if args.sample is not None:
+        if args.sample <= 0:
+            errors.append("sample 参数必须大于0")
+        if args.limit is not None or args.skip:
+            errors.append("--sample 不能与 --limit / --skip 同时使用")
+        if args.coordinator or args.worker:
+            errors.append("分布式模式不支持 --sample")
+        try:
+            parse_stratify(args.stratify)
+        except ValueError as e:
+            errors.append(str(e))
+        if args.allocation == 'neyman' and not args.sample_prior:
+            errors.append("Neyman分配需要通过 --sample-prior 指定以往的评估结果")
+    if args.sample_prior and not os.path.exists(args.sample_prior):
+        errors.append(f"以往的评估结果不存在: {args.sample_prior}")
+    
+    if args.compare_to:
+        if not os.path.exists(args.compare_to):
+            errors.append(f"对比的基线结果不存在: {args.compare_to}")
+        if args.regression_margin < 0:
+            errors.append("regression-margin 参数不能为负数")
+        if args.coordinator or args.worker:
+            errors.append("分布式模式不支持 --compare-to，评估结束后可使用 compare 子命令对比")
+    
+    if (args.sample is not None or args.sequential or args.compare_to) and not 0 < args.confidence < 1:
+        errors.append("confidence 参数应在0和1之间")
+    
+    if args.sequential:
+        if args.ci_half_width < 0:
+            errors.append("ci-half-width 参数不能为负数")
+        if not args.ci_half_width and args.pass_threshold is None:
+            errors.append("ci-half-width 为0时需要指定 --pass-threshold")
+        if args.min_cases_per_scenario < 2:
+            errors.append("min-cases-per-scenario 参数不能小于2")
+        if args.coordinator or args.worker:
+            errors.append("分布式模式不支持 --sequential")
+    
+    for name in ('concurrency', 'answer_workers', 'judge_workers', 'judge_batch_size'):
+        value = getattr(args, name)
+        if value is not None and value <= 0:
+            errors.append(f"{name.replace('_', '-')} 参数必须大于0")
+    
     return errors
 
 def print_config_info(config, args):
@@ -205,6 +604,38 @@ def print_config_info(config, args):
     table.add_row("API基础URL", config.deepseek.base_url)
     table.add_row("最大重试次数", str(config.request.max_retries))
     table.add_row("请求超时", f"{config.request.timeout}秒")
+    table.add_row("并发数", str(args.concurrency or config.evaluation.concurrency))
+    cache_enabled = args.use_cache if args.use_cache is not None else config.cache.enabled
+    table.add_row("评估缓存", str(config.cache.path) if cache_enabled else "关闭")
+    table.add_row("回答复用", args.answer_policy or config.answer_store.policy)
+    if args.answer_workers or args.judge_workers:
+        table.add_row("流水线并发", f"回答 {args.answer_workers or '-'} / 评估 {args.judge_workers or '-'}")
+    judge_batch_size = args.judge_batch_size or config.evaluation.judge_batch_size
+    if judge_batch_size > 1:
+        table.add_row("批量评估", f"每次 {judge_batch_size} 个问答对")
+    max_tokens = args.max_tokens_budget if args.max_tokens_budget is not None else config.cost.max_tokens
+    max_cost = args.max_cost if args.max_cost is not None else config.cost.max_cost
+    if max_tokens or max_cost:
+        table.add_row("预算", f"Token {max_tokens or '不限'} / 费用 {max_cost or '不限'} {config.cost.currency}")
+    
+    status_address = args.status_server or config.status.address
+    if status_address:
+        table.add_row("运行状态服务", f"{status_address}（滚动窗口 {config.status.window_seconds:g} 秒）")
+    if args.dashboard:
+        table.add_row("实时仪表盘", "是")
+    
+    if args.incremental:
+        table.add_row("增量评估", f"基线 {args.baseline}")
+    if args.sample:
+        allocation = 'Neyman最优分配' if args.allocation == 'neyman' else '比例分配'
+        table.add_row("分层抽样", f"{args.sample} 个，分层 {args.stratify or '无'}，{allocation}")
+    if args.sequential:
+        target = f"半宽 ≤ {args.ci_half_width}" if args.ci_half_width else "只按及格线"
+        if args.pass_threshold is not None:
+            target += f"，及格线 {args.pass_threshold}"
+        table.add_row("顺序评估", f"{target}，置信水平 {args.confidence:.0%}，每场景至少 {args.min_cases_per_scenario} 个")
+    if args.compare_to:
+        table.add_row("基线对比", f"{args.compare_to}，允许下降 {args.regression_margin} 分，置信水平 {args.confidence:.0%}")
     
     # EasyChat配置
     table.add_row("EasyChat URL", config.easychat.url)
@@ -217,47 +648,154 @@ def print_config_info(config, args):
         table.add_row("分类过滤", args.category)
     if args.priority:
         table.add_row("优先级过滤", args.priority)
+    if args.only_scenario:
+        table.add_row("场景过滤", args.only_scenario)
+    if args.ids:
+        table.add_row("ID过滤", f"{len(args.ids)} 个")
+    if use_suite_index(args, config):
+        table.add_row("测试集索引", str(config.suite_index.dir))
     if args.limit:
         table.add_row("数量限制", str(args.limit))
     if args.skip > 0:
         table.add_row("跳过数量", str(args.skip))
+    if args.shard:
+        table.add_row("分片", args.shard)
     
     console.print(table)
     console.print()
 
+def print_resume_hint(evaluator):
+    """评估异常结束时提示如何从结果日志继续"""
+    if evaluator is not None and evaluator.journal is not None:
+        console.print(f"[yellow]已完成的结果保存在日志中，可使用 --resume {evaluator.journal.path} 继续评估[/yellow]")
+
+def draw_sample(evaluator, args, config):
+    """按命令行参数分层抽样，并启用抽样估计
+    
+    Returns:
+        样本中的测试用例列表
+    """
+    prior_scores = None
+    if args.sample_prior:
+        _, records = load_shard_results(args.sample_prior)
+        prior_scores = {record['test_id']: record['semantic_score'] for record in records}
+    if args.seed is None:
+        args.seed = random.randrange(2 ** 32)
+    
+    sample = StratifiedSample(
+        args.sample,
+        parse_stratify(args.stratify),
+        seed=args.seed,
+        allocation=args.allocation,
+        prior_scores=prior_scores,
+        confidence=args.confidence
+    )
+    cases = sample.draw(lambda: select_test_cases(evaluator, args, config))
+    evaluator.enable_sampling(sample)
+    console.print(f"[blue]🎲 分层抽样：从 {sum(sample.populations.values())} 个用例的 {len(sample.populations)} 层中"
+                  f"抽取 {len(cases)} 个 (种子 {args.seed})[/blue]")
+    return cases
+
+def prepare_sequential(evaluator, test_cases, args):
+    """打乱测试用例顺序并启用顺序评估的停止规则
+    
+    Returns:
+        打乱顺序后的测试用例列表
+    """
+    cases = list(test_cases)
+    if args.seed is None:
+        args.seed = random.randrange(2 ** 32)
+    random.Random(args.seed).shuffle(cases)
+    
+    # 场景用例总数包括从日志恢复的用例，用于有限总体校正；抽样时按整个测试集的场景用例数校正
+    if evaluator.sample:
+        scenario_totals = evaluator.sample.scenario_populations
+    else:
+        scenario_totals = Counter(tc.scenario for tc in cases)
+        scenario_totals.update(scenario for _, scenario, _ in evaluator._resumed_scores)
+    monitor = SequentialMonitor(
+        scenario_totals,
+        half_width=args.ci_half_width or None,
+        confidence=args.confidence,
+        threshold=args.pass_threshold,
+        min_cases=args.min_cases_per_scenario,
+        seed=args.seed
+    )
+    evaluator.enable_sequential(monitor)
+    console.print(f"[blue]🎯 顺序评估：{len(cases)} 个用例按随机顺序评估 (种子 {args.seed})[/blue]")
+    return cases
+
+def prepare_comparison(evaluator, test_cases, args):
+    """读取对比的基线结果，启用配对对比和回归判定的停止规则
+    
+    基线中有的用例按随机顺序排在前面，判定有结论时不再评估后面的用例；基线中没有的用例排在最后。
+    
+    Returns:
+        重新排序后的测试用例列表
+    """
+    _, records = load_shard_results(args.compare_to)
+    baseline = {record['test_id']: record['semantic_score'] for record in records}
+    cases = list(test_cases)
+    if args.seed is None:
+        args.seed = random.randrange(2 ** 32)
+    random.Random(args.seed).shuffle(cases)
+    cases.sort(key=lambda tc: tc.id not in baseline)
+    
+    comparison = PairedComparison(
+        baseline,
+        margin=args.regression_margin,
+        confidence=args.confidence,
+        early_stop=True
+    )
+    evaluator.enable_comparison(comparison)
+    paired = sum(1 for tc in cases if tc.id in baseline)
+    console.print(f"[blue]🆚 与基线对比：{args.compare_to} 中有 {len(baseline)} 个成功的用例，"
+                  f"本次可配对 {paired} 个，按随机顺序优先评估 (种子 {args.seed})[/blue]")
+    return cases
+
+def create_evaluator(args):
+    """按命令行参数创建评估器，评估器的API客户端在整个运行过程中只创建一次"""
+    from src.semantic_eval import SemanticEvaluator
+    if args.use_local_api:
+        return SemanticEvaluator(use_local_api=True, local_api_url=args.local_api_url,
+                                 use_cache=args.use_cache, answer_policy=args.answer_policy)
+    return SemanticEvaluator(use_cache=args.use_cache, answer_policy=args.answer_policy)
+
+def create_report_evaluator():
+    """创建仅用于加载测试用例和生成报告的评估器，不会发送任何请求"""
+    from src.semantic_eval import SemanticEvaluator
+    return SemanticEvaluator(use_local_api=True, use_cache=False, answer_policy='off')
+
 def run_evaluation(args, config):
     """运行评估"""
+    evaluator = None
     try:
         # 创建评估器
-        if args.use_local_api:
-            evaluator = SemanticEvaluator(use_local_api=True, local_api_url=args.local_api_url)
-        else:
-            evaluator = SemanticEvaluator()
+        evaluator = create_evaluator(args)
         
         # 干运行模式
         if args.dry_run:
             console.print("[yellow]🔍 干运行模式 - 验证配置...[/yellow]")
             
-            # 测试API连接
-            if args.use_local_api:
-                client = LocalAPIClient(args.local_api_url)
-                api_name = "本地EasyChat API"
-            else:
-                client = DeepSeekClient()
-                api_name = "DeepSeek API"
-                
-            if client.test_connection():
+            # 测试API连接（使用评估器的客户端，不另建客户端）
+            api_name = "本地EasyChat API" if args.use_local_api else "DeepSeek API"
+            if evaluator.api_client.test_connection():
                 console.print(f"[green]✓[/green] {api_name}连接正常")
             else:
                 console.print(f"[red]✗[/red] {api_name}连接失败")
             
-            # 加载测试用例
-            test_cases = evaluator.load_test_cases(args.test_file)
-            console.print(f"[green]✓[/green] 成功加载 {len(test_cases)} 个测试用例")
+            # 加载测试用例（逐个计数，不保留用例）
+            if use_suite_index(args, config):
+                index = SuiteIndex(args.test_file, config.suite_index.dir)
+                console.print(f"[green]✓[/green] 测试集索引{'已重新编译' if index.rebuilt else '可用'}: {index.path}")
+                total = index.count()
+            else:
+                total = sum(1 for _ in evaluator.iter_test_cases(args.test_file))
+            console.print(f"[green]✓[/green] 成功加载 {total} 个测试用例")
             
             # 应用过滤条件
-            filtered_cases = apply_filters(test_cases, args)
-            console.print(f"[green]✓[/green] 过滤后剩余 {len(filtered_cases)} 个测试用例")
+            filtered_count = sum(1 for _ in select_test_cases(evaluator, args, config))
+            console.print(f"[green]✓[/green] 过滤后剩余 {filtered_count} 个测试用例")
             
             console.print("[green]✓[/green] 配置验证完成，可以正常运行评估")
             return
@@ -265,102 +803,845 @@ def run_evaluation(args, config):
         # 正常运行模式
         console.print("[blue]🚀 开始语义相似度评估...[/blue]")
         
-        # 加载测试用例
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console
-        ) as progress:
-            task = progress.add_task("加载测试用例...", total=None)
-            test_cases = evaluator.load_test_cases(args.test_file)
-            progress.update(task, description=f"✓ 加载了 {len(test_cases)} 个测试用例")
-        
-        # 应用过滤条件
-        filtered_cases = apply_filters(test_cases, args)
+        # 从结果日志恢复（沿用日志中记录的分片）
+        if args.resume:
+            header = evaluator.resume_from_journal(args.resume)
+            if header.get('shard') and not args.shard:
+                args.shard = header['shard']
+            if not args.output:
+                args.output = header.get('output')
+            if header.get('baseline') and not args.incremental:
+                args.incremental = True
+                args.baseline = header['baseline']
+            if header.get('compare_to') and not args.compare_to:
+                args.compare_to = header['compare_to']['compare_to']
+                args.regression_margin = header['compare_to']['regression_margin']
+            if header.get('sample') and not args.sample:
+                # 沿用日志中记录的抽样参数，重新抽取同一个样本
+                for name, value in header['sample'].items():
+                    setattr(args, name, value)
         
-        if len(filtered_cases) == 0:
+        # 流式读取测试用例并应用过滤条件，用例在评估过程中按需读取
+        filtered_cases = select_test_cases(evaluator, args, config)
+        first_case = next(filtered_cases, None)
+        if first_case is None:
             console.print("[red]❌ 没有符合条件的测试用例[/red]")
             return
+        filtered_cases = itertools.chain([first_case], filtered_cases)
         
-        console.print(f"[green]📋 将评估 {len(filtered_cases)} 个测试用例[/green]")
+        # 分层抽样：重新读取测试集统计各层用例数后抽取样本
+        if args.sample:
+            filtered_cases = draw_sample(evaluator, args, config)
         
-        # 运行评估 - 带进度条
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TaskProgressColumn(),
-            TimeRemainingColumn(),
-            console=console
-        ) as progress:
-            # 创建进度任务
-            eval_task = progress.add_task("正在评估...", total=len(filtered_cases))
-            
-            # 定义进度回调函数
-            def progress_callback(current, total, test_id):
-                progress.update(
-                    eval_task, 
-                    completed=current + 1,
-                    description=f"正在评估 {test_id} ({current + 1}/{total})"
-                )
-            
-            # 运行评估
-            results = evaluator.evaluate_batch(filtered_cases, progress_callback=progress_callback)
+        # 跳过已完成的用例
+        if args.resume:
+            done_ids = evaluator.completed_test_ids()
+            filtered_cases = (tc for tc in filtered_cases if tc.id not in done_ids)
+            console.print(f"[green]♻️  从日志恢复 {len(done_ids)} 个已完成的用例，跳过这些用例继续评估[/green]")
+        
+        # 顺序评估需要先读取全部用例，打乱顺序后逐个评估
+        if args.sequential:
+            filtered_cases = prepare_sequential(evaluator, filtered_cases, args)
+        
+        # 与基线对比：基线中有的用例按随机顺序先评估
+        if args.compare_to:
+            filtered_cases = prepare_comparison(evaluator, filtered_cases, args)
         
         # 生成输出文件名
+        streaming = (args.output_format or config.output.format) == 'jsonl'
         if not args.output:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            args.output = f"results/evaluation_{timestamp}.json"
+            args.output = f"results/evaluation_{timestamp}.{'jsonl' if streaming else 'json'}"
             os.makedirs("results", exist_ok=True)
         
-        # 保存结果
+        # 每个完成的用例立即写入结果日志；流式输出模式下日志本身就是结果文件
+        if not args.resume:
+            journal_file = args.output if streaming else args.output.replace('.json', '.journal.jsonl')
+            evaluator.open_journal(journal_file, header={
+                'test_file': args.test_file,
+                'output': args.output,
+                'shard': args.shard,
+                'baseline': args.baseline if args.incremental else None,
+                'sample': {
+                    'sample': args.sample,
+                    'stratify': args.stratify,
+                    'allocation': args.allocation,
+                    'sample_prior': args.sample_prior,
+                    'seed': args.seed
+                } if args.sample else None,
+                'compare_to': {
+                    'compare_to': args.compare_to,
+                    'regression_margin': args.regression_margin
+                } if args.compare_to else None
+            }, streaming=streaming)
+        if args.shard:
+            evaluator.stats['shard'] = args.shard
+        evaluator.set_budget(args.max_tokens_budget, args.max_cost)
+        if args.bootstrap is not None:
+            evaluator.bootstrap_resamples = args.bootstrap
+        if evaluator.bootstrap_resamples and not online_stats.HAS_NUMPY:
+            console.print("[yellow]⚠️  未安装NumPy，报告中使用t分布置信区间代替bootstrap置信区间[/yellow]")
+        
+        # 增量评估：指纹未变化的用例沿用基线结果（写入结果日志），其余用例重新评估
+        if args.incremental:
+            baseline_stats, baseline = load_shard_results(args.baseline)
+            evaluator.set_baseline(baseline, baseline_stats)
+            filtered_cases = evaluator.plan_incremental(filtered_cases)
+            console.print(f"[blue]🔁 增量评估：基线 {args.baseline} 中有 {len(baseline)} 个成功的用例[/blue]")
+        trace_file = args.trace_file or config.output.trace_file
+        if trace_file:
+            evaluator.open_trace_export(trace_file)
+            console.print(f"[blue]⏱️  分阶段耗时追踪导出到: {trace_file}[/blue]")
+        
+        # 实时运行状态：HTTP服务（/status, /metrics）和进度条下方的仪表盘
+        status_server = None
+        status_address = args.status_server or config.status.address
+        if status_address or args.dashboard:
+            from src.status import RunMonitor, StatusServer
+            evaluator.status_monitor = RunMonitor(evaluator, config.status.window_seconds)
+        if status_address:
+            status_server = StatusServer(evaluator.status_monitor, *parse_address(status_address))
+            status_server.start()
+            console.print(f"[blue]📡 运行状态服务: {status_server.address}/status (JSON)，"
+                          f"{status_server.address}/metrics (Prometheus)[/blue]")
+        
+        try:
+            console.print("[green]📋 开始评估，测试用例边读取边评估[/green]")
+            
+            # 运行评估 - 带进度条
+            with DashboardProgress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                TimeRemainingColumn(),
+                TextColumn("{task.fields[pipeline]}"),
+                console=console,
+                dashboard=evaluator.status_monitor.snapshot if args.dashboard else None
+            ) as progress:
+                # 创建进度任务
+                # 流式读取时总数未知，进度条只显示已完成数量
+                eval_task = progress.add_task("正在评估...", total=None, pipeline="")
+            
+                # 定义进度回调函数
+                def progress_callback(current, total, test_id):
+                    progress.update(
+                        eval_task, 
+                        completed=current + 1,
+                        description=f"正在评估 {test_id} ({current + 1}/{total or '?'})",
+                        pipeline=format_pipeline_status(evaluator.pipeline)
+                    )
+            
+                # 运行评估
+                results = evaluator.evaluate_batch(
+                    filtered_cases,
+                    progress_callback=progress_callback,
+                    concurrency=args.concurrency or config.evaluation.concurrency,
+                    answer_workers=args.answer_workers,
+                    judge_workers=args.judge_workers,
+                    judge_batch_size=args.judge_batch_size
+                )
+        finally:
+            if status_server:
+                status_server.stop()
+        
+        # 保存结果（包含从日志恢复的结果）
+        evaluator.journal.close()
+        if evaluator.trace_exporter:
+            evaluator.trace_exporter.close()
         evaluator.save_results(args.output)
-        md_output = args.output.replace('.json', '.md')
-        console.print(f"[green]💾 JSON结果已保存到: {args.output}[/green]")
+        if not evaluator.keep_results:
+            md_output = args.output.replace('.jsonl', '.md')
+            console.print(f"[green]💾 JSONL结果已保存到: {args.output}[/green]")
+            console.print(f"[green]📊 汇总统计已保存到: {args.output.replace('.jsonl', '.summary.json')}[/green]")
+        else:
+            md_output = args.output.replace('.json', '.md')
+            console.print(f"[green]💾 JSON结果已保存到: {args.output}[/green]")
         console.print(f"[green]📄 Markdown摘要已保存到: {md_output}[/green]")
         
         # 显示摘要
         if not args.no_summary:
             evaluator.print_summary()
         
-        console.print("[green]🎉 评估完成！[/green]")
+        if 'early_stop' in evaluator.stats:
+            console.print(f"[green]🎯 {evaluator.stats['early_stop']}，已提前停止评估[/green]")
+        
+        if 'budget_exhausted' in evaluator.stats:
+            console.print(f"[yellow]💰 {evaluator.stats['budget_exhausted']}，已停止调度新用例[/yellow]")
+            print_resume_hint(evaluator)
+        else:
+            console.print("[green]🎉 评估完成！[/green]")
+        
+        # 与基线相比显著回归时以非零退出码结束，便于在CI中作为门禁
+        comparison = evaluator.stats.get('comparison')
+        if comparison and comparison['verdict'] == 'regression':
+            console.print(f"[red]📉 与基线 {args.compare_to} 相比显著回归"
+                          f"（平均分变化 {comparison['overall']['mean_delta']:+.2f}）[/red]")
+            sys.exit(1)
         
     except KeyboardInterrupt:
         console.print("\n[yellow]⚠️  用户中断评估[/yellow]")
+        print_resume_hint(evaluator)
         sys.exit(1)
     except Exception as e:
         console.print(f"[red]❌ 评估过程中发生错误: {e}[/red]")
         if args.verbose:
             console.print_exception()
+        print_resume_hint(evaluator)
+        sys.exit(1)
+
+def create_merge_parser():
+    """创建 merge 子命令的参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog='main.py merge',
+        description='合并各分片的评估结果，按全部结果重新计算汇总统计',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例用法:
+  %(prog)s results/shard_0.json results/shard_1.json -o results/merged.json
+  %(prog)s results/shard_*.jsonl -o results/merged.jsonl
+        """
+    )
+    
+    parser.add_argument(
+        'inputs',
+        nargs='+',
+        help='分片输出文件（JSON报告、JSONL结果文件或 *.summary.json）'
+    )
+    
+    parser.add_argument(
+        '--output', '-o',
+        type=str,
+        help='合并结果输出路径，以 .jsonl 结尾时按流式格式输出 (默认: 自动生成时间戳文件名)'
+    )
+    
+    parser.add_argument(
+        '--no-summary',
+        action='store_true',
+        help='不显示评估摘要'
+    )
+    
+    return parser
+
+def run_merge(args):
+    """合并分片结果并生成报告"""
+    missing = [path for path in args.inputs if not os.path.exists(path)]
+    if missing:
+        console.print("[red]❌ 参数验证失败:[/red]")
+        for path in missing:
+            console.print(f"  • 分片输出文件不存在: {path}")
+        sys.exit(1)
+    
+    try:
+        statistics, records = merge_shard_results(args.inputs)
+    except (ValueError, KeyError, OSError) as e:
+        console.print(f"[red]❌ 读取分片结果失败: {e}[/red]")
+        sys.exit(1)
+    
+    for warning in statistics.get('merge_warnings', []):
+        console.print(f"[yellow]⚠️  {warning}[/yellow]")
+    console.print(f"[green]📦 合并 {len(args.inputs)} 个分片，共 {len(records)} 个结果[/green]")
+    
+    if not args.output:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        args.output = f"results/merged_{timestamp}.json"
+        os.makedirs("results", exist_ok=True)
+    
+    evaluator = create_report_evaluator()
+    streaming = args.output.endswith('.jsonl')
+    if streaming:
+        evaluator.open_journal(args.output, header={
+            'output': args.output,
+            'merged_from': args.inputs
+        }, streaming=True)
+    evaluator.load_merged_results(records, statistics)
+    if not evaluator.save_results(args.output):
+        console.print("[red]❌ 保存合并结果失败，详见日志[/red]")
+        sys.exit(1)
+    
+    if streaming:
+        console.print(f"[green]💾 JSONL结果已保存到: {args.output}[/green]")
+        console.print(f"[green]📊 汇总统计已保存到: {args.output.replace('.jsonl', '.summary.json')}[/green]")
+        console.print(f"[green]📄 Markdown摘要已保存到: {args.output.replace('.jsonl', '.md')}[/green]")
+    else:
+        console.print(f"[green]💾 JSON结果已保存到: {args.output}[/green]")
+        console.print(f"[green]📄 Markdown摘要已保存到: {args.output.replace('.json', '.md')}[/green]")
+    
+    if not args.no_summary:
+        evaluator.print_summary()
+
+def create_watch_parser():
+    """创建 watch 子命令的参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog='main.py watch',
+        description='定期读取运行状态服务的 /status 接口，显示评估的实时仪表盘',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例用法:
+  %(prog)s http://127.0.0.1:9108
+  %(prog)s http://eval-host:9108 --interval 5
+        """
+    )
+    
+    parser.add_argument(
+        'url',
+        help='运行状态服务地址（评估时通过 --status-server 启动）'
+    )
+    
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=2.0,
+        help='刷新间隔秒数 (默认: 2)'
+    )
+    
+    return parser
+
+def run_watch(args):
+    """显示远程评估的实时仪表盘，评估结束或状态服务关闭后退出"""
+    import requests
+    
+    if args.interval <= 0:
+        console.print("[red]❌ interval 参数必须大于0[/red]")
+        sys.exit(1)
+    
+    url = args.url.rstrip('/')
+    if not url.startswith(('http://', 'https://')):
+        url = f"http://{url}"
+    
+    status = None
+    try:
+        with Live(console=console, auto_refresh=False) as live:
+            while True:
+                try:
+                    response = requests.get(f"{url}/status", timeout=max(args.interval, 5))
+                    response.raise_for_status()
+                    status = response.json()
+                except requests.RequestException:
+                    if status is None:
+                        raise
+                    break
+                live.update(build_dashboard(status), refresh=True)
+                if status['finished']:
+                    break
+                time.sleep(args.interval)
+    except requests.RequestException as e:
+        console.print(f"[red]❌ 无法读取运行状态: {e}[/red]")
         sys.exit(1)
+    except KeyboardInterrupt:
+        return
+    
+    if status['finished']:
+        console.print("[green]🎉 评估已完成[/green]")
+    else:
+        console.print("[yellow]⚠️  运行状态服务已关闭，评估已结束或已中断[/yellow]")
+
+def create_compare_parser():
+    """创建 compare 子命令的参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog='main.py compare',
+        description='把两次评估按用例ID配对，比较整体和各场景/分类的平均分变化（配对t检验），显著回归时退出码为1',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例用法:
+  %(prog)s results/baseline.json results/candidate.json
+  %(prog)s results/baseline.jsonl results/candidate.jsonl --margin 0.5 --confidence 0.99
+  %(prog)s results/baseline.json results/candidate.json --output results/compare.json
+        """
+    )
+    
+    parser.add_argument(
+        'baseline',
+        help='基线评估结果（JSON报告、JSONL结果文件或 *.summary.json）'
+    )
+    
+    parser.add_argument(
+        'candidate',
+        help='本次评估结果'
+    )
+    
+    parser.add_argument(
+        '--margin',
+        type=float,
+        default=1.0,
+        metavar='POINTS',
+        help='允许的平均分下降幅度（分），置信区间上界低于 -margin 时判定回归 (默认: 1.0)'
+    )
+    
+    parser.add_argument(
+        '--confidence',
+        type=float,
+        default=0.95,
+        help='置信水平，各场景/分类的区间按分组数做Bonferroni校正 (默认: 0.95)'
+    )
+    
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=10,
+        metavar='N',
+        help='列出下降最多的N个用例 (默认: 10)'
+    )
+    
+    parser.add_argument(
+        '--output', '-o',
+        type=str,
+        help='对比结果的JSON输出路径'
+    )
+    
+    return parser
+
+def print_comparison_groups(title, groups):
+    """打印各场景或分类的对比结果表格"""
+    table = Table(title=f"各{title}对比", show_header=True, header_style="bold magenta")
+    for column in (title, "配对数", "基线平均分", "平均分", "变化", "置信区间", "p值", "判定"):
+        table.add_column(column, style="cyan" if column == title else None)
+    for name, stats in groups.items():
+        interval = f"[{stats['ci'][0]:+.2f}, {stats['ci'][1]:+.2f}]" if stats['ci'] else "样本不足"
+        p_value = format_p_value(stats['p_value'])
+        style = {'regression': 'red', 'no_regression': 'green'}.get(stats['verdict'], 'yellow')
+        table.add_row(name, str(stats['pairs']), str(stats['baseline_mean']), str(stats['mean']),
+                      f"{stats['mean_delta']:+.2f}", interval, p_value,
+                      f"[{style}]{VERDICT_NAMES[stats['verdict']]}[/{style}]")
+    console.print(table)
+
+def run_compare(args):
+    """配对对比两次评估的结果，显著回归时以退出码1结束"""
+    errors = [f"评估结果不存在: {path}" for path in (args.baseline, args.candidate) if not os.path.exists(path)]
+    if not 0 < args.confidence < 1:
+        errors.append("confidence 参数应在0和1之间")
+    if args.margin < 0:
+        errors.append("margin 参数不能为负数")
+    if args.top < 0:
+        errors.append("top 参数不能为负数")
+    if errors:
+        console.print("[red]❌ 参数验证失败:[/red]")
+        for error in errors:
+            console.print(f"  • {error}")
+        sys.exit(1)
+    
+    try:
+        _, baseline = load_shard_results(args.baseline)
+        _, candidate = load_shard_results(args.candidate)
+    except (ValueError, KeyError, OSError) as e:
+        console.print(f"[red]❌ 读取评估结果失败: {e}[/red]")
+        sys.exit(1)
+    
+    comparison = PairedComparison(
+        {record['test_id']: record['semantic_score'] for record in baseline},
+        margin=args.margin,
+        confidence=args.confidence,
+        top=args.top
+    )
+    for record in candidate:
+        comparison.add(record['test_id'], record['semantic_score'], record['scenario'],
+                       record.get('category'), record.get('question'))
+    summary = comparison.summary()
+    overall = summary['overall']
+    
+    console.print(f"[blue]🆚 基线 {args.baseline} ({summary['baseline_cases']} 个) 与 {args.candidate} ({len(candidate)} 个)："
+                  f"配对 {summary['pairs']} 个，提高 {summary['improved']}，下降 {summary['regressed']}，"
+                  f"不变 {summary['unchanged']}，不在基线中 {summary['unmatched']}[/blue]")
+    if summary['pairs'] < 2:
+        console.print("[red]❌ 配对的用例不足2个，无法比较[/red]")
+        sys.exit(1)
+    
+    print_comparison_groups("场景", summary['scenarios'])
+    if summary['categories']:
+        print_comparison_groups("分类", summary['categories'])
+    
+    if summary['most_regressed']:
+        table = Table(title="下降最多的用例", show_header=True, header_style="bold magenta")
+        for column in ("用例ID", "场景", "基线分数", "分数", "变化", "问题"):
+            table.add_column(column, style="cyan" if column == "用例ID" else None)
+        for item in summary['most_regressed']:
+            question = item['question'] or ''
+            table.add_row(item['test_id'], item['scenario'], str(item['baseline_score']), str(item['score']),
+                          f"[red]{item['delta']:+.1f}[/red]", question[:40] + ('…' if len(question) > 40 else ''))
+        console.print(table)
+    
+    if args.output:
+        output_dir = os.path.dirname(args.output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'baseline': args.baseline, 'candidate': args.candidate, **summary}, f, ensure_ascii=False, indent=2)
+        console.print(f"[green]💾 对比结果已保存到: {args.output}[/green]")
+    
+    low, high = overall['ci']
+    message = (f"平均分 {overall['baseline_mean']} → {overall['mean']}，变化 {overall['mean_delta']:+.2f} "
+               f"[{low:+.2f}, {high:+.2f}]，p = {format_p_value(overall['p_value'])}，允许下降 {args.margin} 分")
+    if summary['verdict'] == 'regression':
+        console.print(f"[red]📉 显著回归：{message}[/red]")
+        sys.exit(1)
+    if summary['verdict'] == 'no_regression':
+        console.print(f"[green]✓ 没有回归：{message}[/green]")
+    else:
+        console.print(f"[yellow]⚠️  证据不足，无法判定是否回归：{message}[/yellow]")
+
+def parse_address(value):
+    """解析监听地址 [HOST:]PORT（协调者、运行状态服务）"""
+    host, _, port = value.rpartition(':')
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError(f"监听地址格式应为 [HOST:]PORT: {value}")
+    if not 0 <= port <= 65535:
+        raise ValueError(f"端口超出范围: {port}")
+    return host or '127.0.0.1', port
+
+def run_coordinator(args, config):
+    """以协调者模式运行：分发测试用例，等待worker完成后生成报告"""
+    from src.work_queue import LeaseQueue, CoordinatorServer
+    
+    evaluator = create_report_evaluator()
+    test_cases = select_test_cases(evaluator, args, config)
+    
+    if not args.output:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        args.output = f"results/evaluation_{timestamp}.json"
+        os.makedirs("results", exist_ok=True)
+    
+    # 队列文件与输出文件放在一起，协调者中断后以相同参数重新运行即可继续
+    queue_file = os.path.splitext(args.output)[0] + '.queue.sqlite'
+    queue = LeaseQueue(queue_file, lease_seconds=args.lease_seconds)
+    added = queue.add_tasks(asdict(tc) for tc in test_cases)
+    progress_info = queue.progress()
+    if not progress_info['total']:
+        queue.close()
+        console.print("[red]❌ 没有符合条件的测试用例[/red]")
+        return
+    
+    host, port = parse_address(args.coordinator)
+    server = CoordinatorServer(queue, host, port)
+    server.start()
+    console.print(f"[green]📡 协调者已启动: {server.address}，队列: {queue_file}[/green]")
+    console.print(f"[green]📋 队列中共 {progress_info['total']} 个用例（新加入 {added} 个，"
+                  f"已完成 {progress_info['done']} 个）[/green]")
+    console.print(f"[dim]启动worker: python main.py --worker http://<本机地址>:{server.server.server_address[1]}[/dim]")
+    
+    try:
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            TimeRemainingColumn(),
+            console=console
+        ) as progress:
+            task = progress.add_task("等待worker...", total=progress_info['total'])
+            while True:
+                progress_info = queue.progress()
+                progress.update(
+                    task,
+                    completed=progress_info['done'] + progress_info['failed'],
+                    description=(f"进行中 {progress_info['leased']} │ 失败 {progress_info['failed']} │ "
+                                 f"活跃worker {len(progress_info['active_workers'])}")
+                )
+                if progress_info['finished']:
+                    break
+                time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+        console.print(f"\n[yellow]⚠️  协调者已停止，以相同参数重新运行即可从队列 {queue_file} 继续[/yellow]")
+        sys.exit(1)
+    
+    # 等待worker收到完成信号后再关闭服务
+    time.sleep(1)
+    server.stop()
+    
+    statistics = queue.statistics()
+    evaluator.load_merged_results(queue.results(), statistics)
+    evaluator.save_results(args.output)
+    console.print(f"[green]💾 JSON结果已保存到: {args.output}[/green]")
+    console.print(f"[green]📄 Markdown摘要已保存到: {args.output.replace('.json', '.md')}[/green]")
+    for worker, count in statistics['workers'].items():
+        console.print(f"  [dim]worker {worker}: {count} 个用例[/dim]")
+    
+    if not args.no_summary:
+        evaluator.print_summary()
+    console.print("[green]🎉 评估完成！[/green]")
+
+def run_worker(args, config):
+    """以worker模式运行：从协调者领取测试用例评估"""
+    from src.work_queue import QueueWorker
+    
+    evaluator = create_evaluator(args)
+    
+    concurrency = args.concurrency or config.evaluation.concurrency
+    if config.http.prewarm:
+        evaluator.prewarm_connections(concurrency, concurrency)
+    worker = QueueWorker(evaluator, args.worker, worker_id=args.worker_id, concurrency=concurrency)
+    console.print(f"[blue]🔧 worker {worker.worker_id} 已连接协调者 {args.worker}，并发: {concurrency}[/blue]")
+    
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console
+    ) as progress:
+        task = progress.add_task("等待用例...", total=None)
+        
+        def progress_callback(test_id, result):
+            stats = worker.stats
+            progress.update(task, description=(
+                f"已完成 {stats['completed']} │ 失败 {stats['failed']} │ 最近: {test_id}"))
+        
+        try:
+            stats = worker.run(progress_callback)
+        except KeyboardInterrupt:
+            console.print("\n[yellow]⚠️  worker已停止，进行中的用例将在租约过期后由其他worker接手[/yellow]")
+            sys.exit(1)
+    
+    console.print(f"[green]🎉 队列已完成，本worker完成 {stats['completed']} 个用例，"
+                  f"失败 {stats['failed']} 个[/green]")
+
+def format_pipeline_status(pipeline):
+    """格式化流水线各阶段的队列深度和利用率"""
+    if pipeline is None:
+        return ""
+    
+    status = pipeline.snapshot()
+    answer, judge = status['answer'], status['judge']
+    return (
+        f"[dim]回答 {answer['busy']}/{answer['workers']} {answer['utilization']:.0%} │ "
+        f"队列 {status['queue_depth']}/{status['queue_size']} │ "
+        f"评估 {judge['busy']}/{judge['workers']} {judge['utilization']:.0%}[/dim]"
+    )
+
+class DashboardProgress(Progress):
+    """进度条下方附带实时仪表盘的进度显示，每次刷新时重新获取运行状态"""
+    
+    def __init__(self, *columns, dashboard=None, **kwargs):
+        self.dashboard = dashboard
+        super().__init__(*columns, refresh_per_second=4 if dashboard else 10, **kwargs)
+    
+    def get_renderables(self):
+        yield self.make_tasks_table(self.tasks)
+        if self.dashboard:
+            yield build_dashboard(self.dashboard())
+
+def format_seconds(value):
+    """格式化延迟：1秒以下显示毫秒"""
+    if value is None:
+        return "-"
+    return f"{value * 1000:.0f}ms" if value < 1 else f"{value:.2f}s"
+
+def build_dashboard(status):
+    """由运行状态（RunMonitor.snapshot 或 /status 接口的结果）生成紧凑的仪表盘表格"""
+    cases = status['cases']
+    rolling = status['rolling']
+    window = f"{rolling['window_seconds']:g}s"
+    
+    table = Table.grid(padding=(0, 2))
+    table.add_column(style="cyan", no_wrap=True)
+    table.add_column()
+    
+    finished = cases['completed'] + cases['failed']
+    elapsed = int(status['elapsed_seconds'])
+    table.add_row("进度", (
+        f"{finished}/{cases['total'] or '?'} │ 进行中 {cases['in_flight']} │ 失败 {cases['failed']}"
+        + (f" │ 已恢复 {cases['resumed']}" if cases['resumed'] else "")
+        + f" │ 已运行 {elapsed // 60:02d}:{elapsed % 60:02d}"
+    ))
+    table.add_row("吞吐量", f"{rolling['cases_per_second']:.2f} 个/秒 (近{window}) │ {status['throughput']:.2f} 个/秒 (全程)")
+    
+    error_style = "red" if rolling['error_rate'] >= 0.05 else "green"
+    table.add_row("错误率", (
+        f"[{error_style}]{rolling['error_rate']:.1%}[/{error_style}] (近{window}) │ {status['error_rate']:.1%} (全程) │ "
+        f"重试 {status['retries']} 次，近{window}每用例 {rolling['retries_per_case']:.2f} 次"
+    ))
+    
+    if status['average_score'] is not None:
+        score = f"{status['average_score']:.2f} (全程)"
+        if rolling['average_score'] is not None:
+            drift = status['score_drift']
+            drift_style = "yellow" if abs(drift) >= 5 else "dim"
+            score = (f"{rolling['average_score']:.2f} (近{window}) │ {score} │ "
+                     f"[{drift_style}]漂移 {drift:+.2f}[/{drift_style}]")
+        table.add_row("平均分", score)
+    
+    for stage in ('total', 'easychat', 'judge_request', 'rate_limit_wait'):
+        latency = rolling['latency'].get(stage)
+        if latency:
+            table.add_row(STAGE_NAMES.get(stage, stage), " / ".join(
+                f"p{q} {format_seconds(latency[f'p{q}'])}" for q in (50, 95, 99)
+            ) + f" │ max {format_seconds(latency['max'])}")
+    
+    for limiter in status['rate_limiters']:
+        throttled_style = "red" if limiter['throttled'] else "green"
+        table.add_row(f"限流 {limiter['name']}", (
+            f"{limiter['requests_per_second']:.2f} 请求/秒 │ "
+            f"[{throttled_style}]被限流 {limiter['throttled']} 次[/{throttled_style}] │ "
+            f"等待 {limiter['total_wait_time']:.1f} 秒"
+        ))
+    
+    pipeline = status['pipeline']
+    if pipeline:
+        answer, judge = pipeline['answer'], pipeline['judge']
+        table.add_row("流水线", (
+            f"回答 {answer['busy']}/{answer['workers']} {answer['utilization']:.0%} │ "
+            f"队列 {pipeline['queue_depth']}/{pipeline['queue_size']} │ "
+            f"评估 {judge['busy']}/{judge['workers']} {judge['utilization']:.0%}"
+        ))
+    
+    usage = status['usage']
+    if usage['total_tokens']:
+        table.add_row("Token", f"{usage['total_tokens']} │ 费用 {usage['cost']:.4f} {usage['currency']}")
+    if status['stopped']:
+        table.add_row("已停止调度", f"[yellow]{status['stopped']}[/yellow]")
+    return Panel(table, title="运行状态", border_style="blue", expand=False)
+
+def print_cache_stats(config):
+    """打印评估结果缓存和回答存储的统计信息"""
+    stores = [
+        ("评估结果缓存", JudgeCache, config.cache.path, config.cache.max_entries,
+         f"{config.cache.max_age_days or '不限'} 天"),
+        ("EasyChat回答存储", AnswerStore, config.answer_store.path, config.answer_store.max_entries,
+         f"TTL {config.answer_store.ttl_days or '不限'} 天"),
+    ]
+    
+    for title, store_class, path, max_entries, age_limit in stores:
+        if not Path(path).exists():
+            console.print(f"[yellow]{title}不存在: {path}[/yellow]")
+            continue
+        
+        store = store_class(path)
+        stats = store.get_stats()
+        store.close()
+        
+        table = Table(title=title, show_header=True, header_style="bold magenta")
+        table.add_column("项目", style="cyan")
+        table.add_column("值", style="green")
+        table.add_row("文件", stats['path'])
+        table.add_row("条目数", str(stats['entries']))
+        table.add_row("文件大小", f"{stats['size_bytes'] / 1024 / 1024:.2f} MB")
+        table.add_row("最早条目", stats['oldest_entry'] or "-")
+        table.add_row("最新条目", stats['newest_entry'] or "-")
+        table.add_row("条目上限", str(max_entries or "不限"))
+        table.add_row("保存期限", age_limit)
+        console.print(table)
+
+def use_suite_index(args, config) -> bool:
+    """是否通过测试集索引选择测试用例"""
+    return args.use_index if args.use_index is not None else config.suite_index.enabled
+
+def select_test_cases(evaluator, args, config):
+    """按命令行参数选择测试用例
+    
+    启用测试集索引时过滤和切片在索引上查询，否则流式读取源文件后逐个过滤。
+    """
+    if use_suite_index(args, config):
+        return evaluator.iter_indexed_test_cases(
+            args.test_file,
+            skip=args.skip,
+            limit=args.limit,
+            category=args.category,
+            priority=args.priority,
+            scenario=args.only_scenario,
+            ids=args.ids,
+            shard=parse_shard(args.shard) if args.shard else None
+        )
+    return apply_filters(evaluator.iter_test_cases(args.test_file), args)
 
 def apply_filters(test_cases, args):
-    """应用过滤条件"""
-    filtered = test_cases
+    """应用过滤条件
+    
+    返回惰性迭代器，测试用例逐个经过过滤条件，不会把整个测试集读入内存；
+    达到 --limit 后不再继续读取测试集。
+    """
+    filtered = iter(test_cases)
     
     # 分类过滤
     if args.category:
-        filtered = [tc for tc in filtered if tc.get('category') == args.category]
+        filtered = (tc for tc in filtered if tc.category == args.category)
     
     # 优先级过滤
     if args.priority:
-        filtered = [tc for tc in filtered if tc.get('priority') == args.priority]
+        filtered = (tc for tc in filtered if tc.priority == args.priority)
     
-    # 跳过和限制
-    if args.skip > 0:
-        filtered = filtered[args.skip:]
+    # 场景过滤
+    if args.only_scenario:
+        filtered = (tc for tc in filtered if tc.scenario == args.only_scenario)
     
-    if args.limit:
-        filtered = filtered[:args.limit]
+    # ID过滤
+    if args.ids:
+        ids = set(args.ids)
+        filtered = (tc for tc in filtered if tc.id in ids)
+    
+    # 分片（在跳过和限制之前，保证各分片的划分只取决于用例ID）
+    if args.shard:
+        index, count = parse_shard(args.shard)
+        filtered = (tc for tc in filtered if shard_of(tc.id, count) == index)
+    
+    # 跳过和限制
+    if args.skip > 0 or args.limit:
+        stop = args.skip + args.limit if args.limit else None
+        filtered = itertools.islice(filtered, args.skip, stop)
     
     return filtered
 
+def run_startup_profile(argv):
+    """以 -X importtime 运行同一命令，结束后打印导入耗时汇总，并以该命令的退出码退出"""
+    returncode, wall_time, records = startup_profile.run_profiled(__file__, argv)
+    profile = startup_profile.summarize(records)
+    
+    console.print()
+    console.print(f"[bold]⏱️  启动耗时分析[/bold]: 进程总耗时 {wall_time:.3f} 秒，"
+                  f"导入 {profile['modules']} 个模块共 {profile['import_seconds']:.3f} 秒")
+    
+    table = Table(title="按顶层包汇总的导入耗时", show_header=True, header_style="bold magenta")
+    table.add_column("包", style="cyan")
+    table.add_column("模块数", justify="right")
+    table.add_column("耗时", justify="right", style="green")
+    for item in profile['packages']:
+        table.add_row(item['package'], str(item['modules']), f"{item['seconds'] * 1000:.1f} ms")
+    console.print(table)
+    
+    table = Table(title="直接导入的模块（含其依赖的累计耗时）", show_header=True, header_style="bold magenta")
+    table.add_column("模块", style="cyan")
+    table.add_column("累计耗时", justify="right", style="green")
+    for item in profile['top_level']:
+        table.add_row(item['module'], f"{item['seconds'] * 1000:.1f} ms")
+    console.print(table)
+    sys.exit(returncode)
+
+def load_config(config_file=None):
+    """获取全局配置，指定配置文件时原地重新加载，各模块共享同一个配置实例"""
+    from config.config import config
+    if config_file:
+        config.reload(config_file)
+    return config
+
 def main():
     """主函数"""
+    # 启动耗时分析：在被分析的子进程中运行同一命令
+    if '--print-startup-profile' in sys.argv[1:] and not startup_profile.profiling_active():
+        run_startup_profile([arg for arg in sys.argv[1:] if arg != '--print-startup-profile'])
+    
+    # 合并分片结果子命令
+    if len(sys.argv) > 1 and sys.argv[1] == 'merge':
+        run_merge(create_merge_parser().parse_args(sys.argv[2:]))
+        return
+    
+    # 查看运行状态子命令
+    if len(sys.argv) > 1 and sys.argv[1] == 'watch':
+        run_watch(create_watch_parser().parse_args(sys.argv[2:]))
+        return
+    
+    # 对比两次评估结果子命令
+    if len(sys.argv) > 1 and sys.argv[1] == 'compare':
+        run_compare(create_compare_parser().parse_args(sys.argv[2:]))
+        return
+    
     # 解析命令行参数
     parser = create_parser()
     args = parser.parse_args()
     
+    # 只查看缓存统计
+    if args.cache_stats:
+        print_cache_stats(load_config(args.config))
+        return
+    
     # 打印横幅
     if not args.dry_run:
         print_banner()
@@ -375,14 +1656,19 @@ def main():
     
     try:
         # 加载配置
-        config = SystemConfig(config_file=args.config)
+        config = load_config(args.config)
         
         # 显示配置信息
         if args.verbose or args.dry_run:
             print_config_info(config, args)
         
         # 运行评估
-        run_evaluation(args, config)
+        if args.coordinator:
+            run_coordinator(args, config)
+        elif args.worker:
+            run_worker(args, config)
+        else:
+            run_evaluation(args, config)
         
     except Exception as e:
         console.print(f"[red]❌ 初始化失败: {e}[/red]")
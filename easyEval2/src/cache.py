@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化缓存模块
+基于SQLite(WAL模式)的内容寻址缓存，支持多进程同时读写
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+class SQLiteCache:
+    """SQLite缓存基类
+
+    使用WAL日志模式和busy超时，允许多个评估进程共享同一个缓存文件。
+    进程内通过锁串行化对连接的访问。
+    """
+
+    # 子类定义的表名和建表语句
+    TABLE = ''
+    SCHEMA = ''
+
+    def __init__(self, path: str, max_entries: int = 0, max_age_days: float = 0):
+        """初始化缓存
+
+        Args:
+            path: 缓存数据库文件路径
+            max_entries: 最大条目数，超出时按最近访问时间淘汰，0表示不限制
+            max_age_days: 条目最长保存天数，0表示不限制
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(self.SCHEMA)
+        self._conn.execute(
+            f'CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_last_access ON {self.TABLE}(last_access)')
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """根据内容计算缓存键（SHA-256）"""
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def record_miss(self):
+        """记录一次未经查询即重新生成的未命中（如强制刷新）"""
+        with self._lock:
+            self.misses += 1
+
+    def evict(self) -> int:
+        """按年龄和条目数淘汰缓存，返回删除的条目数"""
+        removed = 0
+        with self._lock:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                cursor = self._conn.execute(
+                    f'DELETE FROM {self.TABLE} WHERE created_at < ?', (cutoff,))
+                removed += cursor.rowcount
+
+            if self.max_entries:
+                cursor = self._conn.execute(
+                    f'DELETE FROM {self.TABLE} WHERE key IN ('
+                    f'SELECT key FROM {self.TABLE} ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,))
+                removed += cursor.rowcount
+
+            self._conn.commit()
+
+        if removed:
+            self.logger.info(f"缓存 {self.path.name} 淘汰 {removed} 个条目")
+        return removed
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute(f'DELETE FROM {self.TABLE}')
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            entries, oldest, newest = self._conn.execute(
+                f'SELECT COUNT(*), MIN(created_at), MAX(created_at) FROM {self.TABLE}').fetchone()
+
+        size = sum(p.stat().st_size for p in self.path.parent.glob(self.path.name + '*'))
+        lookups = self.hits + self.misses
+        return {
+            'path': str(self.path),
+            'entries': entries,
+            'size_bytes': size,
+            'oldest_entry': _format_time(oldest),
+            'newest_entry': _format_time(newest),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+class JudgeCache(SQLiteCache):
+    """评估结果缓存
+
+    以评估模型、完整渲染后的提示词消息和温度的哈希作为键，
+    命中时直接返回保存的 score/reason/dimensions，不再请求评估模型。
+    """
+
+    TABLE = 'judge_cache'
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS judge_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            score REAL NOT NULL,
+            reason TEXT NOT NULL,
+            dimensions TEXT,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """
+
+    def make_judge_key(self, model: str, messages: List[Dict[str, str]],
+                       temperature: float) -> str:
+        """计算评估请求的缓存键"""
+        return self.make_key(model, messages, temperature)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询缓存，未命中返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT score, reason, dimensions FROM judge_cache WHERE key = ?', (key,)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                'UPDATE judge_cache SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+
+        score, reason, dimensions = row
+        result = {
+            'score': int(score) if float(score).is_integer() else score,
+            'reason': reason,
+            'cached': True
+        }
+        if dimensions:
+            result['dimensions'] = json.loads(dimensions)
+        return result
+
+    def put(self, key: str, model: str, evaluation: Dict[str, Any]):
+        """保存评估结果"""
+        now = time.time()
+        dimensions = evaluation.get('dimensions')
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO judge_cache '
+                '(key, model, score, reason, dimensions, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, model, evaluation['score'], evaluation['reason'],
+                 json.dumps(dimensions, ensure_ascii=False) if dimensions else None, now, now))
+            self._conn.commit()
+
+class AnswerStore(SQLiteCache):
+    """EasyChat回答存储
+
+    以问题文本、EasyChat服务地址和服务端版本标识（系统提示词与模型的哈希）为键，
+    在问题和服务端都未变化时复用已生成的回答，只重新进行评估。
+    条目超过有效期(TTL)后视为失效，超出条目上限时按最近访问时间(LRU)淘汰。
+    """
+
+    TABLE = 'answer_store'
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS answer_store (
+            key TEXT PRIMARY KEY,
+            endpoint TEXT NOT NULL,
+            version TEXT NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """
+
+    def make_answer_key(self, question: str, endpoint: str, version: str) -> str:
+        """计算回答的存储键"""
+        return self.make_key(question, endpoint, version)
+
+    def get(self, key: str) -> Optional[str]:
+        """查询回答，未命中或已过期返回None"""
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days else 0
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT answer FROM answer_store WHERE key = ? AND created_at >= ?',
+                (key, cutoff)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                'UPDATE answer_store SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+
+        return row[0]
+
+    def put(self, key: str, question: str, endpoint: str, version: str, answer: str):
+        """保存回答"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO answer_store '
+                '(key, endpoint, version, question, answer, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, endpoint, version, question, answer, now, now))
+            self._conn.commit()
+
+def _format_time(timestamp: Optional[float]) -> Optional[str]:
+    """将时间戳格式化为可读字符串"""
+    if timestamp is None:
+        return None
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行对比模块
+把两次评估按用例ID配对，计算整体和各场景/分类的分数差异、配对t检验和置信区间，
+列出下降最多的用例；与评估同时运行时，回归判定已有统计结论即可提前停止
+"""
+
+import heapq
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.online_stats import RunningStats, t_pvalue, t_quantile
+
+# 提前停止前至少需要的配对用例数
+MIN_PAIRS = 20
+
+VERDICT_NAMES = {
+    'regression': '显著回归',
+    'no_regression': '没有回归',
+    'undecided': '证据不足'
+}
+
+def format_p_value(p_value: Optional[float]) -> str:
+    """格式化p值，过小的p值显示为 <0.0001"""
+    if p_value is None:
+        return '-'
+    return '<0.0001' if p_value < 1e-4 else f"{p_value:.4f}"
+
+class _PairStats:
+    """一组配对用例的基线分数、新分数和分数差异统计"""
+
+    __slots__ = ('baseline', 'candidate', 'delta')
+
+    def __init__(self):
+        self.baseline = RunningStats()
+        self.candidate = RunningStats()
+        self.delta = RunningStats()
+
+    def add(self, baseline: float, candidate: float):
+        self.baseline.add(baseline)
+        self.candidate.add(candidate)
+        self.delta.add(candidate - baseline)
+
+class PairedComparison:
+    """与基线配对的回归判定
+
+    每个同时出现在基线和本次评估中的用例贡献一个分数差异（本次 - 基线），
+    对差异的均值做配对t检验并计算置信区间，按允许的下降幅度 margin 判定：
+    - 置信区间上界低于 -margin：显著回归（regression）
+    - 置信区间下界不低于 -margin：没有超出允许幅度的回归（no_regression）
+    - 其他：证据不足（undecided）
+    各场景/分类的区间按分组数做Bonferroni校正，避免分组较多时误报。
+
+    注意：评估过程中每完成一个用例检查一次判定（多次查看），实际误判率会略高于名义水平，
+    用于发布门禁时可提高 confidence。
+    """
+
+    def __init__(self, baseline: Dict[str, float], margin: float = 1.0, confidence: float = 0.95,
+                 top: int = 10, min_pairs: int = MIN_PAIRS, early_stop: bool = False):
+        """初始化对比
+
+        Args:
+            baseline: 基线分数 {用例ID: 分数}
+            margin: 允许的平均分下降幅度（分）
+            confidence: 置信水平
+            top: 保留的下降最多的用例数
+            min_pairs: 提前停止前至少需要的配对用例数
+            early_stop: 是否在判定有结论时停止调度新用例（与评估同时运行）
+
+        Raises:
+            ValueError: 参数无效
+        """
+        if not 0 < confidence < 1:
+            raise ValueError(f"置信水平应在0和1之间: {confidence}")
+        if margin < 0:
+            raise ValueError(f"允许的下降幅度不能为负数: {margin}")
+        self.baseline = baseline
+        self.margin = margin
+        self.confidence = confidence
+        self.top = top
+        self.min_pairs = max(min_pairs, 2)
+        self.early_stop = early_stop
+
+        self.overall = _PairStats()
+        self.scenarios: Dict[str, _PairStats] = {}
+        self.categories: Dict[str, _PairStats] = {}
+        self.improved = 0
+        self.regressed = 0
+        self.unmatched = 0
+        self._seen: set = set()
+        # 下降最多的用例（按差异取负的小顶堆，堆顶是保留用例中下降最少的）
+        self._worst: List[Tuple[float, str, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        self.stop_reason: Optional[str] = None
+
+    def add(self, test_id: str, score: float, scenario: str, category: Optional[str] = None,
+            question: Optional[str] = None):
+        """加入一个本次评估的用例，基线中没有的用例只计数"""
+        with self._lock:
+            if test_id in self._seen:
+                return
+            self._seen.add(test_id)
+            base = self.baseline.get(test_id)
+            if base is None:
+                self.unmatched += 1
+                return
+
+            delta = score - base
+            self.overall.add(base, score)
+            self.scenarios.setdefault(scenario, _PairStats()).add(base, score)
+            if category is not None:
+                self.categories.setdefault(category, _PairStats()).add(base, score)
+            if delta > 0:
+                self.improved += 1
+            elif delta < 0:
+                self.regressed += 1
+                entry = (-delta, test_id, {
+                    'test_id': test_id,
+                    'scenario': scenario,
+                    'category': category,
+                    'baseline_score': base,
+                    'score': score,
+                    'delta': delta,
+                    'question': question
+                })
+                if len(self._worst) < self.top:
+                    heapq.heappush(self._worst, entry)
+                elif self._worst and entry[:2] > self._worst[0][:2]:
+                    heapq.heapreplace(self._worst, entry)
+
+    def _estimate(self, stats: _PairStats, confidence: float) -> Dict[str, Any]:
+        """一组配对用例的差异估计、配对t检验和判定"""
+        delta = stats.delta
+        n = delta.count
+        estimate = {
+            'pairs': n,
+            'baseline_mean': round(stats.baseline.mean, 3) if n else None,
+            'mean': round(stats.candidate.mean, 3) if n else None,
+            'mean_delta': round(delta.mean, 3) if n else None,
+            'ci': None,
+            't': None,
+            'p_value': None,
+            'verdict': 'undecided'
+        }
+        if n < 2:
+            return estimate
+
+        se = delta.stdev / math.sqrt(n)
+        half = t_quantile((1 + confidence) / 2, n - 1) * se
+        low, high = delta.mean - half, delta.mean + half
+        if se:
+            t = delta.mean / se
+        else:
+            t = 0.0 if delta.mean == 0 else math.copysign(math.inf, delta.mean)
+        estimate['ci'] = [round(low, 3), round(high, 3)]
+        estimate['t'] = round(t, 3) if math.isfinite(t) else None
+        estimate['p_value'] = round(t_pvalue(t, n - 1), 6)
+        if high < -self.margin:
+            estimate['verdict'] = 'regression'
+        elif low >= -self.margin:
+            estimate['verdict'] = 'no_regression'
+        return estimate
+
+    def _groups(self, groups: Dict[str, _PairStats]) -> Dict[str, Dict[str, Any]]:
+        """各分组的估计，置信水平按分组数做Bonferroni校正"""
+        confidence = 1 - (1 - self.confidence) / max(len(groups), 1)
+        return {name: self._estimate(stats, confidence) for name, stats in sorted(groups.items())}
+
+    def check(self) -> Optional[str]:
+        """评估过程中检查回归判定是否已有结论，有结论时返回停止原因"""
+        if not self.early_stop:
+            return None
+        with self._lock:
+            if self.stop_reason:
+                return self.stop_reason
+            if self.overall.delta.count < self.min_pairs:
+                return None
+            estimate = self._estimate(self.overall, self.confidence)
+            low, high = estimate['ci']
+            if estimate['verdict'] == 'regression':
+                self.stop_reason = (f"与基线相比平均分变化 {estimate['mean_delta']:+.2f} [{low:+.2f}, {high:+.2f}]，"
+                                    f"显著超出允许的下降幅度 {self.margin}，判定回归")
+            elif estimate['verdict'] == 'no_regression':
+                self.stop_reason = (f"与基线相比平均分变化 {estimate['mean_delta']:+.2f} [{low:+.2f}, {high:+.2f}]，"
+                                    f"下降不超过允许的幅度 {self.margin}，判定没有回归")
+            return self.stop_reason
+
+    def summary(self) -> Dict[str, Any]:
+        """整体和各场景/分类的对比结果及下降最多的用例"""
+        with self._lock:
+            overall = self._estimate(self.overall, self.confidence)
+            pairs = self.overall.delta.count
+            return {
+                'margin': self.margin,
+                'confidence': self.confidence,
+                'baseline_cases': len(self.baseline),
+                'pairs': pairs,
+                'unmatched': self.unmatched,
+                'improved': self.improved,
+                'regressed': self.regressed,
+                'unchanged': pairs - self.improved - self.regressed,
+                'verdict': overall['verdict'],
+                'overall': overall,
+                'scenarios': self._groups(self.scenarios),
+                'categories': self._groups(self.categories),
+                'most_regressed': [item for _, _, item in sorted(self._worst, reverse=True)],
+                'stop_reason': self.stop_reason
+            }
@@ -5,12 +5,15 @@ DeepSeek API客户端模块
 负责封装API调用逻辑和处理认证
 """
 
-import json
-import time
 import logging
-from typing import Dict, List, Optional, Any
-from openai import OpenAI
+import threading
+from typing import Dict, List, Optional, Any, Tuple
 from config.config import config
+from config.prompts import PromptBuilder
+from src.rate_limiter import get_rate_limiter, estimate_tokens
+from src import tracing
+from src.usage import extract_usage
+from src.judge_output import EvaluationParser
 
 class DeepSeekClient:
     """DeepSeek API客户端"""
@@ -23,27 +26,62 @@ class DeepSeekClient:
         if not config.deepseek.api_key:
             raise ValueError("DeepSeek API密钥未配置，请检查.env文件")
         
-        # 初始化OpenAI客户端
+        # 初始化OpenAI客户端（重试由本客户端配合限流器处理）
+        # openai包导入耗时较长，只在创建客户端时导入，使用本地API或只查看帮助时不需要
+        from openai import OpenAI
         self.client = OpenAI(
             api_key=config.deepseek.api_key,
-            base_url=config.deepseek.base_url
+            base_url=config.deepseek.base_url,
+            max_retries=0
         )
         
         self.model = config.deepseek.model
         self.max_retries = config.request.max_retries
         self.request_timeout = config.request.timeout
-        self.request_interval = config.request.interval
+        
+        # JSON输出模式，服务端拒绝 response_format 参数时关闭
+        self.json_mode = config.deepseek.json_mode
+        
+        # 评估结果解析器（容错提取、本地修复，最后才发送修复请求）
+        self.parser = EvaluationParser(
+            repair=self._request_repair if config.evaluation.repair_prompt else None)
+        
+        # 进程内共享的自适应限流器
+        self.rate_limiter = get_rate_limiter('deepseek')
+        
+        # 评估结果缓存（由评估器按需设置）
+        self.cache = None
+        
+        # 批量评估统计（多个评估线程共享）
+        self._batch_lock = threading.Lock()
+        self.batch_stats = {
+            'requests': 0,
+            'items': 0,
+            'rejudged': 0
+        }
         
         self.logger.info(f"DeepSeek客户端初始化完成，模型: {self.model}")
     
     def chat_completion(self, messages: List[Dict[str, str]], 
                        temperature: float = 0.1,
-                       max_tokens: Optional[int] = None) -> Optional[str]:
-        """发送聊天完成请求"""
+                       max_tokens: Optional[int] = None,
+                       json_mode: bool = False) -> Optional[str]:
+        """发送聊天完成请求
+        
+        json_mode 为 True 且服务端支持时要求模型只输出一个JSON对象。
+        """
+        
+        reserved_tokens = estimate_tokens(messages, max_tokens)
         
         for attempt in range(self.max_retries):
             try:
                 self.logger.debug(f"发送API请求，尝试 {attempt + 1}/{self.max_retries}")
+                if attempt > 0:
+                    tracing.record_retry()
+                
+                # 等待限流器许可
+                with tracing.span('rate_limit_wait'):
+                    self.rate_limiter.acquire(reserved_tokens)
                 
                 # 构建请求参数
                 request_params = {
@@ -55,19 +93,23 @@ class DeepSeekClient:
                 
                 if max_tokens:
                     request_params["max_tokens"] = max_tokens
+                if json_mode and self.json_mode:
+                    request_params["response_format"] = {"type": "json_object"}
                 
-                # 发送请求
-                response = self.client.chat.completions.create(**request_params)
+                # 发送请求（读取原始响应以统计收发字节数）
+                with tracing.span('judge_request', attempt=attempt + 1):
+                    raw_response = self.client.chat.completions.with_raw_response.create(**request_params)
+                    response = raw_response.parse()
+                tracing.record_bytes(len(raw_response.http_request.content or b''), len(raw_response.content))
+                
+                used_tokens = response.usage.total_tokens if getattr(response, 'usage', None) else None
+                tracing.record_usage(extract_usage(getattr(response, 'usage', None)))
+                self.rate_limiter.record_success(used_tokens, reserved_tokens)
                 
                 # 提取回复内容
                 if response.choices and len(response.choices) > 0:
                     content = response.choices[0].message.content
                     self.logger.debug(f"API请求成功，返回内容长度: {len(content) if content else 0}")
-                    
-                    # 请求间隔
-                    if self.request_interval > 0:
-                        time.sleep(self.request_interval)
-                    
                     return content
                 else:
                     self.logger.warning("API返回空响应")
@@ -76,27 +118,53 @@ class DeepSeekClient:
             except Exception as e:
                 self.logger.error(f"API请求失败 (尝试 {attempt + 1}/{self.max_retries}): {str(e)}")
                 
-                if attempt < self.max_retries - 1:
-                    # 指数退避
-                    wait_time = (2 ** attempt) * self.request_interval
-                    self.logger.info(f"等待 {wait_time} 秒后重试...")
-                    time.sleep(wait_time)
-                else:
+                # 429/5xx/网络错误：通知限流器退避，下一次acquire会按降低后的速率等待
+                status_code = getattr(e, 'status_code', None)
+                if status_code is None or status_code == 429 or status_code >= 500:
+                    self.rate_limiter.record_throttle(self._get_retry_after(e))
+                elif status_code == 400 and json_mode and self.json_mode:
+                    # 服务端不支持JSON输出模式，之后的请求不再使用
+                    self.logger.warning("服务端不支持JSON输出模式，改为普通输出")
+                    self.json_mode = False
+                
+                if attempt == self.max_retries - 1:
                     self.logger.error("所有重试均失败")
                     return None
         
         return None
     
+    def _get_retry_after(self, error: Exception) -> Optional[float]:
+        """从错误响应中读取Retry-After头"""
+        
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if not headers:
+            return None
+        
+        try:
+            return float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+    
     def evaluate_semantic_similarity(self, question: str, answer: str, 
                                    scenario: str = 'general') -> Optional[Dict[str, Any]]:
         """评估语义相似度"""
         
-        from config.prompts import PromptBuilder
-        
         try:
             # 构建提示词
-            prompt_builder = PromptBuilder(scenario)
-            messages = prompt_builder.build_messages(question, answer)
+            with tracing.span('prompt_build'):
+                prompt_builder = PromptBuilder.for_scenario(scenario)
+                messages = prompt_builder.build_messages(question, answer)
+            
+            # 查询评估结果缓存
+            cache_key = None
+            if self.cache:
+                with tracing.span('cache_lookup'):
+                    cache_key = self.cache.make_judge_key(self.model, messages, 0.1)
+                    cached = self.cache.get(cache_key)
+                if cached:
+                    self.logger.info(f"评估结果缓存命中，得分: {cached['score']}")
+                    return cached
             
             self.logger.info(f"开始评估语义相似度，场景: {scenario}")
             self.logger.debug(f"问题: {question[:100]}...")
@@ -106,98 +174,127 @@ class DeepSeekClient:
             response_content = self.chat_completion(
                 messages=messages,
                 temperature=0.1,
-                max_tokens=1000
+                max_tokens=1000,
+                json_mode=True
             )
             
             if not response_content:
                 self.logger.error("API请求失败，无法获取评估结果")
                 return None
             
-            # 解析JSON响应
-            try:
-                result = json.loads(response_content)
-                
-                # 验证响应格式
-                if not self._validate_evaluation_result(result):
-                    self.logger.error("API返回的评估结果格式不正确")
-                    return None
-                
-                self.logger.info(f"评估完成，得分: {result.get('score', 0)}")
-                return result
-                
-            except json.JSONDecodeError as e:
-                self.logger.error(f"解析API响应JSON失败: {str(e)}")
-                self.logger.debug(f"原始响应: {response_content}")
-                
-                # 尝试提取分数（降级处理）
-                return self._extract_score_fallback(response_content)
+            # 解析评估结果（容错提取JSON并在本地修复，必要时发送修复请求）
+            with tracing.span('parse'):
+                result = self.parser.parse(response_content)
+            if not result:
+                return None
+            
+            self.logger.info(f"评估完成，得分: {result['score']}")
+            if cache_key:
+                self.cache.put(cache_key, self.model, result)
+            return result
                 
         except Exception as e:
             self.logger.error(f"评估过程发生错误: {str(e)}")
             return None
     
-    def _validate_evaluation_result(self, result: Dict[str, Any]) -> bool:
-        """验证评估结果格式"""
-        
-        # 检查必需字段
-        required_fields = ['score', 'reason']
-        for field in required_fields:
-            if field not in result:
-                self.logger.error(f"缺少必需字段: {field}")
-                return False
+    def evaluate_semantic_similarity_batch(self, pairs: List[Tuple[str, str]],
+                                           scenario: str = 'general') -> List[Optional[Dict[str, Any]]]:
+        """批量评估语义相似度
         
-        # 检查分数范围
-        score = result.get('score')
-        if not isinstance(score, (int, float)) or score < 0 or score > 100:
-            self.logger.error(f"分数超出范围 [0-100]: {score}")
-            return False
+        将多个问答对放入同一个请求，要求评估模型按编号返回JSON数组，
+        共享一份系统提示词。返回结果中缺失或格式错误的问答对会单独重新评估。
         
-        # 检查维度分数（可选）
-        if 'dimensions' in result:
-            dimensions = result['dimensions']
-            if not isinstance(dimensions, dict):
-                self.logger.error("dimensions字段格式错误")
-                return False
+        Args:
+            pairs: (问题, 回答) 列表，应属于同一评估场景
+            scenario: 评估场景
             
-            # 检查维度分数总和
-            total_dimension_score = sum(dimensions.values())
-            if abs(total_dimension_score - score) > 1:  # 允许1分的误差
-                self.logger.warning(f"维度分数总和({total_dimension_score})与总分({score})不匹配")
+        Returns:
+            与 pairs 一一对应的评估结果列表，失败的项为 None
+        """
         
-        return True
-    
-    def _extract_score_fallback(self, content: str) -> Optional[Dict[str, Any]]:
-        """降级处理：从文本中提取分数"""
+        if len(pairs) == 1:
+            return [self.evaluate_semantic_similarity(pairs[0][0], pairs[0][1], scenario)]
         
-        import re
+        prompt_builder = PromptBuilder.for_scenario(scenario)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(pairs)
         
-        try:
-            # 尝试提取分数
-            score_patterns = [
-                r'"score"\s*:\s*(\d+)',
-                r'分数[：:](\d+)',
-                r'得分[：:](\d+)',
-                r'(\d+)分'
-            ]
+        # 按问答对逐个查询缓存，只把未命中的项放入批量请求
+        cache_keys: List[Optional[str]] = [None] * len(pairs)
+        pending = []
+        for i, (question, answer) in enumerate(pairs):
+            if self.cache:
+                with tracing.span('cache_lookup'):
+                    cache_keys[i] = self.cache.make_key(
+                        self.model, 'batch', prompt_builder.batch_system_prompt,
+                        question, answer, 0.1)
+                    cached = self.cache.get(cache_keys[i])
+                if cached:
+                    results[i] = cached
+                    continue
+            pending.append(i)
+        
+        if len(pending) > 1:
+            self.logger.info(f"开始批量评估 {len(pending)} 个问答对，场景: {scenario}")
+            with tracing.span('prompt_build'):
+                messages = prompt_builder.build_batch_messages([pairs[i] for i in pending])
+            response_content = self.chat_completion(
+                messages=messages,
+                temperature=0.1,
+                max_tokens=min(500 + 300 * len(pending), 8000)
+            )
             
-            for pattern in score_patterns:
-                match = re.search(pattern, content)
-                if match:
-                    score = int(match.group(1))
-                    if 0 <= score <= 100:
-                        self.logger.info(f"降级处理成功，提取分数: {score}")
-                        return {
-                            'score': score,
-                            'reason': '降级处理提取的分数',
-                            'raw_response': content
-                        }
+            with tracing.span('parse'):
+                parsed = self._parse_batch_response(response_content, len(pending))
+            with self._batch_lock:
+                self.batch_stats['requests'] += 1
+                self.batch_stats['items'] += len(pending)
             
-            self.logger.error("无法从响应中提取有效分数")
-            return None
-            
-        except Exception as e:
-            self.logger.error(f"降级处理失败: {str(e)}")
-            return None
+            for position, item in parsed.items():
+                i = pending[position]
+                results[i] = item
+                if cache_keys[i]:
+                    self.cache.put(cache_keys[i], self.model, item)
+        
+        # 缺失或格式错误的项单独重新评估
+        for i in pending:
+            if results[i] is None:
+                if len(pending) > 1:
+                    with self._batch_lock:
+                        self.batch_stats['rejudged'] += 1
+                results[i] = self.evaluate_semantic_similarity(pairs[i][0], pairs[i][1], scenario)
+        
+        return results
+    
+    def _parse_batch_response(self, content: Optional[str], count: int) -> Dict[int, Dict[str, Any]]:
+        """解析批量评估响应
+        
+        Returns:
+            {问答对位置(从0开始): 评估结果}，只包含格式正确的项
+        """
+        
+        if not content:
+            self.logger.error("批量评估请求失败，将逐个重新评估")
+            return {}
+        
+        # 兼容代码块包裹、数组前后带有说明文字或数组被包在对象里的响应
+        parsed = self.parser.parse_batch(content, count)
+        if not parsed:
+            self.logger.error("无法解析批量评估响应")
+            self.logger.debug(f"原始响应: {content}")
+        
+        if len(parsed) < count:
+            self.logger.warning(f"批量评估返回 {len(parsed)}/{count} 个有效结果，其余逐个重新评估")
+        return parsed
+    
+    def _request_repair(self, content: str) -> Optional[str]:
+        """发送格式修复请求：只把无法解析的输出交给模型整理为JSON，不重复发送问答内容"""
+        
+        return self.chat_completion(
+            messages=PromptBuilder.for_scenario().build_repair_messages(content),
+            temperature=0,
+            max_tokens=500,
+            json_mode=True
+        )
     
     def test_connection(self) -> bool:
         """测试API连接"""
@@ -231,7 +328,8 @@ class DeepSeekClient:
             'base_url': config.deepseek.base_url,
             'max_retries': self.max_retries,
             'request_timeout': self.request_timeout,
-            'request_interval': self.request_interval,
+            'rate_limit': self.rate_limiter.snapshot(),
+            'batch': dict(self.batch_stats),
             'api_key_configured': bool(config.deepseek.api_key)
         }
 
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP连接池模块
+为EasyChat和本地API调用提供共享的keep-alive连接池，避免每个用例都重新建立TCP连接
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.config import config
+
+class PooledHTTPClient:
+    """带连接池的HTTP客户端
+
+    基于 requests.Session 和 urllib3 连接池，连接在请求之间保持(keep-alive)并复用。
+    连接池本身是线程安全的，流水线中的多个worker线程可以共享同一个实例。
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 10,
+                 connect_timeout: float = 5.0, read_timeout: float = 30.0):
+        """初始化客户端
+
+        Args:
+            base_url: 服务地址
+            pool_size: 连接池大小（同时保持的最大连接数）
+            connect_timeout: 建立连接的超时秒数
+            read_timeout: 默认的读取超时秒数
+        """
+        self.logger = logging.getLogger(__name__)
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = max(pool_size, 1)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self.session = requests.Session()
+        self._mount_adapter()
+
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'prewarmed': 0
+        }
+
+    def _mount_adapter(self):
+        """按当前连接池大小挂载连接适配器"""
+        # 连接池满时阻塞等待空闲连接，而不是临时创建用完即关的连接
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                              max_retries=0, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method: str, path: str, read_timeout: Optional[float] = None,
+                **kwargs) -> requests.Response:
+        """发送请求
+
+        Args:
+            method: HTTP方法
+            path: 请求路径（相对于 base_url）
+            read_timeout: 本次请求的读取超时，默认使用客户端配置
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+        return self.session.request(
+            method,
+            f"{self.base_url}{path}",
+            timeout=(self.connect_timeout, read_timeout or self.read_timeout),
+            **kwargs
+        )
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        """发送GET请求"""
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        """发送POST请求"""
+        return self.request('POST', path, **kwargs)
+
+    def prewarm(self, connections: int, path: str = '/health') -> int:
+        """预先建立连接
+
+        并发发送若干个健康检查请求，使连接池中保持指定数量的空闲连接，
+        评估开始后的第一批请求不再承担TCP握手的延迟。
+        连接池小于并发数时先扩大连接池，避免worker排队等待连接。
+        应在开始并发请求之前调用。
+
+        Returns:
+            成功建立的连接数
+        """
+        connections = max(connections, 0)
+        if not connections:
+            return 0
+        if connections > self.pool_size:
+            self.pool_size = connections
+            self._mount_adapter()
+
+        def touch(_):
+            try:
+                response = self.get(path, read_timeout=self.connect_timeout)
+                response.close()
+                return True
+            except requests.exceptions.RequestException:
+                return False
+
+        with ThreadPoolExecutor(max_workers=connections, thread_name_prefix='http-prewarm') as executor:
+            warmed = sum(executor.map(touch, range(connections)))
+
+        with self._lock:
+            self.stats['prewarmed'] += warmed
+        self.logger.debug(f"{self.base_url} 预建立 {warmed}/{connections} 个连接")
+        return warmed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取客户端当前状态"""
+        with self._lock:
+            return {
+                'base_url': self.base_url,
+                'pool_size': self.pool_size,
+                **self.stats
+            }
+
+    def close(self):
+        """关闭所有连接"""
+        self.session.close()
+
+_clients: Dict[str, PooledHTTPClient] = {}
+_clients_lock = threading.Lock()
+
+def get_http_client(base_url: str, read_timeout: Optional[float] = None) -> PooledHTTPClient:
+    """获取进程内共享的HTTP客户端
+
+    同一服务地址在进程内只创建一个连接池，访问同一服务的所有调用方共享连接。
+    """
+    key = base_url.rstrip('/')
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = PooledHTTPClient(
+                key,
+                pool_size=config.http.pool_size,
+                connect_timeout=config.http.connect_timeout,
+                read_timeout=read_timeout or config.request.timeout
+            )
+        return _clients[key]
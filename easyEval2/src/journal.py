@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评估日志模块
+以追加方式把每个完成的评估结果写入JSONL日志并同步到磁盘，用于中断后恢复
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+class ResultJournal:
+    """追加写入的评估结果日志
+
+    文件第一行为头部记录（运行参数等），之后每行一个结果记录。
+    每次写入后调用 fsync，进程崩溃或被中断时已完成的结果不会丢失。
+    """
+
+    def __init__(self, path: str, header: Optional[Dict[str, Any]] = None):
+        """打开日志文件
+
+        Args:
+            path: 日志文件路径，已存在时在末尾继续追加
+            header: 新建日志时写入的头部信息
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        is_new = not self.path.exists() or self.path.stat().st_size == 0
+        if not is_new:
+            self._truncate_partial_line()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+        if is_new:
+            self._write({
+                'type': 'header',
+                'created_at': datetime.now().isoformat(),
+                **(header or {})
+            })
+
+    def _truncate_partial_line(self):
+        """去掉崩溃时写了一半的最后一行，保证后续追加的记录能被正确解析"""
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data.endswith(b'\n'):
+                return
+            f.truncate(data.rfind(b'\n') + 1)
+            self.logger.warning(f"日志 {self.path} 末尾存在不完整记录，已截断")
+
+    def _write(self, record: Dict[str, Any]):
+        """写入一条记录并同步到磁盘"""
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def append(self, result: Dict[str, Any]):
+        """追加一个评估结果"""
+        self._write({'type': 'result', **result})
+
+    def close(self):
+        """关闭日志文件"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    @staticmethod
+    def load(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """读取日志
+
+        Returns:
+            (头部信息, 结果列表)。同一测试用例出现多次时以最后一次为准。
+        """
+        header: Dict[str, Any] = {}
+        results: Dict[str, Dict[str, Any]] = {}
+
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 只有最后一行可能因崩溃而不完整
+                    logging.getLogger(__name__).warning(f"跳过日志 {path} 第 {line_no} 行的不完整记录")
+                    continue
+
+                record_type = record.pop('type', 'result')
+                if record_type == 'header':
+                    header = record
+                elif record_type == 'result':
+                    results[record['test_id']] = record
+
+        return header, list(results.values())
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评估结果解析模块
+从评估模型的输出中容错地提取JSON评估结果，在本地修复常见的格式问题，
+只有本地无法得到有效分数时才发送简短的修复请求
+"""
+
+import re
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 各评估维度的满分，与 config/prompts.py 中的评估标准一致
+DIMENSION_MAX = {
+    'relevance': 30,
+    'accuracy': 25,
+    'completeness': 20,
+    'usefulness': 15,
+    'expression': 10
+}
+
+# 评估模型有时使用中文维度名
+DIMENSION_ALIASES = {
+    '相关性': 'relevance',
+    '准确性': 'accuracy',
+    '完整性': 'completeness',
+    '有用性': 'usefulness',
+    '表达质量': 'expression',
+    '表达': 'expression'
+}
+
+# 修复请求中附带的原始输出长度上限
+REPAIR_INPUT_LIMIT = 4000
+
+_FENCE = re.compile(r'```(?:json|JSON)?\s*(.*?)```', re.S)
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+_NUMBER = re.compile(r'^\s*(-?\d+(?:\.\d+)?)')
+
+def _balanced_end(text: str, start: int) -> int:
+    """从 start 处的括号开始，返回与之配对的右括号之后的位置，没有配对时返回 -1"""
+    closing = {'{': '}', '[': ']'}
+    stack = []
+    in_string = escaped = False
+    for pos in range(start, len(text)):
+        char = text[pos]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in closing:
+            stack.append(closing[char])
+        elif char in '}]':
+            if not stack or stack.pop() != char:
+                return -1
+            if not stack:
+                return pos + 1
+    return -1
+
+def iter_json_values(content: Optional[str], kind: type = dict) -> Iterator[Any]:
+    """按出现顺序产出文本中可以解析的JSON对象（或数组）
+
+    兼容代码块包裹、前后带说明文字和多余的尾随逗号。
+    """
+    if not content:
+        return
+    decoder = json.JSONDecoder()
+    opener = '{' if kind is dict else '['
+    texts = [match.group(1) for match in _FENCE.finditer(content)] + [content]
+
+    for text in texts:
+        pos = text.find(opener)
+        while pos != -1:
+            try:
+                value, _ = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                value = None
+                end = _balanced_end(text, pos)
+                if end != -1:
+                    try:
+                        value = json.loads(_TRAILING_COMMA.sub(r'\1', text[pos:end]))
+                    except json.JSONDecodeError:
+                        pass
+            if isinstance(value, kind):
+                yield value
+            pos = text.find(opener, pos + 1)
+
+def _number(value: Any) -> Optional[float]:
+    """把分数转换为数字，兼容 "85" 和 "85分" 这样的字符串"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str):
+        match = _NUMBER.match(value)
+        if not match:
+            return None
+        number = float(match.group(1))
+    else:
+        return None
+    return int(number) if number.is_integer() else number
+
+def _normalize_dimensions(value: Any, score: Optional[float], repairs: List[str]) -> Optional[Dict[str, float]]:
+    """整理维度分数，无法使用时返回 None
+
+    有维度超出满分时：各维度明确按百分制给分（均值与总分相符，没有总分时维度之和远超100）才按权重折算；
+    只超出满分一点（不超过满分的10%）时截断到满分；其他情况丢弃维度，保留评估模型给出的总分。
+    """
+    if not isinstance(value, dict):
+        return None
+
+    dimensions = {}
+    for key, raw in value.items():
+        name = DIMENSION_ALIASES.get(key, key)
+        number = _number(raw)
+        if name not in DIMENSION_MAX or number is None or number < 0:
+            repairs.append('dimensions_dropped')
+            return None
+        dimensions[name] = number
+    if set(dimensions) != set(DIMENSION_MAX):
+        repairs.append('dimensions_dropped')
+        return None
+
+    over = [name for name, limit in DIMENSION_MAX.items() if dimensions[name] > limit]
+    if not over:
+        return dimensions
+
+    total = sum(dimensions.values())
+    if score is not None:
+        percent_scale = abs(total / len(dimensions) - score) <= 5
+    else:
+        percent_scale = total > 150
+    if percent_scale and all(number <= 100 for number in dimensions.values()):
+        repairs.append('dimensions_rescaled')
+        return {name: round(number * DIMENSION_MAX[name] / 100) for name, number in dimensions.items()}
+    if all(dimensions[name] <= DIMENSION_MAX[name] * 1.1 for name in over):
+        repairs.append('dimensions_clamped')
+        return {name: min(number, DIMENSION_MAX[name]) for name, number in dimensions.items()}
+    repairs.append('dimensions_dropped')
+    return None
+
+def normalize_evaluation(data: Any) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """校验并在本地修复一个评估结果
+
+    - 分数为字符串时转换为数字
+    - 没有总分但维度完整时以维度之和作为总分
+    - 维度之和与总分相差超过1分时以维度之和为准（维度按评估标准逐项给分，更可靠）
+    - 维度明确按百分制给分时按权重折算，略超满分时截断到满分
+    - 维度不完整或无法使用时丢弃维度，保留总分
+
+    Returns:
+        (评估结果, 修复项列表)，没有有效分数时评估结果为 None
+    """
+    repairs: List[str] = []
+    if not isinstance(data, dict):
+        return None, repairs
+
+    # 部分模型会把结果包在 evaluation / result 等字段中
+    if 'score' not in data and 'dimensions' not in data:
+        inner = next((v for v in data.values() if isinstance(v, dict) and ('score' in v or 'dimensions' in v)), None)
+        if inner is None:
+            return None, repairs
+        data = inner
+        repairs.append('unwrapped')
+
+    score = _number(data.get('score'))
+    if score is not None and not isinstance(data.get('score'), (int, float)):
+        repairs.append('score_coerced')
+    dimensions = _normalize_dimensions(data.get('dimensions'), score, repairs) if 'dimensions' in data else None
+
+    if dimensions is not None:
+        total = sum(dimensions.values())
+        if score is None or abs(total - score) > 1:
+            score = total
+            repairs.append('score_from_dimensions')
+    if score is None or not 0 <= score <= 100:
+        return None, repairs
+
+    reason = data.get('reason')
+    if not isinstance(reason, str) or not reason.strip():
+        reason = next((data[key] for key in ('reasoning', 'explanation', '理由', '评分理由')
+                       if isinstance(data.get(key), str)), '')
+        repairs.append('reason_missing' if not reason else 'reason_renamed')
+
+    result = {'score': score, 'reason': reason}
+    if dimensions is not None:
+        result['dimensions'] = dimensions
+    return result, repairs
+
+class EvaluationParser:
+    """评估模型输出解析器
+
+    依次尝试：容错提取JSON → 本地修复 → 发送修复请求（最后手段），
+    并统计各种情况出现的次数，供报告判断评估模型的输出质量。
+    """
+
+    def __init__(self, repair: Optional[Callable[[str], Optional[str]]] = None):
+        """初始化解析器
+
+        Args:
+            repair: 发送修复请求的函数，参数为无法解析的原始输出，返回修复后的输出；为 None 时不发送修复请求
+        """
+        self.logger = logging.getLogger(__name__)
+        self.repair = repair
+        self._lock = threading.Lock()
+        self.stats = {
+            'parsed': 0,
+            'repaired': 0,
+            'repair_requests': 0,
+            'failed': 0
+        }
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _parse_local(self, content: Optional[str]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        for value in iter_json_values(content, dict):
+            result, repairs = normalize_evaluation(value)
+            if result is not None:
+                return result, repairs
+        return None, []
+
+    def parse(self, content: Optional[str]) -> Optional[Dict[str, Any]]:
+        """解析单个评估结果，无法得到有效分数时返回 None（不会编造分数）"""
+        if not content:
+            return None
+
+        result, repairs = self._parse_local(content)
+        if result is None and self.repair:
+            self.logger.warning("评估结果无法解析，发送修复请求")
+            self._count('repair_requests')
+            result, repairs = self._parse_local(self.repair(content[:REPAIR_INPUT_LIMIT]))
+            repairs = ['repair_request', *repairs]
+
+        if result is None:
+            self._count('failed')
+            self.logger.error("无法从评估模型的输出中得到有效的评估结果")
+            self.logger.debug(f"原始响应: {content}")
+            return None
+
+        if repairs:
+            self._count('repaired')
+            self.logger.info(f"评估结果已修复: {', '.join(repairs)}")
+            result['repairs'] = repairs
+            result['raw_response'] = content
+        else:
+            self._count('parsed')
+        return result
+
+    def parse_batch(self, content: Optional[str], count: int) -> Dict[int, Dict[str, Any]]:
+        """解析批量评估结果，不发送修复请求（缺失的项由调用方单独重评）
+
+        Returns:
+            {问答对位置(从0开始): 评估结果}，只包含有效的项
+        """
+        items = next(iter_json_values(content, list), None)
+        if items is None:
+            # 部分模型会把数组包在一个对象里
+            wrapper = next(iter_json_values(content, dict), None)
+            items = next((v for v in wrapper.values() if isinstance(v, list)), None) if wrapper else None
+        if items is None:
+            return {}
+
+        parsed: Dict[int, Dict[str, Any]] = {}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            # 优先按编号对应，没有编号时按顺序对应
+            index = _number(item.get('index', position + 1))
+            if not isinstance(index, int) or not 1 <= index <= count or index - 1 in parsed:
+                self.logger.warning(f"批量评估结果编号无效: {item.get('index')}")
+                continue
+            result, repairs = normalize_evaluation(item)
+            if result is None:
+                continue
+            if repairs:
+                self._count('repaired')
+                result['repairs'] = repairs
+            else:
+                self._count('parsed')
+            parsed[index - 1] = result
+        return parsed
@@ -6,7 +6,6 @@
 """
 
 import json
-import time
 import logging
 import requests
 from typing import Dict, List, Optional, Any
@@ -18,6 +17,12 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from config.config import config
+from config.prompts import PromptBuilder
+from src.rate_limiter import get_rate_limiter
+from src.http_client import get_http_client
+from src import tracing
+from src.judge_output import EvaluationParser
+from src.usage import extract_usage
 
 class LocalAPIClient:
     """本地API客户端"""
@@ -32,16 +37,33 @@ class LocalAPIClient:
         self.base_url = base_url.rstrip('/')
         self.max_retries = getattr(config.request, 'max_retries', 3)
         self.request_timeout = getattr(config.request, 'timeout', 30)
-        self.request_interval = getattr(config.request, 'interval', 1)
+        
+        # 同一本地服务器的所有客户端共享限流器和keep-alive连接池
+        self.rate_limiter = get_rate_limiter(f"local:{self.base_url}")
+        self.http = get_http_client(self.base_url, self.request_timeout)
+        
+        # 评估结果缓存（由评估器按需设置）
+        self.cache = None
+        
+        # 服务端是否接受完整的消息列表，首次请求时通过 /health 查询
+        self._messages_supported: Optional[bool] = None
+        
+        # 评估结果解析器（容错提取、本地修复，最后才发送修复请求）
+        self.parser = EvaluationParser(
+            repair=self._request_repair if config.evaluation.repair_prompt else None)
         
         self.logger.info(f"本地API客户端初始化完成，服务器: {self.base_url}")
     
     def chat_completion(self, messages: List[Dict[str, str]], 
                        temperature: float = 0.1,
                        max_tokens: Optional[int] = None) -> Optional[str]:
-        """发送聊天完成请求"""
+        """发送聊天完成请求
         
-        # 提取用户消息（简化处理，只取最后一条用户消息）
+        服务端支持时按原样发送消息列表，系统提示词保持为独立且不变的前缀；
+        旧版服务端只接受单条消息，此时把系统提示词和用户消息合并发送。
+        """
+        
+        # 提取最后一条用户消息
         user_message = ""
         for msg in reversed(messages):
             if msg.get('role') == 'user':
@@ -52,136 +74,112 @@ class LocalAPIClient:
             self.logger.error("未找到用户消息")
             return None
         
+        if self._supports_messages():
+            payload = {"message": user_message, "messages": messages}
+        else:
+            payload = {"message": "\n\n".join(
+                msg['content'] for msg in messages if msg.get('role') in ('system', 'user'))}
+        
         for attempt in range(self.max_retries):
             try:
                 self.logger.debug(f"发送本地API请求，尝试 {attempt + 1}/{self.max_retries}")
+                if attempt > 0:
+                    tracing.record_retry()
+                
+                # 等待限流器许可（重试间隔也由限流器控制）
+                with tracing.span('rate_limit_wait'):
+                    self.rate_limiter.acquire()
                 
                 # 发送POST请求到本地API
-                response = requests.post(
-                    f"{self.base_url}/chat",
-                    json={"message": user_message},
-                    headers={"Content-Type": "application/json"},
-                    timeout=self.request_timeout
-                )
+                with tracing.span('judge_request', attempt=attempt + 1):
+                    response = self.http.post(
+                        '/chat',
+                        json=payload,
+                        read_timeout=self.request_timeout
+                    )
+                tracing.record_bytes(len(response.request.body or b''), len(response.content))
                 
                 if response.status_code == 200:
+                    self.rate_limiter.record_success()
                     result = response.json()
+                    tracing.record_usage(extract_usage(result.get('usage')))
                     return result.get('response')
                 else:
                     self.logger.error(f"API请求失败，状态码: {response.status_code}, 响应: {response.text}")
+                    if response.status_code == 429 or response.status_code >= 500:
+                        self.rate_limiter.record_throttle(self._get_retry_after(response))
                     
             except requests.exceptions.RequestException as e:
                 self.logger.error(f"请求异常: {str(e)}")
+                self.rate_limiter.record_throttle()
                 
             except json.JSONDecodeError as e:
                 self.logger.error(f"JSON解析错误: {str(e)}")
                 
             except Exception as e:
                 self.logger.error(f"未知错误: {str(e)}")
-            
-            # 等待后重试
-            if attempt < self.max_retries - 1:
-                time.sleep(self.request_interval)
         
         self.logger.error(f"API请求失败，已重试 {self.max_retries} 次")
         return None
     
+    def _supports_messages(self) -> bool:
+        """服务端是否接受完整的消息列表（/health 返回的 features 中包含 messages）"""
+        if self._messages_supported is None:
+            try:
+                response = self.http.get('/health', read_timeout=self.request_timeout)
+                features = response.json().get('features', []) if response.status_code == 200 else []
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.logger.warning(f"查询服务端功能失败，本次按单条消息发送: {str(e)}")
+                return False
+            self._messages_supported = 'messages' in features
+            if not self._messages_supported:
+                self.logger.info("服务端不支持消息列表，系统提示词将与用户消息合并发送")
+        return self._messages_supported
+    
+    def _get_retry_after(self, response) -> Optional[float]:
+        """读取响应中的Retry-After头"""
+        try:
+            return float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+    
     def evaluate_semantic_similarity(self, question: str, answer: str, 
                                    scenario: str = 'general') -> Optional[Dict[str, Any]]:
         """评估语义相似度"""
         
         # 构建评估提示
-        from config.prompts import PromptBuilder
-        prompt_builder = PromptBuilder(scenario)
-        messages = prompt_builder.build_messages(question, answer)
-        
-        # 合并系统提示和用户提示
-        prompt = messages[0]['content'] + "\n\n" + messages[1]['content']
-        
-        messages = [
-            {"role": "user", "content": prompt}
-        ]
+        with tracing.span('prompt_build'):
+            messages = PromptBuilder.for_scenario(scenario).build_messages(question, answer)
+        
+        # 查询评估结果缓存
+        cache_key = None
+        if self.cache:
+            with tracing.span('cache_lookup'):
+                cache_key = self.cache.make_judge_key(f"local:{self.base_url}", messages, 0.1)
+                cached = self.cache.get(cache_key)
+            if cached:
+                return cached
         
         # 调用API
         response = self.chat_completion(messages)
         if not response:
             return None
         
-        # 解析响应
-        try:
-            # 尝试直接解析JSON
-            if response.strip().startswith('{'):
-                result = json.loads(response)
-                if self._validate_evaluation_result(result):
-                    return result
-            
-            # 如果直接解析失败，尝试提取JSON
-            return self._extract_score_fallback(response)
-            
-        except json.JSONDecodeError:
-            self.logger.warning("响应不是有效的JSON格式，尝试提取分数")
-            return self._extract_score_fallback(response)
+        # 解析响应（容错提取JSON并在本地修复，必要时发送修复请求；无法得到分数时返回 None）
+        with tracing.span('parse'):
+            result = self.parser.parse(response)
+        if result and cache_key:
+            self.cache.put(cache_key, f"local:{self.base_url}", result)
+        return result
     
-    def _validate_evaluation_result(self, result: Dict[str, Any]) -> bool:
-        """验证评估结果格式"""
-        required_fields = ['score', 'reason']
-        
-        for field in required_fields:
-            if field not in result:
-                self.logger.warning(f"评估结果缺少必需字段: {field}")
-                return False
-        
-        # 验证分数范围
-        score = result.get('score')
-        if not isinstance(score, (int, float)) or not (0 <= score <= 100):
-            self.logger.warning(f"分数格式错误或超出范围: {score}")
-            return False
-        
-        return True
-    
-    def _extract_score_fallback(self, content: str) -> Optional[Dict[str, Any]]:
-        """从文本中提取分数（备用方法）"""
-        import re
-        
-        # 尝试提取分数
-        score_patterns = [
-            r'"score"\s*:\s*(\d+(?:\.\d+)?)',
-            r'分数[：:](\d+(?:\.\d+)?)',
-            r'评分[：:](\d+(?:\.\d+)?)',
-            r'(\d+(?:\.\d+)?)分',
-            r'(\d+(?:\.\d+)?)/100',
-            r'(\d+(?:\.\d+)?)%'
-        ]
-        
-        for pattern in score_patterns:
-            match = re.search(pattern, content)
-            if match:
-                try:
-                    score = float(match.group(1))
-                    if 0 <= score <= 100:
-                        return {
-                            'score': score,
-                            'reason': content,
-                            'extracted': True
-                        }
-                except ValueError:
-                    continue
-        
-        # 如果没有找到分数，返回一个默认的评估结果
-        self.logger.warning("无法从响应中提取有效分数，返回默认评估")
-        return {
-            'score': 75,
-            'reason': f"本地API响应: {content[:200]}...",
-            'extracted': False
-        }
+    def _request_repair(self, content: str) -> Optional[str]:
+        """发送格式修复请求，只把无法解析的输出交给模型整理为JSON"""
+        return self.chat_completion(PromptBuilder.for_scenario().build_repair_messages(content))
     
     def test_connection(self) -> bool:
         """测试API连接"""
         try:
-            response = requests.get(
-                f"{self.base_url}/health",
-                timeout=self.request_timeout
-            )
+            response = self.http.get('/health', read_timeout=self.request_timeout)
             
             if response.status_code == 200:
                 result = response.json()
@@ -200,7 +198,9 @@ class LocalAPIClient:
             'type': 'LocalAPIClient',
             'base_url': self.base_url,
             'max_retries': self.max_retries,
-            'timeout': self.request_timeout
+            'timeout': self.request_timeout,
+            'rate_limit': self.rate_limiter.snapshot(),
+            'http': self.http.snapshot()
         }
 
 if __name__ == '__main__':
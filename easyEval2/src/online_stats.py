@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+在线统计模块
+随数据逐个到达更新的统计量：Welford均值/方差、固定分箱直方图、可合并的分位数草图和分组统计。
+生成摘要时不需要再遍历数据，不同批次或分片的统计可以直接合并。
+easyEval/src/online_stats.py 中有 RunningStats 和 QuantileSketch 的副本，修改时两处保持一致
+"""
+
+import math
+import random
+from importlib.util import find_spec
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# NumPy为可选依赖，没有时不计算bootstrap置信区间；导入较慢，只在计算时导入
+HAS_NUMPY = find_spec('numpy') is not None
+
+# 摘要中报告的分位数
+SUMMARY_QUANTILES = (50, 90, 99)
+
+def t_quantile(p: float, df: int) -> float:
+    """t分布的分位数（Cornish-Fisher展开近似，自由度3以上误差小于0.01）"""
+    z = NormalDist().inv_cdf(p)
+    if df <= 0:
+        return float('inf')
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+def _beta_continued_fraction(a: float, b: float, x: float) -> float:
+    """不完全Beta函数的连分式（修正Lentz算法）"""
+    tiny = 1e-300
+    c = 1.0
+    d = 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1) < 1e-12:
+            break
+    return h
+
+def regularized_beta(x: float, a: float, b: float) -> float:
+    """正则化不完全Beta函数 I_x(a, b)"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1 - x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _beta_continued_fraction(a, b, x) / a
+    return 1 - front * _beta_continued_fraction(b, a, 1 - x) / b
+
+def t_pvalue(t: float, df: int) -> Optional[float]:
+    """t统计量的双侧p值，自由度不足时为 None"""
+    if df <= 0:
+        return None
+    if math.isinf(t):
+        return 0.0
+    return regularized_beta(df / (df + t * t), df / 2, 0.5)
+
+class RunningStats:
+    """Welford算法维护的次数、总和、均值、方差和极值，可合并（Chan等人的并行算法）"""
+
+    __slots__ = ('count', 'total', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """把另一组统计合并进来"""
+        if not other.count:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """样本方差"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def ci_half_width(self, confidence: float = 0.95) -> Optional[float]:
+        """均值的t分布置信区间半宽，样本不足2个时为 None"""
+        if self.count < 2:
+            return None
+        return t_quantile((1 + confidence) / 2, self.count - 1) * self.stdev / math.sqrt(self.count)
+
+class Histogram:
+    """固定分箱直方图
+
+    edges 为各分箱的下界（递增），最后一个分箱没有上界，小于第一个下界的值计入第一个分箱。
+    """
+
+    def __init__(self, edges: Sequence[float]):
+        self.edges = tuple(edges)
+        self.counts = [0] * len(self.edges)
+
+    def add(self, value: float):
+        index = len(self.edges) - 1
+        while index > 0 and value < self.edges[index]:
+            index -= 1
+        self.counts[index] += 1
+
+    def merge(self, other: 'Histogram') -> 'Histogram':
+        if other.edges != self.edges:
+            raise ValueError("直方图分箱不一致，无法合并")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+class QuantileSketch:
+    """可合并的分位数草图（DDSketch）
+
+    正数按 gamma=(1+a)/(1-a) 的对数分桶，估计的分位数相对误差不超过 a；
+    零和负数计入零桶（用于耗时，不为负）。内存只与数值范围的数量级有关，与数据量无关。
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("分位数草图精度不一致，无法合并")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """第 q 百分位数（0-100），没有数据时为 None"""
+        if not self.count:
+            return None
+        rank = q / 100 * (self.count - 1)
+        if rank < self.zero_count:
+            return max(min(0.0, self.max), self.min)
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Sequence[float] = SUMMARY_QUANTILES, digits: int = 6) -> Dict[str, Optional[float]]:
+        """多个百分位数，键为 p50/p90/p99 这样的名称"""
+        result = {}
+        for q in qs:
+            value = self.quantile(q)
+            result[f'p{q}'] = round(value, digits) if value is not None else None
+        return result
+
+def bootstrap_mean_ci(counts: Dict[float, int], confidence: float = 0.95, resamples: int = 2000,
+                      seed: int = 0) -> Optional[Tuple[float, float]]:
+    """均值的百分位bootstrap置信区间
+
+    样本以 {取值: 次数} 表示，重抽样等价于按各取值的频率做多项分布抽样，
+    用NumPy一次生成全部重抽样的次数矩阵，计算量与样本量无关。
+
+    Returns:
+        (下界, 上界)，没有安装NumPy或样本不足2个时为 None
+    """
+    n = sum(counts.values())
+    if not HAS_NUMPY or n < 2 or resamples <= 0:
+        return None
+    import numpy as np
+    values = np.fromiter(counts.keys(), dtype=float, count=len(counts))
+    probabilities = np.fromiter(counts.values(), dtype=float, count=len(counts)) / n
+    rng = np.random.default_rng(seed)
+    means = rng.multinomial(n, probabilities, size=resamples) @ values / n
+    low, high = np.quantile(means, [(1 - confidence) / 2, (1 + confidence) / 2])
+    return float(low), float(high)
+
+class GroupStats:
+    """一组分数的在线统计：均值/方差和各取值的次数（保留一位小数）
+
+    分数的取值范围有限（0-100），取值计数的大小与结果数量无关，
+    由它得到精确的分位数，并用于bootstrap重抽样。
+    """
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.values: Dict[float, int] = {}
+
+    def add(self, value: float):
+        self.stats.add(value)
+        key = round(value, 1)
+        self.values[key] = self.values.get(key, 0) + 1
+
+    def merge(self, other: 'GroupStats') -> 'GroupStats':
+        self.stats.merge(other.stats)
+        for key, count in other.values.items():
+            self.values[key] = self.values.get(key, 0) + count
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """第 q 百分位数（0-100，线性插值），没有数据时为 None"""
+        if not self.stats.count:
+            return None
+        rank = q / 100 * (self.stats.count - 1)
+        low = high = None
+        seen = 0
+        for value in sorted(self.values):
+            seen += self.values[value]
+            if low is None and seen > int(rank):
+                low = value
+            if seen > int(rank) + 1 or seen == self.stats.count:
+                high = value
+                break
+        return low + (high - low) * (rank - int(rank))
+
+    def quantiles(self, qs: Sequence[float] = SUMMARY_QUANTILES) -> Dict[str, Optional[float]]:
+        result = {}
+        for q in qs:
+            value = self.quantile(q)
+            result[f'p{q}'] = round(value, 1) if value is not None else None
+        return result
+
+    def summary(self, confidence: float = 0.95, bootstrap_resamples: int = 0, seed: int = 0) -> Dict[str, Any]:
+        half = self.stats.ci_half_width(confidence)
+        summary = {
+            'count': self.stats.count,
+            'total_score': self.stats.total,
+            'average_score': self.stats.mean,
+            'stdev': round(self.stats.stdev, 3),
+            'ci_half_width': round(half, 3) if half is not None else None,
+            **self.quantiles()
+        }
+        if bootstrap_resamples:
+            interval = bootstrap_mean_ci(self.values, confidence, bootstrap_resamples, seed)
+            if interval:
+                summary['bootstrap_ci'] = [round(bound, 3) for bound in interval]
+        return summary
+
+# 分数分布的分箱：很差 / 较差 / 一般 / 良好 / 优秀
+GRADE_EDGES = (0, 60, 70, 80, 90)
+GRADE_NAMES = ('very_poor', 'poor', 'average', 'good', 'excellent')
+
+class ScoreAggregator:
+    """评估分数的在线汇总
+
+    每个结果到达时更新整体和各场景的统计，生成摘要的开销与结果数量无关；
+    不同批次（如从日志恢复的结果与本次评估的结果）或分片的汇总可以直接合并。
+    """
+
+    def __init__(self):
+        self.overall = GroupStats()
+        self.distribution = Histogram(GRADE_EDGES)
+        self.groups: Dict[str, GroupStats] = {}
+
+    @property
+    def count(self) -> int:
+        return self.overall.stats.count
+
+    def add(self, group: str, score: float):
+        """加入一个分数"""
+        self.overall.add(score)
+        self.distribution.add(score)
+        self.groups.setdefault(group, GroupStats()).add(score)
+
+    def merge(self, other: 'ScoreAggregator') -> 'ScoreAggregator':
+        """把另一份汇总合并进来"""
+        self.overall.merge(other.overall)
+        self.distribution.merge(other.distribution)
+        for group, stats in other.groups.items():
+            self.groups.setdefault(group, GroupStats()).merge(stats)
+        return self
+
+    def merged(self, other: 'ScoreAggregator') -> 'ScoreAggregator':
+        """合并后的新汇总，不修改原有的两份"""
+        return ScoreAggregator().merge(self).merge(other)
+
+    def summary(self, confidence: float = 0.95, bootstrap_resamples: int = 0) -> Dict[str, Any]:
+        """整体和各分组的统计
+
+        Args:
+            confidence: 置信水平
+            bootstrap_resamples: 各分组均值bootstrap置信区间的重抽样次数，0表示不计算（需要NumPy）
+        """
+        stats = self.overall.stats
+        return {
+            'count': stats.count,
+            'average_score': stats.mean,
+            'max_score': stats.max,
+            'min_score': stats.min,
+            'stdev': round(stats.stdev, 3),
+            'percentiles': self.overall.quantiles(),
+            'score_distribution': dict(zip(reversed(GRADE_NAMES), reversed(self.distribution.counts))),
+            'groups': {
+                group: group_stats.summary(confidence, bootstrap_resamples, seed=random.Random(group).randrange(2 ** 32))
+                for group, group_stats in self.groups.items()
+            }
+        }
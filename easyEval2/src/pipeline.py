@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评估流水线模块
+将回答获取和语义评估拆分为两个并发阶段，通过有界队列衔接
+"""
+
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+@dataclass
+class StageStats:
+    """流水线阶段统计"""
+    name: str
+    workers: int
+    busy: int = 0
+    processed: int = 0
+    failed: int = 0
+    busy_time: float = 0.0
+    started_at: float = field(default_factory=time.time)
+    
+    def utilization(self) -> float:
+        """阶段利用率：worker忙碌时间占总可用时间的比例"""
+        elapsed = time.time() - self.started_at
+        if elapsed <= 0 or self.workers <= 0:
+            return 0.0
+        return min(self.busy_time / (elapsed * self.workers), 1.0)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'workers': self.workers,
+            'busy': self.busy,
+            'processed': self.processed,
+            'failed': self.failed,
+            'utilization': self.utilization()
+        }
+
+class EvaluationPipeline:
+    """两阶段评估流水线
+    
+    回答获取阶段从用例迭代器中取用例并调用 evaluator.fetch_answer，
+    评估阶段从队列中取回答并调用 evaluator.judge_answer；
+    judge_batch_size 大于1时按场景凑批，每批最多该数量的回答调用 evaluator.judge_answers 合并评估，
+    凑批最多等待 judge_batch_wait 秒。
+    队列有界，回答获取速度超过评估速度时会被阻塞，内存占用保持平稳。
+    """
+    
+    def __init__(self, evaluator, answer_workers: int, judge_workers: int,
+                 queue_size: Optional[int] = None,
+                 judge_batch_size: int = 1,
+                 judge_batch_wait: float = 0.2):
+        """初始化流水线
+        
+        Args:
+            evaluator: 提供 fetch_answer / judge_answer / judge_answers 的评估器
+            answer_workers: 回答获取阶段的并发数
+            judge_workers: 评估阶段的并发数
+            queue_size: 阶段间队列容量，默认为评估并发数与批量大小乘积的2倍
+            judge_batch_size: 每次评估请求包含的回答数量
+            judge_batch_wait: 凑满一批时等待后续回答的最长秒数
+        """
+        self.logger = logging.getLogger(__name__)
+        self.evaluator = evaluator
+        self.answer_stats = StageStats('answer', max(answer_workers, 1))
+        self.judge_stats = StageStats('judge', max(judge_workers, 1))
+        self.judge_batch_size = max(judge_batch_size, 1)
+        self.judge_batch_wait = judge_batch_wait
+        self.queue_size = queue_size or self.judge_stats.workers * self.judge_batch_size * 2
+        self._queue: Optional[asyncio.Queue] = None
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """获取流水线当前状态（用于进度显示）"""
+        return {
+            'answer': self.answer_stats.to_dict(),
+            'judge': self.judge_stats.to_dict(),
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'queue_size': self.queue_size
+        }
+    
+    async def run(self, test_cases: Iterable, on_result: Callable):
+        """运行流水线
+        
+        Args:
+            test_cases: 测试用例序列
+            on_result: 每个用例结束时调用 on_result(index, test_case, result)，
+                       result 为 None 表示该用例失败。回调在事件循环线程中执行。
+        """
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        pending = iter(enumerate(test_cases))
+        
+        answer_executor = ThreadPoolExecutor(
+            max_workers=self.answer_stats.workers, thread_name_prefix='eval-answer')
+        judge_executor = ThreadPoolExecutor(
+            max_workers=self.judge_stats.workers, thread_name_prefix='eval-judge')
+        
+        async def run_stage(stats: StageStats, executor, func, *args):
+            stats.busy += 1
+            start = time.time()
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except Exception as e:
+                self.logger.error(f"{stats.name}阶段发生错误: {str(e)}")
+                return None
+            finally:
+                stats.busy -= 1
+                stats.busy_time += time.time() - start
+        
+        async def answer_worker():
+            # 所有worker共享同一个迭代器，在事件循环线程内取用例是安全的；
+            # 预算放行与读取用例之间没有 await，其他worker不会同时越过预算限制
+            while True:
+                await self.evaluator.wait_for_budget()
+                item = next(pending, None)
+                if item is None:
+                    break
+                index, test_case = item
+                answer = await run_stage(
+                    self.answer_stats, answer_executor, self.evaluator.fetch_answer, test_case)
+                self.answer_stats.processed += 1
+                if answer:
+                    await self._queue.put((index, test_case, answer))
+                else:
+                    self.answer_stats.failed += 1
+                    on_result(index, test_case, None)
+        
+        async def judge_worker():
+            while True:
+                item = await self._queue.get()
+                if item is None:
+                    break
+                index, test_case, answer = item
+                result = await run_stage(
+                    self.judge_stats, judge_executor, self.evaluator.judge_answer, test_case, answer)
+                self.judge_stats.processed += 1
+                if not result:
+                    self.judge_stats.failed += 1
+                on_result(index, test_case, result)
+        
+        # 按场景暂存的待评估回答，同一批只包含同一场景的回答（共享系统提示词）
+        # 只在事件循环线程内访问，按插入顺序排列，最早的场景组优先发出
+        carry: Dict[str, list] = {}
+        
+        async def judge_batch_worker():
+            running = True
+            while True:
+                group = None
+                # 已有暂存回答时从现在开始计时，避免它们一直等待
+                deadline = loop.time() + self.judge_batch_wait if carry else None
+                while running:
+                    if deadline is None:
+                        item = await self._queue.get()
+                    else:
+                        try:
+                            item = self._queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            timeout = deadline - loop.time()
+                            if timeout <= 0:
+                                break
+                            try:
+                                item = await asyncio.wait_for(self._queue.get(), timeout)
+                            except asyncio.TimeoutError:
+                                break
+                    if item is None:
+                        running = False
+                        break
+                    
+                    scenario = item[1].scenario
+                    carry.setdefault(scenario, []).append(item)
+                    if deadline is None:
+                        deadline = loop.time() + self.judge_batch_wait
+                    if len(carry[scenario]) >= self.judge_batch_size:
+                        group = carry.pop(scenario)
+                        break
+                
+                if group is None:
+                    if not carry:
+                        if running:
+                            continue
+                        return
+                    # 等待超时或已收到结束信号：发出最早的场景组
+                    group = carry.pop(next(iter(carry)))
+                
+                results = await run_stage(
+                    self.judge_stats, judge_executor, self.evaluator.judge_answers,
+                    [(test_case, answer) for _, test_case, answer in group])
+                results = results or [None] * len(group)
+                for (index, test_case, _), result in zip(group, results):
+                    self.judge_stats.processed += 1
+                    if not result:
+                        self.judge_stats.failed += 1
+                    on_result(index, test_case, result)
+        
+        async def answer_stage():
+            await asyncio.gather(*(answer_worker() for _ in range(self.answer_stats.workers)))
+            # 回答阶段结束后通知评估阶段退出
+            for _ in range(self.judge_stats.workers):
+                await self._queue.put(None)
+        
+        try:
+            await asyncio.gather(
+                answer_stage(),
+                *((judge_batch_worker() if self.judge_batch_size > 1 else judge_worker())
+                  for _ in range(self.judge_stats.workers))
+            )
+        finally:
+            answer_executor.shutdown(wait=False, cancel_futures=True)
+            judge_executor.shutdown(wait=False, cancel_futures=True)
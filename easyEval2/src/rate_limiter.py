@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应限流模块
+基于令牌桶的请求速率/令牌速率限制，按AIMD方式自动调整速率
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from config.config import config
+
+class AdaptiveRateLimiter:
+    """自适应令牌桶限流器
+
+    同时限制每秒请求数和每分钟令牌数。请求成功时速率按固定步长增加（加性增），
+    遇到429/5xx时速率减半（乘性减），从而逼近服务端的实际吞吐上限。
+    线程安全，同一进程内的多个客户端可以共享同一个实例。
+    """
+
+    def __init__(self, requests_per_second: float,
+                 tokens_per_minute: int = 0,
+                 min_requests_per_second: float = 0.2,
+                 max_requests_per_second: Optional[float] = None,
+                 increase_step: float = 0.1,
+                 decrease_factor: float = 0.5,
+                 name: str = 'default'):
+        """初始化限流器
+
+        Args:
+            requests_per_second: 初始每秒请求数
+            tokens_per_minute: 每分钟令牌上限，0表示不限制
+            min_requests_per_second: 退避时的速率下限
+            max_requests_per_second: 增长时的速率上限
+            increase_step: 每次成功请求增加的速率
+            decrease_factor: 每次被限流时速率的乘数
+            name: 限流器名称（用于日志）
+        """
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.min_rate = min_requests_per_second
+        self.max_rate = max(max_requests_per_second or requests_per_second, requests_per_second)
+        self.rate = min(max(requests_per_second, self.min_rate), self.max_rate)
+        self.tokens_per_minute = tokens_per_minute
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+
+        self._lock = threading.Lock()
+        self._request_allowance = 1.0
+        self._token_allowance = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+
+        # 统计信息
+        self.stats = {
+            'acquired': 0,
+            'throttled': 0,
+            'total_wait_time': 0.0
+        }
+
+    def _refill(self, now: float):
+        """按当前速率补充令牌（需在持锁状态下调用）"""
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        # 请求桶容量为1秒的请求量，避免长时间空闲后突发过多请求
+        self._request_allowance = min(self._request_allowance + elapsed * self.rate,
+                                      max(self.rate, 1.0))
+        if self.tokens_per_minute:
+            self._token_allowance = min(self._token_allowance + elapsed * self.tokens_per_minute / 60,
+                                        float(self.tokens_per_minute))
+
+    def acquire(self, tokens: int = 0) -> float:
+        """获取发送一次请求的许可，必要时阻塞等待
+
+        Args:
+            tokens: 本次请求预计消耗的令牌数
+
+        Returns:
+            实际等待的秒数
+        """
+        # 单次请求的令牌数不能超过桶容量，否则永远无法满足
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    request_wait = (1 - self._request_allowance) / self.rate
+                    token_wait = 0.0
+                    if self.tokens_per_minute and tokens:
+                        token_wait = (tokens - self._token_allowance) * 60 / self.tokens_per_minute
+                    wait = max(request_wait, token_wait)
+
+                if wait <= 0:
+                    self._request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self._token_allowance -= tokens
+                    waited = now - start
+                    self.stats['acquired'] += 1
+                    self.stats['total_wait_time'] += waited
+                    return waited
+
+            time.sleep(min(wait, 1.0))
+
+    def record_success(self, used_tokens: Optional[int] = None, reserved_tokens: int = 0):
+        """记录一次成功请求，加性提升速率
+
+        Args:
+            used_tokens: 实际消耗的令牌数（来自响应的usage）
+            reserved_tokens: acquire 时预估的令牌数，用于多退少补
+        """
+        with self._lock:
+            self.rate = min(self.rate + self.increase_step, self.max_rate)
+            if self.tokens_per_minute and used_tokens is not None:
+                self._token_allowance += reserved_tokens - used_tokens
+
+    def record_throttle(self, retry_after: Optional[float] = None):
+        """记录一次被限流（429/5xx/连接失败），乘性降低速率
+
+        Args:
+            retry_after: 服务端建议的等待秒数（Retry-After）
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.stats['throttled'] += 1
+
+            # 同一波并发请求同时被限流时只降速一次
+            if now - self._last_decrease >= 1.0:
+                self.rate = max(self.rate * self.decrease_factor, self.min_rate)
+                self._last_decrease = now
+                self._request_allowance = min(self._request_allowance, 0.0)
+                self.logger.warning(f"[{self.name}] 触发限流，速率降低至 {self.rate:.2f} 请求/秒")
+
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取限流器当前状态"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'requests_per_second': round(self.rate, 3),
+                'tokens_per_minute': self.tokens_per_minute,
+                **self.stats
+            }
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(name: str = 'default') -> AdaptiveRateLimiter:
+    """获取进程内共享的限流器
+
+    同名限流器在进程内只创建一次，访问同一服务的所有客户端共享配额。
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveRateLimiter(
+                requests_per_second=config.rate_limit.requests_per_second,
+                tokens_per_minute=config.rate_limit.tokens_per_minute,
+                min_requests_per_second=config.rate_limit.min_requests_per_second,
+                max_requests_per_second=config.rate_limit.max_requests_per_second,
+                name=name
+            )
+        return _limiters[name]
+
+def estimate_tokens(messages, max_tokens: Optional[int] = None) -> int:
+    """粗略估算一次请求消耗的令牌数（中文约每字符0.6个令牌）"""
+    chars = sum(len(msg.get('content') or '') for msg in messages)
+    return int(chars * 0.6) + (max_tokens or 0)
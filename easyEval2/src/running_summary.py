@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量评估摘要模块
+随评估结果逐个到达更新汇总统计，生成摘要时无需保留或遍历完整结果列表
+"""
+
+from typing import Any, Dict, List
+
+from src.online_stats import ScoreAggregator
+
+# Markdown报告中展示的详细结果数量
+PREVIEW_SIZE = 10
+
+class RunningSummary:
+    """增量维护的评估摘要
+
+    分数统计由 online_stats.ScoreAggregator 在线维护（均值/方差、分位数草图、分数分布和各场景统计），
+    生成摘要的开销与结果数量无关，内存占用也与结果数量无关（只保留前几个结果用于报告预览）。
+    """
+
+    def __init__(self):
+        self.scores = ScoreAggregator()
+        self.preview: List[Any] = []
+
+    @property
+    def count(self) -> int:
+        return self.scores.count
+
+    def add(self, result):
+        """加入一个评估结果"""
+        self.scores.add(result.scenario, result.semantic_score)
+        if len(self.preview) < PREVIEW_SIZE:
+            self.preview.append(result)
+
+    def merged(self, other: 'RunningSummary') -> 'RunningSummary':
+        """合并后的新摘要（如从日志恢复的结果与本次评估的结果），不修改原有的两份"""
+        summary = RunningSummary()
+        summary.scores = self.scores.merged(other.scores)
+        summary.preview = (self.preview + other.preview)[:PREVIEW_SIZE]
+        return summary
+
+    def to_summary(self, run_stats: Dict[str, Any], confidence: float = 0.95,
+                   bootstrap_resamples: int = 0) -> Dict[str, Any]:
+        """生成评估摘要
+
+        Args:
+            run_stats: 评估器的运行统计（total_tests、total_api_time 等）
+            confidence: 各场景平均分置信区间的置信水平
+            bootstrap_resamples: 各场景平均分bootstrap置信区间的重抽样次数，0表示不计算
+        """
+        if not self.count:
+            return {}
+
+        scores = self.scores.summary(confidence, bootstrap_resamples)
+        return {
+            'total_tests': self.count,
+            'average_score': scores['average_score'],
+            'max_score': scores['max_score'],
+            'min_score': scores['min_score'],
+            'score_stdev': scores['stdev'],
+            'score_percentiles': scores['percentiles'],
+            'score_distribution': scores['score_distribution'],
+            'scenario_statistics': scores['groups'],
+            'performance_metrics': {
+                'total_api_time': run_stats['total_api_time'],
+                'average_api_time': run_stats['total_api_time'] / self.count,
+                'success_rate': self.count / run_stats['total_tests'] * 100
+            }
+        }
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分层抽样模块
+按分类/场景/优先级等字段把测试集分层，按比例或Neyman最优分配从各层随机抽取用例，
+并根据抽样结果估计整个测试集和各层的平均分及置信区间
+"""
+
+import math
+import heapq
+import hashlib
+import logging
+import statistics
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.online_stats import RunningStats, t_quantile
+
+logger = logging.getLogger(__name__)
+
+# 可用于分层的测试用例字段
+STRATA_FIELDS = ('category', 'scenario', 'priority')
+
+ALLOCATIONS = ('proportional', 'neyman')
+
+def parse_stratify(value: str) -> Tuple[str, ...]:
+    """解析分层字段参数 "category,scenario"
+
+    Raises:
+        ValueError: 包含不支持的字段
+    """
+    fields = tuple(field.strip() for field in value.split(',') if field.strip())
+    unknown = [field for field in fields if field not in STRATA_FIELDS]
+    if unknown:
+        raise ValueError(f"不支持的分层字段: {', '.join(unknown)}（可选: {', '.join(STRATA_FIELDS)}）")
+    return fields
+
+def stratum_of(test_case: Any, fields: Tuple[str, ...]) -> str:
+    """测试用例所属的层，不分层时所有用例属于同一层"""
+    return '/'.join(str(getattr(test_case, field)) for field in fields) or 'all'
+
+def sample_key(seed: int, test_id: str) -> int:
+    """用例的抽样序号，由种子和用例ID决定，与用例在测试集中的位置无关"""
+    digest = hashlib.sha256(f"{seed}:{test_id}".encode('utf-8')).hexdigest()
+    return int(digest[:16], 16)
+
+def allocate(populations: Dict[str, int], size: int,
+             spreads: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+    """把样本量分配到各层
+
+    每层先分配2个用例（层内用例不足时取全部）以便估计方差，其余按层大小（比例分配）
+    或层大小乘以分数标准差（Neyman最优分配）的比例分配，取整后按余数从大到小补齐，
+    超出层大小的部分重新分配给其他层。
+
+    Args:
+        populations: 各层用例数
+        size: 样本量
+        spreads: 各层分数的标准差，None 表示比例分配
+
+    Returns:
+        各层抽取的用例数
+
+    Raises:
+        ValueError: 样本量不足以给每层分配2个用例，此时部分层没有样本，无法估计整体平均分
+    """
+    allocation = {stratum: min(count, 2) for stratum, count in populations.items()}
+    if sum(allocation.values()) > size:
+        raise ValueError(f"样本量 {size} 不足以给 {len(populations)} 层各分配2个用例（至少需要 "
+                         f"{sum(allocation.values())} 个），请增大 --sample 或减少 --stratify 的分层字段")
+    weights = {stratum: count * (spreads[stratum] if spreads else 1.0) for stratum, count in populations.items()}
+
+    remaining = size - sum(allocation.values())
+    open_strata = [stratum for stratum in populations if allocation[stratum] < populations[stratum]]
+    while remaining > 0 and open_strata:
+        total = sum(weights[stratum] for stratum in open_strata)
+        shares = {stratum: remaining * (weights[stratum] / total if total else 1 / len(open_strata))
+                  for stratum in open_strata}
+        grants = {stratum: int(share) for stratum, share in shares.items()}
+        leftover = remaining - sum(grants.values())
+        for stratum in sorted(open_strata, key=lambda s: (shares[s] - grants[s], s), reverse=True)[:leftover]:
+            grants[stratum] += 1
+        for stratum, grant in grants.items():
+            grant = min(grant, populations[stratum] - allocation[stratum])
+            allocation[stratum] += grant
+            remaining -= grant
+        open_strata = [stratum for stratum in open_strata if allocation[stratum] < populations[stratum]]
+    return allocation
+
+class StratifiedSample:
+    """测试集的分层随机样本及其估计
+
+    抽样分两遍读取测试集：第一遍统计各层用例数并分配样本量，第二遍在每层中选取抽样序号最小的用例。
+    抽样序号由种子和用例ID哈希得到，相同种子下样本与用例顺序无关，中断后可从日志恢复同一个样本。
+    """
+
+    def __init__(self, size: int, fields: Tuple[str, ...] = (), seed: int = 0,
+                 allocation: str = 'proportional', prior_scores: Optional[Dict[str, float]] = None,
+                 confidence: float = 0.95):
+        """初始化抽样
+
+        Args:
+            size: 样本量
+            fields: 分层字段，见 STRATA_FIELDS
+            seed: 随机种子
+            allocation: 分配方式，proportional 或 neyman
+            prior_scores: 以往评估的分数 {用例ID: 分数}，Neyman分配用于估计各层的分数标准差
+            confidence: 置信水平
+
+        Raises:
+            ValueError: 参数无效
+        """
+        if size <= 0:
+            raise ValueError(f"样本量必须大于0: {size}")
+        if allocation not in ALLOCATIONS:
+            raise ValueError(f"不支持的分配方式: {allocation}")
+        if allocation == 'neyman' and not prior_scores:
+            raise ValueError("Neyman分配需要以往的评估结果来估计各层的分数标准差")
+        if not 0 < confidence < 1:
+            raise ValueError(f"置信水平应在0和1之间: {confidence}")
+        self.size = size
+        self.fields = tuple(fields)
+        self.seed = seed
+        self.allocation = allocation
+        self.prior_scores = prior_scores or {}
+        self.confidence = confidence
+
+        self.populations: Dict[str, int] = {}
+        self.scenario_populations: Dict[str, int] = {}
+        self.quotas: Dict[str, int] = {}
+        self.spreads: Optional[Dict[str, float]] = None
+        self._strata: Dict[str, str] = {}
+        self._scores: Dict[str, RunningStats] = {}
+        self._lock = threading.Lock()
+
+    def _estimate_spreads(self, prior: Dict[str, List[float]]) -> Dict[str, float]:
+        """由以往的分数估计各层的标准差，以往分数不足2个的层使用全部以往分数的标准差"""
+        pooled = [score for scores in prior.values() for score in scores]
+        fallback = statistics.stdev(pooled) if len(pooled) > 1 else 1.0
+        spreads = {}
+        for stratum in self.populations:
+            scores = prior.get(stratum, [])
+            spreads[stratum] = statistics.stdev(scores) if len(scores) > 1 else fallback
+        return spreads
+
+    def draw(self, read_cases: Callable[[], Iterable[Any]]) -> List[Any]:
+        """抽取样本
+
+        Args:
+            read_cases: 返回测试用例迭代器的函数，会被调用两次
+
+        Returns:
+            样本中的测试用例（按抽样序号排列）
+
+        Raises:
+            ValueError: 样本量小于每层2个用例所需的总数
+        """
+        self.populations = {}
+        self.scenario_populations = {}
+        prior: Dict[str, List[float]] = {}
+        for test_case in read_cases():
+            stratum = stratum_of(test_case, self.fields)
+            self.populations[stratum] = self.populations.get(stratum, 0) + 1
+            self.scenario_populations[test_case.scenario] = self.scenario_populations.get(test_case.scenario, 0) + 1
+            if test_case.id in self.prior_scores:
+                prior.setdefault(stratum, []).append(self.prior_scores[test_case.id])
+
+        if self.allocation == 'neyman':
+            self.spreads = self._estimate_spreads(prior)
+        self.quotas = allocate(self.populations, self.size, self.spreads)
+
+        # 每层保留抽样序号最小的 quota 个用例（大顶堆）
+        heaps: Dict[str, List[Tuple[int, int, Any]]] = {stratum: [] for stratum in self.quotas}
+        for position, test_case in enumerate(read_cases()):
+            stratum = stratum_of(test_case, self.fields)
+            quota = self.quotas.get(stratum, 0)
+            if not quota:
+                continue
+            entry = (-sample_key(self.seed, test_case.id), position, test_case)
+            heap = heaps[stratum]
+            if len(heap) < quota:
+                heapq.heappush(heap, entry)
+            elif entry[0] > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+
+        selected = sorted((entry for heap in heaps.values() for entry in heap), key=lambda e: (-e[0], e[1]))
+        for _, _, test_case in selected:
+            self._strata[test_case.id] = stratum_of(test_case, self.fields)
+        self._scores = {stratum: RunningStats() for stratum in self.populations}
+        logger.info(f"分层抽样: 从 {sum(self.populations.values())} 个用例的 {len(self.populations)} 层中抽取 {len(selected)} 个")
+        return [test_case for _, _, test_case in selected]
+
+    def add(self, test_id: str, score: float):
+        """加入一个已完成用例的分数，不在样本中的用例忽略"""
+        stratum = self._strata.get(test_id)
+        if stratum is not None:
+            with self._lock:
+                self._scores[stratum].add(score)
+
+    def _stratum_estimate(self, stratum: str) -> Dict[str, Any]:
+        """层内平均分及其置信区间（t分布，有限总体校正）"""
+        scores = self._scores[stratum]
+        population = self.populations[stratum]
+        n = scores.count
+        estimate = {
+            'population': population,
+            'sample': self.quotas.get(stratum, 0),
+            'evaluated': n,
+            'mean': round(scores.mean, 3) if n else None,
+            'ci_half_width': None
+        }
+        if n >= population and n:
+            estimate['ci_half_width'] = 0.0
+        elif n > 1:
+            se = math.sqrt(scores.variance / n * (1 - n / population))
+            estimate['ci_half_width'] = round(t_quantile((1 + self.confidence) / 2, n - 1) * se, 3)
+        if self.spreads:
+            estimate['prior_sd'] = round(self.spreads[stratum], 3)
+        return estimate
+
+    def _overall(self) -> Dict[str, Any]:
+        """整个测试集的分层估计：各层平均分按层大小加权，方差自由度按Welch-Satterthwaite近似"""
+        total = sum(self.populations.values())
+        if not total or any(not self._scores[stratum].count for stratum in self.populations):
+            return {'mean': None, 'ci_half_width': None}
+
+        mean = 0.0
+        terms = []
+        undefined = False
+        for stratum, population in self.populations.items():
+            scores = self._scores[stratum]
+            n = scores.count
+            weight = population / total
+            mean += weight * scores.mean
+            if n < population:
+                if n < 2:
+                    undefined = True
+                else:
+                    terms.append((weight ** 2 * (1 - n / population) * scores.variance / n, n - 1))
+        if undefined:
+            return {'mean': round(mean, 3), 'ci_half_width': None}
+
+        variance = sum(term for term, _ in terms)
+        if not variance:
+            return {'mean': round(mean, 3), 'ci_half_width': 0.0}
+        df = variance ** 2 / sum(term ** 2 / dof for term, dof in terms if term)
+        half = t_quantile((1 + self.confidence) / 2, max(int(df), 1)) * math.sqrt(variance)
+        return {'mean': round(mean, 3), 'ci_half_width': round(half, 3), 'df': round(df, 1)}
+
+    def summary(self) -> Dict[str, Any]:
+        """样本设计和整个测试集、各层的估计"""
+        with self._lock:
+            return {
+                'size': sum(self.quotas.values()),
+                'population': sum(self.populations.values()),
+                'stratify': list(self.fields),
+                'allocation': self.allocation,
+                'seed': self.seed,
+                'confidence': self.confidence,
+                'evaluated': sum(scores.count for scores in self._scores.values()),
+                'overall': self._overall(),
+                'strata': {stratum: self._stratum_estimate(stratum) for stratum in sorted(self.populations)}
+            }
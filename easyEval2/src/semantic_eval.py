@@ -7,15 +7,35 @@
 
 import json
 import time
+import hashlib
+import asyncio
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Sized, Tuple
 from dataclasses import dataclass, asdict
 
+import requests
+
 from config.config import config
+from config.prompts import PromptBuilder
 from src.deepseek_client import DeepSeekClient
 from src.local_api_client import LocalAPIClient
+from src.pipeline import EvaluationPipeline
+from src.http_client import get_http_client
+from src.cache import JudgeCache, AnswerStore
+from src.journal import ResultJournal
+from src.running_summary import RunningSummary
+from src.suite_loader import iter_suite
+from src.suite_index import SuiteIndex
+from src import tracing
+from src.tracing import CaseTrace, StageStats, TraceExporter
+from src.usage import UsageMeter, load_price_table
+from src.sequential import SequentialMonitor
+from src.sampling import StratifiedSample
+from src.status import RunMonitor
+from src.compare import PairedComparison, VERDICT_NAMES, format_p_value
 
 @dataclass
 class TestCase:
@@ -44,20 +64,37 @@ class EvaluationResult:
     timestamp: str
     api_response_time: float = 0.0
     raw_response: Optional[str] = None
+    timings: Optional[Dict[str, Any]] = None
+    usage: Optional[Dict[str, Any]] = None
+    parse_repairs: Optional[List[str]] = None
+    fingerprint: Optional[str] = None
+    category: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
         return asdict(self)
 
+def format_interval(stats: Dict[str, Any]) -> str:
+    """格式化场景平均分的置信区间：有bootstrap区间时显示区间，否则显示t分布的半宽"""
+    if stats.get('bootstrap_ci'):
+        low, high = stats['bootstrap_ci']
+        return f"[{low:.1f}, {high:.1f}]"
+    if stats.get('ci_half_width') is not None:
+        return f"±{stats['ci_half_width']:.2f}"
+    return "样本不足"
+
 class SemanticEvaluator:
     """语义评估器"""
     
-    def __init__(self, use_local_api: bool = False, local_api_url: str = "http://localhost:8000"):
+    def __init__(self, use_local_api: bool = False, local_api_url: str = "http://localhost:8000",
+                 use_cache: Optional[bool] = None, answer_policy: Optional[str] = None):
         """初始化评估器
         
         Args:
             use_local_api: 是否使用本地API客户端
             local_api_url: 本地API服务器地址
+            use_cache: 是否启用评估结果缓存，默认取 JUDGE_CACHE_ENABLED 配置
+            answer_policy: EasyChat回答复用策略 reuse/refresh/off，默认取 ANSWER_STORE_POLICY 配置
         """
         self.logger = logging.getLogger(__name__)
         
@@ -72,8 +109,91 @@ class SemanticEvaluator:
         # 保持向后兼容性
         self.deepseek_client = self.api_client if not use_local_api else None
         
+        # 评估结果缓存
+        self.judge_cache = None
+        if use_cache if use_cache is not None else config.cache.enabled:
+            self.judge_cache = JudgeCache(
+                config.cache.path,
+                max_entries=config.cache.max_entries,
+                max_age_days=config.cache.max_age_days
+            )
+            self.judge_cache.evict()
+            self.api_client.cache = self.judge_cache
+            self.logger.info(f"评估结果缓存已启用: {config.cache.path}")
+        
+        # EasyChat回答存储：reuse 复用已有回答，refresh 强制重新生成并覆盖，off 不使用
+        self.answer_policy = answer_policy or config.answer_store.policy
+        if self.answer_policy not in ('reuse', 'refresh', 'off'):
+            raise ValueError(f"未知的回答复用策略: {self.answer_policy}")
+        self.answer_store = None
+        if self.answer_policy != 'off':
+            self.answer_store = AnswerStore(
+                config.answer_store.path,
+                max_entries=config.answer_store.max_entries,
+                max_age_days=config.answer_store.ttl_days
+            )
+            self.answer_store.evict()
+            self.logger.info(f"EasyChat回答存储已启用 ({self.answer_policy}): {config.answer_store.path}")
+        self._easychat_version = None
+        self._easychat_version_lock = threading.Lock()
+        
+        # EasyChat请求共享的keep-alive连接池
+        self.easychat_http = get_http_client(config.easychat.url, config.easychat.timeout)
+        
         self.results: List[EvaluationResult] = []
         
+        # 并发评估时保护统计信息的锁
+        self._stats_lock = threading.Lock()
+        self._total_known = True
+        
+        # 当前批量评估使用的流水线（仅并发模式）
+        self.pipeline = None
+        
+        # 结果日志及从日志恢复的结果
+        self.journal: Optional[ResultJournal] = None
+        self._resumed_results: List[EvaluationResult] = []
+        self._resumed_ids: set = set()
+        self._resumed_api_time = 0.0
+        self._resumed_scores: List[Tuple[str, str, float]] = []
+        
+        # 顺序评估的停止规则（--sequential），估计足够精确时停止调度新用例
+        self.sequential: Optional[SequentialMonitor] = None
+        # 分层抽样（--sample），评估结束后估计整个测试集的平均分
+        self.sample: Optional[StratifiedSample] = None
+        # 本轮已调度的用例数，用于按预算限制进行中的用例数
+        self._scheduled = 0
+        # 与基线配对对比（--compare-to），回归判定有结论时停止调度新用例
+        self.comparison: Optional[PairedComparison] = None
+        
+        # 增量评估（--incremental）：基线结果、沿用的用例和沿用基线回答的用例
+        self._baseline: Dict[str, Dict[str, Any]] = {}
+        self._carried_ids: set = set()
+        self._baseline_answers: Dict[str, str] = {}
+        # EasyChat版本与基线不同时重新获取所有用例的回答
+        self._refetch_baseline_answers = False
+        
+        # 流式输出模式下不在内存中保留结果；摘要始终由增量统计生成，
+        # 从日志恢复（或沿用基线）的结果与本轮评估的结果分别统计，生成摘要时合并
+        self.keep_results = True
+        self.running_summary = RunningSummary()
+        self._resumed_summary = RunningSummary()
+        self.bootstrap_resamples = config.evaluation.bootstrap_resamples
+        
+        # 进行中用例的阶段耗时记录、本轮的分阶段统计和可选的追踪导出
+        self._traces: Dict[str, CaseTrace] = {}
+        self._traces_lock = threading.Lock()
+        self.stage_stats = StageStats()
+        self.trace_exporter: Optional[TraceExporter] = None
+        
+        # 运行状态（--status-port / --dashboard），每个结束的用例计入滚动统计
+        self.status_monitor: Optional[RunMonitor] = None
+        
+        # 评估模型的Token用量、费用和预算，预算用尽时停止调度新用例
+        self.prices = load_price_table(config.cost.price_table)
+        self.max_tokens_budget = config.cost.max_tokens
+        self.max_cost_budget = config.cost.max_cost
+        self.usage_meter = self._new_usage_meter()
+        
         # 统计信息
         self.stats = {
             'total_tests': 0,
@@ -88,72 +208,104 @@ class SemanticEvaluator:
         self.logger.info("语义评估器初始化完成")
     
     def load_test_cases(self, test_file: str) -> List[TestCase]:
-        """加载测试用例"""
+        """加载全部测试用例"""
+        return list(self.iter_test_cases(test_file))
+    
+    def iter_test_cases(self, test_file: str) -> Iterator[TestCase]:
+        """流式加载测试用例
+        
+        支持JSONL测试集、JSON列表和包含test_cases字段的JSON对象，
+        用例在迭代时逐个解析，不会把整个测试集读入内存。
+        """
         
         test_path = Path(test_file)
         if not test_path.exists():
             raise FileNotFoundError(f"测试用例文件不存在: {test_file}")
+        return self._stream_test_cases(test_path)
+    
+    def _stream_test_cases(self, test_path: Path) -> Iterator[TestCase]:
+        """逐个解析测试用例记录"""
         
+        count = 0
         try:
-            with open(test_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            test_cases = []
-            
-            # 支持两种格式：直接列表或包含test_cases字段的对象
-            if isinstance(data, list):
-                cases_data = data
-            elif isinstance(data, dict) and 'test_cases' in data:
-                cases_data = data['test_cases']
-            else:
-                raise ValueError("测试用例文件格式不正确")
-            
-            for case_data in cases_data:
-                test_case = TestCase(
-                    id=case_data.get('id', f"test_{len(test_cases)+1}"),
-                    question=case_data['question'],
-                    category=case_data.get('category', 'general'),
-                    expected_aspects=case_data.get('expected_aspects', []),
-                    priority=case_data.get('priority', 'medium'),
-                    scenario=case_data.get('scenario', 'general')
-                )
-                test_cases.append(test_case)
-            
-            self.logger.info(f"成功加载 {len(test_cases)} 个测试用例")
-            return test_cases
-            
+            for case_data in iter_suite(test_path):
+                count += 1
+                yield self._make_test_case(case_data, count)
         except Exception as e:
             self.logger.error(f"加载测试用例失败: {str(e)}")
             raise
+        
+        self.logger.info(f"成功加载 {count} 个测试用例")
+    
+    def iter_indexed_test_cases(self, test_file: str, skip: int = 0, limit: Optional[int] = None,
+                                **filters) -> Iterator[TestCase]:
+        """通过编译后的测试集索引加载测试用例
+        
+        过滤和切片直接在索引上查询，索引不存在或源文件已变化时自动重新编译。
+        
+        Args:
+            test_file: 测试集源文件
+            skip: 跳过前N个符合条件的用例
+            limit: 最多加载的用例数
+            **filters: category / priority / scenario / ids / shard，见 SuiteIndex.query
+        """
+        
+        if not Path(test_file).exists():
+            raise FileNotFoundError(f"测试用例文件不存在: {test_file}")
+        index = SuiteIndex(test_file, config.suite_index.dir)
+        self.logger.info(f"使用测试集索引: {index.path}{'（已重新编译）' if index.rebuilt else ''}")
+        return (self._make_test_case(case_data, position)
+                for position, case_data in enumerate(index.query(skip, limit, **filters), 1))
+    
+    @staticmethod
+    def _make_test_case(case_data: Dict[str, Any], position: int) -> TestCase:
+        """由测试用例记录构建测试用例，没有ID时按位置（从1开始）生成"""
+        return TestCase(
+            id=case_data.get('id', f"test_{position}"),
+            question=case_data['question'],
+            category=case_data.get('category', 'general'),
+            expected_aspects=case_data.get('expected_aspects', []),
+            priority=case_data.get('priority', 'medium'),
+            scenario=case_data.get('scenario', 'general')
+        )
     
     def get_easychat_response(self, question: str) -> Optional[str]:
         """获取EasyChat的回答"""
         
-        # 这里应该调用EasyChat API
-        # 目前使用模拟回答进行测试
-        
-        import requests
+        # 查询回答存储（refresh 策略跳过查询，重新生成后覆盖）
+        store_key = None
+        if self.answer_store:
+            version = self.get_easychat_version()
+            store_key = self.answer_store.make_answer_key(question, config.easychat.url, version)
+            if self.answer_policy == 'reuse':
+                with tracing.span('answer_store'):
+                    stored = self.answer_store.get(store_key)
+                if stored:
+                    self.logger.debug(f"复用已存储的EasyChat回答: {stored[:50]}...")
+                    return stored
+            else:
+                self.answer_store.record_miss()
         
         try:
             self.logger.debug(f"向EasyChat发送问题: {question[:50]}...")
             
             # 构建请求
-            url = f"{config.easychat.url}/chat"
             payload = {
                 "message": question,
                 "session_id": "eval_session"
             }
             
-            response = requests.post(
-                url, 
-                json=payload, 
-                timeout=config.easychat.timeout
-            )
+            with tracing.span('easychat'):
+                response = self.easychat_http.post('/chat', json=payload, read_timeout=config.easychat.timeout)
+            tracing.record_bytes(len(response.request.body or b''), len(response.content))
             
             if response.status_code == 200:
                 data = response.json()
                 answer = data.get('response', data.get('message', ''))
                 self.logger.debug(f"EasyChat回答: {answer[:50]}...")
+                if store_key and answer:
+                    self.answer_store.put(store_key, question, config.easychat.url,
+                                          self.get_easychat_version(), answer)
                 return answer
             else:
                 self.logger.warning(f"EasyChat API返回错误状态: {response.status_code}")
@@ -167,6 +319,52 @@ class SemanticEvaluator:
             self.logger.error(f"获取EasyChat回答时发生错误: {str(e)}")
             return None
     
+    def get_easychat_version(self) -> str:
+        """获取EasyChat服务端版本标识（系统提示词与模型的哈希）
+        
+        优先使用 /health 接口返回的 version 字段；旧版服务端不提供时，
+        退回到本地 easychat/systemprompt.md 的哈希。结果在评估器生命周期内缓存。
+        """
+        
+        with self._easychat_version_lock:
+            if self._easychat_version:
+                return self._easychat_version
+            
+            version = None
+            try:
+                response = self.easychat_http.get('/health', read_timeout=config.easychat.timeout)
+                if response.status_code == 200:
+                    version = response.json().get('version')
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.logger.warning(f"获取EasyChat版本失败: {str(e)}")
+            
+            if not version:
+                prompt_file = config.paths.project_root.parent / 'easychat' / 'systemprompt.md'
+                if prompt_file.exists():
+                    digest = hashlib.sha256(prompt_file.read_bytes()).hexdigest()[:16]
+                    version = f"local-{digest}"
+                else:
+                    version = 'unversioned'
+                self.logger.warning(f"EasyChat未报告版本，使用本地版本标识: {version}")
+            
+            self._easychat_version = version
+            return version
+    
+    def prewarm_connections(self, answer_workers: int = 1, judge_workers: int = 1):
+        """为EasyChat和本地API预先建立keep-alive连接
+        
+        每个并发worker各预建一个连接；本地API与EasyChat为同一服务时共享连接池，连接数相加。
+        """
+        
+        clients: Dict[int, list] = {id(self.easychat_http): [self.easychat_http, answer_workers]}
+        api_http = getattr(self.api_client, 'http', None)
+        if api_http:
+            clients.setdefault(id(api_http), [api_http, 0])[1] += judge_workers
+        
+        for client, connections in clients.values():
+            warmed = client.prewarm(connections)
+            self.logger.info(f"已预建立 {warmed}/{connections} 个连接: {client.base_url}")
+    
     def _get_mock_answer(self, question: str) -> str:
         """获取模拟回答（用于测试）"""
         
@@ -191,56 +389,171 @@ class SemanticEvaluator:
             self.logger.info(f"开始评估测试用例: {test_case.id}")
             
             # 获取AI回答
-            start_time = time.time()
-            answer = self.get_easychat_response(test_case.question)
-            
+            answer = self.fetch_answer(test_case)
             if not answer:
-                self.logger.error(f"无法获取测试用例 {test_case.id} 的回答")
                 return None
             
             # 进行语义评估
-            api_start_time = time.time()
+            return self.judge_answer(test_case, answer)
+            
+        except Exception as e:
+            self.logger.error(f"评估测试用例 {test_case.id} 时发生错误: {str(e)}")
+            return None
+    
+    def fetch_answer(self, test_case: TestCase) -> Optional[str]:
+        """获取测试用例的EasyChat回答（流水线的回答获取阶段）"""
+        
+        answer = self._baseline_answers.pop(test_case.id, None)
+        if answer is not None:
+            return answer
+        
+        with tracing.activate(self._trace_for(test_case)):
+            answer = self.get_easychat_response(test_case.question)
+        
+        if not answer:
+            self.logger.error(f"无法获取测试用例 {test_case.id} 的回答")
+            self._pop_trace(test_case)
+            return None
+        
+        return answer
+    
+    def judge_answer(self, test_case: TestCase, answer: str) -> Optional[EvaluationResult]:
+        """对已获取的回答进行语义评估（流水线的评估阶段）"""
+        
+        carried = self._baseline_result(test_case, answer) if self._baseline else None
+        if carried:
+            self._pop_trace(test_case)
+            self._carried_ids.add(test_case.id)
+            return carried
+        
+        api_start_time = time.time()
+        with tracing.activate(self._trace_for(test_case)):
             evaluation = self.api_client.evaluate_semantic_similarity(
                 test_case.question, 
                 answer, 
                 test_case.scenario
             )
-            api_response_time = time.time() - api_start_time
-            
-            if not evaluation:
-                self.logger.error(f"测试用例 {test_case.id} 的语义评估失败")
-                return None
-            
-            # 构建评估结果
-            result = EvaluationResult(
-                test_id=test_case.id,
-                question=test_case.question,
-                answer=answer,
-                semantic_score=evaluation['score'],
-                evaluation_reason=evaluation['reason'],
-                dimension_scores=evaluation.get('dimensions', {}),
-                scenario=test_case.scenario,
-                timestamp=datetime.now().isoformat(),
-                api_response_time=api_response_time,
-                raw_response=evaluation.get('raw_response')
-            )
+        api_response_time = time.time() - api_start_time
+        
+        return self._build_result(test_case, answer, evaluation, api_response_time)
+    
+    def judge_answers(self, items: List[Tuple[TestCase, str]]) -> List[Optional[EvaluationResult]]:
+        """批量评估多个已获取的回答
+        
+        同一场景的问答对合并为一次评估请求；客户端不支持批量评估时逐个评估。
+        
+        Args:
+            items: (测试用例, 回答) 列表
             
-            self.logger.info(f"测试用例 {test_case.id} 评估完成，得分: {result.semantic_score}")
-            return result
+        Returns:
+            与 items 一一对应的评估结果列表，失败的项为 None
+        """
+        
+        batch_judge = getattr(self.api_client, 'evaluate_semantic_similarity_batch', None)
+        if len(items) == 1 or not batch_judge:
+            return [self.judge_answer(test_case, answer) for test_case, answer in items]
+        
+        results: List[Optional[EvaluationResult]] = [None] * len(items)
+        by_scenario: Dict[str, List[int]] = {}
+        for i, (test_case, answer) in enumerate(items):
+            carried = self._baseline_result(test_case, answer) if self._baseline else None
+            if carried:
+                self._pop_trace(test_case)
+                self._carried_ids.add(test_case.id)
+                results[i] = carried
+                continue
+            by_scenario.setdefault(test_case.scenario, []).append(i)
+        
+        for scenario, indices in by_scenario.items():
+            api_start_time = time.time()
+            with tracing.activate(*(self._trace_for(items[i][0]) for i in indices)):
+                evaluations = batch_judge(
+                    [(items[i][0].question, items[i][1]) for i in indices],
+                    scenario
+                )
+            # 一次请求的耗时平摊到其中的每个用例
+            api_response_time = (time.time() - api_start_time) / len(indices)
             
-        except Exception as e:
-            self.logger.error(f"评估测试用例 {test_case.id} 时发生错误: {str(e)}")
+            for i, evaluation in zip(indices, evaluations):
+                test_case, answer = items[i]
+                results[i] = self._build_result(test_case, answer, evaluation, api_response_time)
+        
+        return results
+    
+    def _build_result(self, test_case: TestCase, answer: str, evaluation: Optional[Dict[str, Any]],
+                      api_response_time: float) -> Optional[EvaluationResult]:
+        """由评估模型的返回构建评估结果"""
+        
+        trace = self._pop_trace(test_case)
+        # 评估失败的请求同样消耗Token，计入本轮用量
+        usage = self.usage_meter.case_usage(trace.usage if trace else None)
+        self.usage_meter.add(usage, test_case.scenario)
+        if not evaluation:
+            self.logger.error(f"测试用例 {test_case.id} 的语义评估失败")
             return None
+        
+        # 构建评估结果
+        result = EvaluationResult(
+            test_id=test_case.id,
+            question=test_case.question,
+            answer=answer,
+            semantic_score=evaluation['score'],
+            evaluation_reason=evaluation['reason'],
+            dimension_scores=evaluation.get('dimensions', {}),
+            scenario=test_case.scenario,
+            timestamp=datetime.now().isoformat(),
+            api_response_time=api_response_time,
+            raw_response=evaluation.get('raw_response'),
+            timings=trace.to_dict() if trace else None,
+            usage=usage,
+            parse_repairs=evaluation.get('repairs'),
+            fingerprint=self.case_fingerprint(test_case, answer),
+            category=test_case.category
+        )
+        
+        self.logger.info(f"测试用例 {test_case.id} 评估完成，得分: {result.semantic_score}")
+        return result
     
-    def evaluate_batch(self, test_cases: List[TestCase], 
-                      progress_callback=None) -> List[EvaluationResult]:
-        """批量评估测试用例"""
+    def evaluate_batch(self, test_cases: Iterable[TestCase], 
+                      progress_callback=None,
+                      concurrency: Optional[int] = None,
+                      answer_workers: Optional[int] = None,
+                      judge_workers: Optional[int] = None,
+                      judge_batch_size: Optional[int] = None) -> List[EvaluationResult]:
+        """批量评估测试用例
+        
+        Args:
+            test_cases: 测试用例列表或流式迭代器（如 iter_test_cases 的返回值）
+            progress_callback: 进度回调 (current, total, test_id)，每完成一个用例调用一次；
+                               测试用例为迭代器时总数未知，total 为 None
+            concurrency: 同时进行中的用例数量，默认取 EVAL_CONCURRENCY 配置
+            answer_workers: 回答获取阶段的并发数，默认与 concurrency 相同
+            judge_workers: 评估阶段的并发数，默认与 concurrency 相同
+            judge_batch_size: 每次评估请求包含的问答对数量，默认取 EVAL_JUDGE_BATCH_SIZE 配置
+        """
         
-        self.logger.info(f"开始批量评估 {len(test_cases)} 个测试用例")
+        concurrency = concurrency or config.evaluation.concurrency
+        answer_workers = answer_workers or config.evaluation.answer_workers
+        judge_workers = judge_workers or config.evaluation.judge_workers
+        judge_batch_size = max(judge_batch_size or config.evaluation.judge_batch_size, 1)
+        if config.http.prewarm:
+            self.prewarm_connections(answer_workers or concurrency, judge_workers or concurrency)
+        if concurrency > 1 or answer_workers or judge_workers:
+            return asyncio.run(self.evaluate_batch_async(
+                test_cases, progress_callback, concurrency,
+                answer_workers=answer_workers,
+                judge_workers=judge_workers,
+                judge_batch_size=judge_batch_size
+            ))
+        if judge_batch_size > 1:
+            return self._evaluate_batch_chunked(test_cases, progress_callback, judge_batch_size)
+        
+        total = self._count_cases(test_cases)
+        self.logger.info(f"开始批量评估 {total or '流式读取的'} 个测试用例")
         
         # 初始化统计信息
-        self.stats['total_tests'] = len(test_cases)
-        self.stats['start_time'] = datetime.now().isoformat()
+        self._reset_stats(total)
+        test_cases = self._schedule_gate(test_cases)
         
         results = []
         
@@ -249,46 +562,538 @@ class SemanticEvaluator:
                 # 评估单个用例
                 result = self.evaluate_single(test_case)
                 
-                if result:
+                if result and self.keep_results:
                     results.append(result)
-                    self.stats['completed_tests'] += 1
-                    self.stats['total_api_time'] += result.api_response_time
-                else:
-                    self.stats['failed_tests'] += 1
+                self._record_outcome(result)
                 
                 # 进度回调 - 在评估完成后调用
                 if progress_callback:
-                    progress_callback(i, len(test_cases), test_case.id)
+                    progress_callback(i, total, test_case.id)
                 
                 # 显示进度（仅在没有进度回调时显示）
                 if not progress_callback:
-                    progress = (i + 1) / len(test_cases) * 100
-                    self.logger.info(f"进度: {progress:.1f}% ({i+1}/{len(test_cases)})")
+                    self._log_progress(i + 1, total)
                 
             except KeyboardInterrupt:
                 self.logger.warning("用户中断评估过程")
                 break
             except Exception as e:
                 self.logger.error(f"处理测试用例时发生错误: {str(e)}")
-                self.stats['failed_tests'] += 1
+                self._record_outcome(None)
                 # 即使出错也要更新进度
                 if progress_callback:
-                    progress_callback(i, len(test_cases), test_case.id)
+                    progress_callback(i, total, test_case.id)
+                continue
+        
+        return self._finish_batch(results)
+    
+    def _evaluate_batch_chunked(self, test_cases: Iterable[TestCase], progress_callback,
+                                judge_batch_size: int) -> List[EvaluationResult]:
+        """顺序批量评估：按场景暂存回答，凑满 judge_batch_size 个后合并为一次评估请求"""
+        
+        total = self._count_cases(test_cases)
+        self.logger.info(f"开始批量评估 {total or '流式读取的'} 个测试用例，每次评估 {judge_batch_size} 个问答对")
+        self._reset_stats(total)
+        test_cases = self._schedule_gate(test_cases)
+        
+        completed: Dict[int, EvaluationResult] = {}
+        pending: Dict[str, List[Tuple[int, TestCase, str]]] = {}
+        done_count = 0
+        
+        def finish(index: int, test_case: TestCase, result: Optional[EvaluationResult]):
+            nonlocal done_count
+            if result and self.keep_results:
+                completed[index] = result
+            self._record_outcome(result)
+            
+            done_count += 1
+            if progress_callback:
+                progress_callback(done_count - 1, total, test_case.id)
+            else:
+                self._log_progress(done_count, total)
+        
+        def judge_group(group: List[Tuple[int, TestCase, str]]):
+            try:
+                group_results = self.judge_answers([(test_case, answer) for _, test_case, answer in group])
+            except Exception as e:
+                self.logger.error(f"批量评估时发生错误: {str(e)}")
+                group_results = [None] * len(group)
+            for (index, test_case, _), result in zip(group, group_results):
+                finish(index, test_case, result)
+        
+        try:
+            for index, test_case in enumerate(test_cases):
+                answer = self.fetch_answer(test_case)
+                if not answer:
+                    finish(index, test_case, None)
+                    continue
+                
+                group = pending.setdefault(test_case.scenario, [])
+                group.append((index, test_case, answer))
+                if len(group) >= judge_batch_size:
+                    judge_group(pending.pop(test_case.scenario))
+            
+            # 评估各场景剩余不足一批的回答
+            while pending:
+                judge_group(pending.pop(next(iter(pending))))
+                    
+        except KeyboardInterrupt:
+            self.logger.warning("用户中断评估过程")
+        
+        return self._finish_batch([completed[i] for i in sorted(completed)])
+    
+    async def evaluate_batch_async(self, test_cases: Iterable[TestCase],
+                                   progress_callback=None,
+                                   concurrency: int = 4,
+                                   answer_workers: Optional[int] = None,
+                                   judge_workers: Optional[int] = None,
+                                   judge_batch_size: int = 1) -> List[EvaluationResult]:
+        """并发批量评估测试用例
+        
+        回答获取和语义评估分为两个流水线阶段，各自拥有独立的并发数，
+        中间通过有界队列连接，使EasyChat和评估服务同时保持忙碌。
+        judge_batch_size 大于1时评估阶段每次从队列取最多该数量的回答合并评估。
+        测试用例可以是流式迭代器，回答阶段按需逐个读取。
+        结果按测试用例的原始顺序返回。
+        """
+        
+        total = self._count_cases(test_cases)
+        self._reset_stats(total)
+        test_cases = self._schedule_gate(test_cases)
+        
+        self.pipeline = EvaluationPipeline(
+            self,
+            answer_workers=answer_workers or concurrency,
+            judge_workers=judge_workers or concurrency,
+            queue_size=config.evaluation.queue_size or None,
+            judge_batch_size=judge_batch_size,
+            judge_batch_wait=config.evaluation.judge_batch_wait
+        )
+        self.logger.info(
+            f"开始并发评估 {total or '流式读取的'} 个测试用例，"
+            f"回答并发: {self.pipeline.answer_stats.workers}，评估并发: {self.pipeline.judge_stats.workers}"
+        )
+        
+        completed: Dict[int, EvaluationResult] = {}
+        done_count = 0
+        
+        def on_result(index: int, test_case: TestCase, result: Optional[EvaluationResult]):
+            nonlocal done_count
+            if result and self.keep_results:
+                completed[index] = result
+            self._record_outcome(result)
+            
+            done_count += 1
+            if progress_callback:
+                progress_callback(done_count - 1, total, test_case.id)
+            else:
+                self._log_progress(done_count, total)
+        
+        try:
+            await self.pipeline.run(test_cases, on_result)
+        except asyncio.CancelledError:
+            self.logger.warning("用户中断评估过程")
+        
+        return self._finish_batch([completed[i] for i in sorted(completed)])
+    
+    def open_journal(self, journal_file: str, header: Optional[Dict[str, Any]] = None,
+                     streaming: bool = False):
+        """打开结果日志，之后每个完成的用例都会立即追加写入
+        
+        Args:
+            journal_file: 日志文件路径
+            header: 新建日志时写入的头部信息
+            streaming: 流式输出模式，日志即为结果文件，结果不在内存中保留
+        """
+        
+        self.journal = ResultJournal(journal_file, header={
+            'evaluator_version': '2.0.0',
+            'output_format': 'jsonl' if streaming else 'json',
+            **(header or {})
+        })
+        if streaming:
+            self.keep_results = False
+        self.logger.info(f"评估结果日志: {journal_file}")
+    
+    def resume_from_journal(self, journal_file: str) -> Dict[str, Any]:
+        """从结果日志恢复已完成的用例，并继续向该日志追加
+        
+        Returns:
+            日志头部信息
+        """
+        
+        header, records = ResultJournal.load(journal_file)
+        self.open_journal(journal_file, streaming=header.get('output_format') == 'jsonl')
+        
+        for record in records:
+            self._adopt_result(EvaluationResult(**record))
+        
+        self.logger.info(f"从日志 {journal_file} 恢复 {len(self._resumed_ids)} 个已完成的用例")
+        return header
+    
+    def load_merged_results(self, records: List[Dict[str, Any]], statistics: Dict[str, Any]):
+        """载入合并后的分片结果，之后可按正常评估结束的方式保存报告
+        
+        Args:
+            records: 合并后的结果记录
+            statistics: 合并后的运行统计
+        """
+        
+        results = [EvaluationResult(**record) for record in records]
+        self.stats.update(statistics)
+        
+        # 按合并后的结果重新计算分阶段耗时
+        stage_stats = StageStats()
+        for result in results:
+            if result.timings:
+                stage_stats.add(result.timings)
+        if stage_stats.cases:
+            self.stats['stage_timings'] = stage_stats.summary()
+        
+        # 按合并后的结果重新汇总Token用量（费用沿用各分片的估算）
+        usage_meter = UsageMeter(statistics.get('usage', {}).get('model'), self.prices, config.cost.currency)
+        for result in results:
+            if result.usage:
+                usage_meter.add(result.usage, result.scenario)
+        if usage_meter.totals['total_tokens']:
+            self.stats['usage'] = usage_meter.summary()
+        self.running_summary = RunningSummary()
+        for result in results:
+            self.running_summary.add(result)
+        if self.keep_results:
+            self.results = results
+        else:
+            for result in results:
+                self.journal.append(result.to_dict())
+    
+    def _adopt_result(self, result: EvaluationResult):
+        """加入一个不需要重新评估的结果（从日志恢复或沿用基线），计入本轮的结果和统计"""
+        self._resumed_ids.add(result.test_id)
+        self._resumed_api_time += result.api_response_time
+        self._resumed_scores.append((result.test_id, result.scenario, result.semantic_score))
+        self._resumed_summary.add(result)
+        if self.keep_results:
+            self._resumed_results.append(result)
+    
+    @property
+    def judge_model(self) -> str:
+        """评估模型标识，本地API模式下为本地API地址"""
+        return getattr(self.api_client, 'model', None) or f"local:{getattr(self.api_client, 'base_url', '')}"
+    
+    def case_fingerprint(self, test_case: TestCase, answer: str) -> str:
+        """用例的评估指纹：问题、场景、回答、渲染后的评估提示词和评估模型都相同时评估结果可以沿用"""
+        messages = PromptBuilder.for_scenario(test_case.scenario).build_messages(test_case.question, answer)
+        return JudgeCache.make_key(test_case.question, test_case.scenario, answer, messages, self.judge_model)
+    
+    def set_baseline(self, records: Iterable[Dict[str, Any]], statistics: Optional[Dict[str, Any]] = None):
+        """设置增量评估的基线结果（以往的评估输出，见 sharding.load_shard_results）
+        
+        基线运行统计中记录的EasyChat版本与当前版本不同时（系统提示词或模型已变化），
+        基线中的回答已经过期，之后重新获取所有用例的回答，新回答与基线相同时仍沿用基线的评估结果。
+        """
+        self._baseline = {record['test_id']: record for record in records}
+        self.logger.info(f"增量评估基线: {len(self._baseline)} 个成功的用例")
+        
+        statistics = statistics or {}
+        baseline_version = statistics.get('easychat_version') or statistics.get('answer_store', {}).get('version')
+        self._refetch_baseline_answers = False
+        if not baseline_version:
+            self.logger.warning("基线没有记录EasyChat版本，无法确认基线中的回答是否过期，"
+                                "EasyChat服务端变化后请使用 --answers refresh")
+        elif baseline_version != self.get_easychat_version():
+            self._refetch_baseline_answers = True
+            self.logger.warning(f"EasyChat版本已变化（基线 {baseline_version}，当前 {self._easychat_version}），"
+                                f"重新获取所有用例的回答，回答未变的用例沿用基线的评估结果")
+    
+    def _baseline_result(self, test_case: TestCase, answer: str) -> Optional[EvaluationResult]:
+        """指纹与基线一致时返回基线中的结果"""
+        record = self._baseline.get(test_case.id)
+        if not record or not record.get('fingerprint') or record.get('answer') != answer:
+            return None
+        if self.case_fingerprint(test_case, answer) != record['fingerprint']:
+            return None
+        fields = EvaluationResult.__dataclass_fields__
+        return EvaluationResult(**{key: value for key, value in record.items() if key in fields})
+    
+    def _carry_forward(self, result: EvaluationResult):
+        """沿用基线中的结果，写入结果日志"""
+        with self._stats_lock:
+            self._carried_ids.add(result.test_id)
+            self._adopt_result(result)
+            if self.sequential:
+                self.sequential.add(result.scenario, result.semantic_score)
+            if self.sample:
+                self.sample.add(result.test_id, result.semantic_score)
+            if self.comparison:
+                self._add_comparison(result)
+        if self.journal:
+            self.journal.append(result.to_dict())
+    
+    def plan_incremental(self, test_cases: Iterable[TestCase]) -> Iterator[TestCase]:
+        """增量评估：只放行指纹与基线不一致或基线中失败（缺失）的用例，其余沿用基线结果
+        
+        问题未变的用例沿用基线中的回答（回答复用策略为 refresh 或EasyChat版本与基线不同时重新获取回答，
+        新回答与基线相同时在评估阶段沿用基线结果）。
+        """
+        for test_case in test_cases:
+            record = self._baseline.get(test_case.id)
+            if record is None or record.get('question') != test_case.question:
+                yield test_case
+                continue
+            if self.answer_policy == 'refresh' or self._refetch_baseline_answers:
+                yield test_case
                 continue
+            carried = self._baseline_result(test_case, record['answer'])
+            if carried:
+                self._carry_forward(carried)
+                continue
+            self._baseline_answers[test_case.id] = record['answer']
+            yield test_case
+    
+    def completed_test_ids(self) -> set:
+        """已从日志恢复的用例ID"""
+        return self._resumed_ids
+    
+    def _trace_for(self, test_case: TestCase) -> CaseTrace:
+        """获取（或新建）用例的阶段耗时记录"""
+        with self._traces_lock:
+            trace = self._traces.get(test_case.id)
+            if trace is None:
+                trace = self._traces[test_case.id] = CaseTrace(test_case.id)
+            return trace
+    
+    def _pop_trace(self, test_case: TestCase) -> Optional[CaseTrace]:
+        """用例结束时取出其阶段耗时记录"""
+        with self._traces_lock:
+            return self._traces.pop(test_case.id, None)
+    
+    def set_budget(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None):
+        """设置本轮评估的Token和费用预算，None 表示沿用 BUDGET_MAX_TOKENS / BUDGET_MAX_COST 配置，0表示不限制"""
+        if max_tokens is not None:
+            self.max_tokens_budget = max_tokens
+        if max_cost is not None:
+            self.max_cost_budget = max_cost
+        self.usage_meter = self._new_usage_meter()
+    
+    def _new_usage_meter(self) -> UsageMeter:
+        return UsageMeter(getattr(self.api_client, 'model', None), self.prices, config.cost.currency,
+                          max_tokens=self.max_tokens_budget, max_cost=self.max_cost_budget)
+    
+    def enable_sequential(self, monitor: SequentialMonitor):
+        """启用顺序评估：之后每完成一个用例更新估计，满足停止条件时停止调度新用例
         
-        # 更新统计信息
-        self.stats['end_time'] = datetime.now().isoformat()
-        if results:
-            self.stats['average_score'] = sum(r.semantic_score for r in results) / len(results)
+        已从日志恢复的用例分数同样计入估计。
+        """
+        self.sequential = monitor
+        for _, scenario, score in self._resumed_scores:
+            monitor.add(scenario, score)
+    
+    def enable_sampling(self, sample: StratifiedSample):
+        """启用分层抽样估计：样本中每个完成的用例计入所在层（含从日志恢复的用例）"""
+        self.sample = sample
+        for test_id, _, score in self._resumed_scores:
+            sample.add(test_id, score)
+    
+    def enable_comparison(self, comparison: PairedComparison):
+        """启用与基线的配对对比：之后每完成一个用例更新回归判定（含从日志恢复的用例）"""
+        self.comparison = comparison
+        for result in self._resumed_results:
+            self._add_comparison(result)
+        for test_id, scenario, score in self._resumed_scores:
+            comparison.add(test_id, score, scenario)
+    
+    def _add_comparison(self, result: EvaluationResult):
+        """把一个用例结果加入基线对比"""
+        self.comparison.add(result.test_id, result.semantic_score, result.scenario,
+                            result.category, result.question)
+    
+    def _schedule_gate(self, test_cases: Iterable[TestCase]) -> Iterator[TestCase]:
+        """按预算、顺序评估和基线对比的停止条件放行测试用例
+        
+        再调度一个用例预计会超出预算，或顺序评估的估计已足够精确、与基线对比的回归判定已有结论时停止读取，
+        已调度的用例照常完成。
+        """
+        early_stop = self.comparison is not None and self.comparison.early_stop
+        if not self.usage_meter.has_budget and not self.sequential and not early_stop:
+            yield from test_cases
+            return
+        
+        self._scheduled = 0
+        for test_case in test_cases:
+            for monitor in (self.sequential, self.comparison):
+                reason = monitor.check() if monitor else None
+                if reason:
+                    self.logger.info(f"{reason}，停止调度新的测试用例")
+                    with self._stats_lock:
+                        self.stats['early_stop'] = reason
+                    return
+            if self.usage_meter.has_budget:
+                reason = self.usage_meter.check_budget(self._in_flight())
+                if reason:
+                    self.logger.warning(f"{reason}，停止调度新的测试用例")
+                    with self._stats_lock:
+                        self.stats['budget_exhausted'] = reason
+                    return
+            self._scheduled += 1
+            yield test_case
+    
+    def _in_flight(self) -> int:
+        """已调度但尚未完成的用例数"""
+        with self._stats_lock:
+            return self._scheduled - self.stats['completed_tests'] - self.stats['failed_tests']
+    
+    async def wait_for_budget(self):
+        """设置了预算时限制进行中的用例数，并发流水线在读取下一个用例前调用
+        
+        还没有实际用量时最多一个用例进行中，之后进行中的用例数不超过剩余预算 / 平均用量；
+        超出时等待进行中的用例完成，而不是按0用量估算一次调度满所有worker。
+        """
+        if not self.usage_meter.has_budget:
+            return
+        while not self.usage_meter.can_schedule(self._in_flight()):
+            await asyncio.sleep(0.02)
+    
+    def open_trace_export(self, trace_file: str):
+        """之后每个完成的用例都以OpenTelemetry兼容的JSON格式追加写入追踪文件"""
+        self.trace_exporter = TraceExporter(trace_file)
+        self.logger.info(f"阶段耗时追踪导出: {trace_file}")
+    
+    @staticmethod
+    def _count_cases(test_cases: Iterable[TestCase]) -> Optional[int]:
+        """测试用例总数，流式迭代器在读完之前总数未知，返回 None"""
+        return len(test_cases) if isinstance(test_cases, Sized) else None
+    
+    def _log_progress(self, done_count: int, total: Optional[int]):
+        """没有进度回调时在日志中输出进度"""
+        if total:
+            self.logger.info(f"进度: {done_count / total * 100:.1f}% ({done_count}/{total})")
+        else:
+            self.logger.info(f"进度: 已完成 {done_count} 个")
+    
+    def _reset_stats(self, total: Optional[int]):
+        """开始新一轮批量评估前重置统计信息
+        
+        total 为 None（流式读取）时，评估结束后按实际处理的用例数统计总数。
+        """
+        self._total_known = total is not None
+        self.running_summary = RunningSummary()
+        self.stage_stats = StageStats()
+        self.usage_meter = self._new_usage_meter()
+        if self.status_monitor:
+            self.status_monitor.reset()
+        self.stats.pop('budget_exhausted', None)
+        self.stats.pop('early_stop', None)
+        self.stats.pop('not_scheduled', None)
+        with self._stats_lock:
+            self.stats.update({
+                'total_tests': total or 0,
+                'completed_tests': 0,
+                'failed_tests': 0,
+                'average_score': 0.0,
+                'total_api_time': 0.0,
+                'start_time': datetime.now().isoformat(),
+                'end_time': None
+            })
+    
+    def _record_outcome(self, result: Optional[EvaluationResult]):
+        """记录单个用例的评估结果（线程安全）"""
+        with self._stats_lock:
+            if result:
+                self.stats['completed_tests'] += 1
+                self.stats['total_api_time'] += result.api_response_time
+                if self.sequential:
+                    self.sequential.add(result.scenario, result.semantic_score)
+                if self.sample:
+                    self.sample.add(result.test_id, result.semantic_score)
+                if self.comparison:
+                    self._add_comparison(result)
+                self.running_summary.add(result)
+            else:
+                self.stats['failed_tests'] += 1
+        if self.status_monitor:
+            self.status_monitor.record(result)
+        
+        if result and result.timings:
+            self.stage_stats.add(result.timings)
+            if self.trace_exporter:
+                self.trace_exporter.export(result.test_id, result.timings, {
+                    'scenario': result.scenario,
+                    'semantic_score': result.semantic_score
+                })
+        if result and self.journal:
+            self.journal.append(result.to_dict())
+    
+    def _finish_batch(self, results: List[EvaluationResult]) -> List[EvaluationResult]:
+        """结束批量评估，更新统计信息并保存结果
+        
+        提前停止或预算停止时总数按实际评估的用例数统计，未调度的用例单独计数。
+        """
+        stopped = 'early_stop' in self.stats or 'budget_exhausted' in self.stats
+        with self._stats_lock:
+            processed = self.stats['completed_tests'] + self.stats['failed_tests']
+            if self._total_known and stopped:
+                self.stats['not_scheduled'] = self.stats['total_tests'] - processed
+            if not self._total_known or stopped:
+                self.stats['total_tests'] = processed
+        if self._resumed_ids:
+            results = self._resumed_results + results
+            with self._stats_lock:
+                self.stats['total_tests'] += len(self._resumed_ids)
+                self.stats['completed_tests'] += len(self._resumed_ids)
+                self.stats['total_api_time'] += self._resumed_api_time
+                self.stats['resumed_tests'] = len(self._resumed_ids - self._carried_ids)
+        if self._carried_ids:
+            with self._stats_lock:
+                self.stats['carried_forward'] = len(self._carried_ids)
+        
+        with self._stats_lock:
+            self.stats['end_time'] = datetime.now().isoformat()
+            scores = self._resumed_summary.merged(self.running_summary).scores
+            if scores.count:
+                self.stats['average_score'] = scores.overall.stats.mean
+            if self.judge_cache:
+                self.stats['judge_cache'] = {
+                    'hits': self.judge_cache.hits,
+                    'misses': self.judge_cache.misses
+                }
+            if self._easychat_version:
+                self.stats['easychat_version'] = self._easychat_version
+            if self.answer_store:
+                self.stats['answer_store'] = {
+                    'policy': self.answer_policy,
+                    'version': self._easychat_version,
+                    'hits': self.answer_store.hits,
+                    'misses': self.answer_store.misses
+                }
+            batch_stats = getattr(self.api_client, 'batch_stats', None)
+            if batch_stats and batch_stats['requests']:
+                self.stats['judge_batch'] = dict(batch_stats)
+            parser = getattr(self.api_client, 'parser', None)
+            if parser and any(parser.stats.values()):
+                self.stats['judge_output'] = dict(parser.stats)
+            # 分阶段耗时只统计本次运行评估的用例
+            if self.stage_stats.cases:
+                self.stats['stage_timings'] = self.stage_stats.summary()
+            if self.usage_meter.totals['total_tokens'] or self.usage_meter.has_budget:
+                self.stats['usage'] = self.usage_meter.summary()
+            if self.sequential:
+                self.stats['sequential'] = self.sequential.summary()
+            if self.sample:
+                self.stats['sample'] = self.sample.summary()
+            if self.comparison:
+                self.stats['comparison'] = self.comparison.summary()
         
         self.results = results
-        self.logger.info(f"批量评估完成，成功: {len(results)}, 失败: {self.stats['failed_tests']}")
+        self.logger.info(f"批量评估完成，成功: {self.stats['completed_tests']}, 失败: {self.stats['failed_tests']}")
         
         return results
     
     def save_results(self, output_file: str) -> bool:
         """保存评估结果"""
         
+        if not self.keep_results:
+            return self.save_streaming_summary(output_file)
+        
         try:
             output_path = Path(output_file)
             output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -302,18 +1107,19 @@ class SemanticEvaluator:
                     'statistics': self.stats
                 },
                 'results': [result.to_dict() for result in self.results],
-                'summary': self._generate_summary()
+                'summary': self.get_summary()
             }
             
             # 保存JSON报告
             with open(output_path, 'w', encoding='utf-8') as f:
                 json.dump(report_data, f, ensure_ascii=False, indent=2)
             
+            self.logger.info(f"评估结果已保存到: {output_file}")
+            
             # 生成并保存Markdown报告
             md_output_file = str(output_path).replace('.json', '.md')
-            self.save_markdown_summary(md_output_file)
-            
-            self.logger.info(f"评估结果已保存到: {output_file}")
+            if not self.save_markdown_summary(md_output_file):
+                return False
             self.logger.info(f"Markdown摘要已保存到: {md_output_file}")
             return True
             
@@ -321,14 +1127,51 @@ class SemanticEvaluator:
             self.logger.error(f"保存评估结果失败: {str(e)}")
             return False
     
+    def save_streaming_summary(self, output_file: str) -> bool:
+        """流式输出模式下保存摘要
+        
+        逐条结果已在评估过程中写入 output_file (JSONL)，这里只写入
+        元数据与汇总统计 (*.summary.json) 和 Markdown 摘要。
+        """
+        
+        try:
+            self.journal.close()
+            
+            summary_file = str(output_file).replace('.jsonl', '.summary.json')
+            summary_data = {
+                'metadata': {
+                    'evaluation_time': datetime.now().isoformat(),
+                    'evaluator_version': '2.0.0',
+                    'total_tests': self._resumed_summary.count + self.running_summary.count,
+                    'results_file': str(output_file),
+                    'statistics': self.stats
+                },
+                'summary': self.get_summary()
+            }
+            
+            with open(summary_file, 'w', encoding='utf-8') as f:
+                json.dump(summary_data, f, ensure_ascii=False, indent=2)
+            
+            self.logger.info(f"评估摘要已保存到: {summary_file}")
+            
+            md_output_file = str(output_file).replace('.jsonl', '.md')
+            if not self.save_markdown_summary(md_output_file):
+                return False
+            self.logger.info(f"Markdown摘要已保存到: {md_output_file}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"保存评估摘要失败: {str(e)}")
+            return False
+    
     def save_markdown_summary(self, output_file: str) -> bool:
         """保存Markdown格式的评估摘要报告"""
         
         try:
-            if not self.results:
+            summary = self.get_summary()
+            if not summary:
                 return False
             
-            summary = self._generate_summary()
             md_content = self._generate_markdown_report(summary)
             
             with open(output_file, 'w', encoding='utf-8') as f:
@@ -356,9 +1199,17 @@ class SemanticEvaluator:
         md_lines.append("## 📊 总体统计")
         md_lines.append("")
         md_lines.append(f"- **总测试数**: {summary['total_tests']}")
+        if self.stats.get('not_scheduled'):
+            md_lines.append(f"- **未调度**: {self.stats['not_scheduled']} 个（提前停止，不计入总数）")
+        if 'carried_forward' in self.stats:
+            md_lines.append(f"- **增量评估**: 沿用基线结果 {self.stats['carried_forward']} 个，"
+                            f"重新评估 {summary['total_tests'] - self.stats['carried_forward']} 个")
         md_lines.append(f"- **平均分数**: {summary['average_score']:.1f}")
         md_lines.append(f"- **最高分数**: {summary['max_score']}")
         md_lines.append(f"- **最低分数**: {summary['min_score']}")
+        md_lines.append(f"- **标准差**: {summary['score_stdev']}")
+        percentiles = summary['score_percentiles']
+        md_lines.append(f"- **分数分位数**: p50 {percentiles['p50']} / p90 {percentiles['p90']} / p99 {percentiles['p99']}")
         md_lines.append("")
         
         # 分数分布
@@ -378,10 +1229,11 @@ class SemanticEvaluator:
         # 场景统计
         md_lines.append("## 🎯 场景统计")
         md_lines.append("")
-        md_lines.append("| 场景 | 测试数量 | 平均分数 |")
-        md_lines.append("|------|----------|----------|")
+        md_lines.append("| 场景 | 测试数量 | 平均分数 | 95%置信区间 | p50 | p90 |")
+        md_lines.append("|------|----------|----------|-------------|-----|-----|")
         for scenario, stats in summary['scenario_statistics'].items():
-            md_lines.append(f"| {scenario} | {stats['count']} | {stats['average_score']:.1f} |")
+            md_lines.append(f"| {scenario} | {stats['count']} | {stats['average_score']:.1f} | "
+                            f"{format_interval(stats)} | {stats['p50']} | {stats['p90']} |")
         md_lines.append("")
         
         # 性能指标
@@ -391,20 +1243,157 @@ class SemanticEvaluator:
         md_lines.append(f"- **成功率**: {perf['success_rate']:.1f}%")
         md_lines.append(f"- **总API时间**: {perf['total_api_time']:.2f} 秒")
         md_lines.append(f"- **平均API时间**: {perf['average_api_time']:.2f} 秒")
+        if 'judge_cache' in self.stats:
+            cache_stats = self.stats['judge_cache']
+            md_lines.append(f"- **评估缓存**: 命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次")
+        if 'answer_store' in self.stats:
+            store_stats = self.stats['answer_store']
+            md_lines.append(f"- **回答复用**: 复用 {store_stats['hits']} 个，新生成 {store_stats['misses']} 个 ({store_stats.get('policy') or '-'})")
+        if 'judge_batch' in self.stats:
+            batch_stats = self.stats['judge_batch']
+            md_lines.append(f"- **批量评估**: {batch_stats['requests']} 次请求评估 {batch_stats['items']} 个问答对，单独重评 {batch_stats['rejudged']} 个")
+        if 'judge_output' in self.stats:
+            output_stats = self.stats['judge_output']
+            md_lines.append(f"- **评估结果解析**: 直接解析 {output_stats['parsed']} 个，本地修复 {output_stats['repaired']} 个，"
+                            f"修复请求 {output_stats['repair_requests']} 次，无法解析 {output_stats['failed']} 个")
         md_lines.append("")
         
+        # 分阶段耗时
+        if 'stage_timings' in self.stats:
+            timings = self.stats['stage_timings']
+            md_lines.append("## ⏱️ 分阶段耗时")
+            md_lines.append("")
+            md_lines.append("| 阶段 | 次数 | 平均(秒) | p50 | p95 | p99 | 最大 |")
+            md_lines.append("|------|------|----------|-----|-----|-----|------|")
+            for stage, stats in timings['stages'].items():
+                md_lines.append(
+                    f"| {tracing.STAGE_NAMES.get(stage, stage)} | {stats['count']} | {stats['mean']:.3f} | "
+                    f"{stats['p50']:.3f} | {stats['p95']:.3f} | {stats['p99']:.3f} | {stats['max']:.3f} |"
+                )
+            md_lines.append("")
+            md_lines.append(f"- **重试次数**: {timings['retries']}")
+            md_lines.append(f"- **发送/接收**: {timings['bytes_out'] / 1024:.1f} KB / {timings['bytes_in'] / 1024:.1f} KB")
+            md_lines.append("")
+        
+        # 顺序评估的估计
+        if 'sequential' in self.stats:
+            sequential = self.stats['sequential']
+            md_lines.append("## 🎯 顺序评估")
+            md_lines.append("")
+            md_lines.append(f"按随机顺序评估 {sequential['evaluated']}/{sequential['total']} 个用例，"
+                            f"置信水平 {sequential['confidence']:.0%}，随机种子 {sequential['seed']}")
+            md_lines.append("")
+            md_lines.append("| 场景 | 已评估/总数 | 平均分 | 置信区间 |")
+            md_lines.append("|------|-------------|--------|----------|")
+            rows = [*sequential['scenarios'].items(), ('**整体**', sequential['overall'])]
+            for scenario, stats in rows:
+                mean, half = stats['mean'], stats['ci_half_width']
+                progress = f"{stats['evaluated']}/{stats['total']}" if 'total' in stats else f"{sequential['evaluated']}/{sequential['total']}"
+                interval = f"±{half:.2f}" if half is not None else "样本不足"
+                md_lines.append(f"| {scenario} | {progress} | {mean if mean is not None else '-'} | {interval} |")
+            md_lines.append("")
+            if sequential['overall']['decision']:
+                md_lines.append(f"- **及格判定** (及格线 {sequential['threshold']}): {sequential['overall']['decision']}")
+            md_lines.append(f"- **停止原因**: {self.stats.get('early_stop') or '全部用例已评估'}")
+            md_lines.append("")
+        
+        # 分层抽样的估计
+        if 'sample' in self.stats:
+            sample = self.stats['sample']
+            overall = sample['overall']
+            md_lines.append("## 🎲 抽样估计")
+            md_lines.append("")
+            md_lines.append(f"从 {sample['population']} 个用例中分层抽取 {sample['size']} 个"
+                            f"（分层: {', '.join(sample['stratify']) or '不分层'}，"
+                            f"{'Neyman最优分配' if sample['allocation'] == 'neyman' else '比例分配'}，随机种子 {sample['seed']}），"
+                            f"置信水平 {sample['confidence']:.0%}")
+            md_lines.append("")
+            if overall['mean'] is not None:
+                interval = f"±{overall['ci_half_width']:.2f}" if overall['ci_half_width'] is not None else "(样本不足，无法估计置信区间)"
+                md_lines.append(f"- **测试集平均分估计**: {overall['mean']} {interval}")
+            else:
+                md_lines.append("- **测试集平均分估计**: 部分层没有成功评估的用例，无法估计")
+            md_lines.append("")
+            md_lines.append("| 层 | 用例数 | 样本 | 已评估 | 平均分 | 置信区间 |")
+            md_lines.append("|----|--------|------|--------|--------|----------|")
+            for stratum, stats in sample['strata'].items():
+                interval = f"±{stats['ci_half_width']:.2f}" if stats['ci_half_width'] is not None else "样本不足"
+                md_lines.append(f"| {stratum} | {stats['population']} | {stats['sample']} | {stats['evaluated']} | "
+                                f"{stats['mean'] if stats['mean'] is not None else '-'} | {interval} |")
+            md_lines.append("")
+        
+        # 与基线的配对对比
+        if 'comparison' in self.stats:
+            comparison = self.stats['comparison']
+            overall = comparison['overall']
+            md_lines.append("## 🆚 与基线对比")
+            md_lines.append("")
+            md_lines.append(f"与基线配对 {comparison['pairs']} 个用例（基线 {comparison['baseline_cases']} 个，"
+                            f"本次不在基线中 {comparison['unmatched']} 个），"
+                            f"允许下降 {comparison['margin']} 分，置信水平 {comparison['confidence']:.0%}")
+            md_lines.append("")
+            md_lines.append(f"- **回归判定**: {VERDICT_NAMES[comparison['verdict']]}")
+            if overall['ci']:
+                md_lines.append(f"- **平均分变化**: {overall['mean_delta']:+.2f} "
+                                f"[{overall['ci'][0]:+.2f}, {overall['ci'][1]:+.2f}]，p = {format_p_value(overall['p_value'])}")
+            md_lines.append(f"- **用例变化**: 提高 {comparison['improved']}，下降 {comparison['regressed']}，不变 {comparison['unchanged']}")
+            if comparison['stop_reason']:
+                md_lines.append(f"- **提前停止**: {comparison['stop_reason']}")
+            md_lines.append("")
+            for title, groups in (("场景", comparison['scenarios']), ("分类", comparison['categories'])):
+                if not groups:
+                    continue
+                md_lines.append(f"| {title} | 配对数 | 基线平均分 | 平均分 | 变化 | 置信区间 | p值 | 判定 |")
+                md_lines.append("|------|--------|------------|--------|------|----------|-----|------|")
+                for name, stats in groups.items():
+                    interval = f"[{stats['ci'][0]:+.2f}, {stats['ci'][1]:+.2f}]" if stats['ci'] else "样本不足"
+                    p_value = format_p_value(stats['p_value'])
+                    md_lines.append(f"| {name} | {stats['pairs']} | {stats['baseline_mean']} | {stats['mean']} | "
+                                    f"{stats['mean_delta']:+.2f} | {interval} | {p_value} | {VERDICT_NAMES[stats['verdict']]} |")
+                md_lines.append("")
+            if comparison['most_regressed']:
+                md_lines.append("下降最多的用例:")
+                md_lines.append("")
+                for item in comparison['most_regressed']:
+                    md_lines.append(f"- `{item['test_id']}` ({item['scenario']}): "
+                                    f"{item['baseline_score']} → {item['score']} ({item['delta']:+.1f})")
+                md_lines.append("")
+        
+        # Token用量与费用
+        if 'usage' in self.stats:
+            usage = self.stats['usage']
+            md_lines.append("## 💰 Token用量与费用")
+            md_lines.append("")
+            md_lines.append(f"评估模型: {usage['model'] or '-'}，费用为按价格表估算 ({usage['currency']})")
+            md_lines.append("")
+            md_lines.append("| 场景 | 用例数 | 输入Token | 其中缓存命中 | 缓存命中率 | 输出Token | 费用 |")
+            md_lines.append("|------|--------|-----------|--------------|------------|-----------|------|")
+            for scenario, stats in [*usage['scenarios'].items(), ('**合计**', usage)]:
+                md_lines.append(
+                    f"| {scenario} | {stats['cases']} | {stats['prompt_tokens']} | {stats['cached_tokens']} | "
+                    f"{stats['cache_hit_rate']:.1%} | {stats['completion_tokens']} | {stats['cost']:.4f} |"
+                )
+            md_lines.append("")
+            if usage.get('budget'):
+                budget = usage['budget']
+                md_lines.append(f"- **预算**: Token {budget['max_tokens'] or '不限'}，费用 {budget['max_cost'] or '不限'}")
+            if 'budget_exhausted' in self.stats:
+                md_lines.append(f"- **预算停止**: {self.stats['budget_exhausted']}，未调度的用例未评估")
+            md_lines.append("")
+        
         # 详细结果（仅显示前10个）
         md_lines.append("## 📋 详细结果 (前10个)")
         md_lines.append("")
         md_lines.append("| 测试ID | 场景 | 分数 | 评估理由 |")
         md_lines.append("|--------|------|------|----------|")
         
-        for i, result in enumerate(self.results[:10]):
+        preview = self._resumed_summary.merged(self.running_summary).preview
+        for i, result in enumerate(preview):
             reason_short = result.evaluation_reason[:50] + "..." if len(result.evaluation_reason) > 50 else result.evaluation_reason
             md_lines.append(f"| {result.test_id} | {result.scenario} | {result.semantic_score} | {reason_short} |")
         
-        if len(self.results) > 10:
-            md_lines.append(f"| ... | ... | ... | 还有 {len(self.results) - 10} 个结果 |")
+        if summary['total_tests'] > len(preview):
+            md_lines.append(f"| ... | ... | ... | 还有 {summary['total_tests'] - len(preview)} 个结果 |")
         
         md_lines.append("")
         
@@ -414,67 +1403,35 @@ class SemanticEvaluator:
         
         return "\n".join(md_lines)
     
-    def _generate_summary(self) -> Dict[str, Any]:
-        """生成评估摘要"""
-        
-        if not self.results:
-            return {}
-        
-        scores = [r.semantic_score for r in self.results]
+    def get_summary(self) -> Dict[str, Any]:
+        """获取评估摘要（由增量统计生成，包含从日志恢复的结果）"""
         
-        # 分数分布
-        score_distribution = {
-            'excellent': len([s for s in scores if s >= 90]),
-            'good': len([s for s in scores if 80 <= s < 90]),
-            'average': len([s for s in scores if 70 <= s < 80]),
-            'poor': len([s for s in scores if 60 <= s < 70]),
-            'very_poor': len([s for s in scores if s < 60])
-        }
-        
-        # 场景统计
-        scenario_stats = {}
-        for result in self.results:
-            scenario = result.scenario
-            if scenario not in scenario_stats:
-                scenario_stats[scenario] = {'count': 0, 'total_score': 0}
-            scenario_stats[scenario]['count'] += 1
-            scenario_stats[scenario]['total_score'] += result.semantic_score
-        
-        # 计算场景平均分
-        for scenario, stats in scenario_stats.items():
-            stats['average_score'] = stats['total_score'] / stats['count']
-        
-        return {
-            'total_tests': len(self.results),
-            'average_score': sum(scores) / len(scores),
-            'max_score': max(scores),
-            'min_score': min(scores),
-            'score_distribution': score_distribution,
-            'scenario_statistics': scenario_stats,
-            'performance_metrics': {
-                'total_api_time': self.stats['total_api_time'],
-                'average_api_time': self.stats['total_api_time'] / len(self.results),
-                'success_rate': len(self.results) / self.stats['total_tests'] * 100
-            }
-        }
+        summary = self._resumed_summary.merged(self.running_summary)
+        return summary.to_summary(self.stats, bootstrap_resamples=self.bootstrap_resamples)
     
     def print_summary(self):
         """打印评估摘要"""
         
-        if not self.results:
+        summary = self.get_summary()
+        if not summary:
             print("没有评估结果")
             return
         
-        summary = self._generate_summary()
-        
         print("\n" + "="*50)
         print("语义评估结果摘要")
         print("="*50)
         
         print(f"总测试数: {summary['total_tests']}")
+        if self.stats.get('not_scheduled'):
+            print(f"未调度: {self.stats['not_scheduled']} 个（提前停止，不计入总数）")
+        if 'carried_forward' in self.stats:
+            print(f"增量评估: 沿用基线结果 {self.stats['carried_forward']} 个，"
+                  f"重新评估 {summary['total_tests'] - self.stats['carried_forward']} 个")
         print(f"平均分数: {summary['average_score']:.1f}")
         print(f"最高分数: {summary['max_score']}")
         print(f"最低分数: {summary['min_score']}")
+        percentiles = summary['score_percentiles']
+        print(f"分数分位数: p50 {percentiles['p50']} / p90 {percentiles['p90']} / p99 {percentiles['p99']}")
         
         print("\n分数分布:")
         dist = summary['score_distribution']
@@ -486,13 +1443,74 @@ class SemanticEvaluator:
         
         print("\n场景统计:")
         for scenario, stats in summary['scenario_statistics'].items():
-            print(f"  {scenario}: {stats['count']} 个测试，平均分 {stats['average_score']:.1f}")
+            print(f"  {scenario}: {stats['count']} 个测试，平均分 {stats['average_score']:.1f} {format_interval(stats)}，"
+                  f"p50 {stats['p50']} / p90 {stats['p90']}")
         
         print("\n性能指标:")
         perf = summary['performance_metrics']
         print(f"  成功率: {perf['success_rate']:.1f}%")
         print(f"  总API时间: {perf['total_api_time']:.2f} 秒")
         print(f"  平均API时间: {perf['average_api_time']:.2f} 秒")
+        if 'judge_cache' in self.stats:
+            cache_stats = self.stats['judge_cache']
+            print(f"  评估缓存: 命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次")
+        if 'answer_store' in self.stats:
+            store_stats = self.stats['answer_store']
+            print(f"  回答复用: 复用 {store_stats['hits']} 个，新生成 {store_stats['misses']} 个 ({store_stats.get('policy') or '-'})")
+        if 'judge_batch' in self.stats:
+            batch_stats = self.stats['judge_batch']
+            print(f"  批量评估: {batch_stats['requests']} 次请求评估 {batch_stats['items']} 个问答对，单独重评 {batch_stats['rejudged']} 个")
+        if 'judge_output' in self.stats:
+            output_stats = self.stats['judge_output']
+            print(f"  评估结果解析: 直接解析 {output_stats['parsed']} 个，本地修复 {output_stats['repaired']} 个，"
+                  f"修复请求 {output_stats['repair_requests']} 次，无法解析 {output_stats['failed']} 个")
+        if 'stage_timings' in self.stats:
+            print("\n分阶段耗时 (p50 / p95 / p99 秒):")
+            for stage, stats in self.stats['stage_timings']['stages'].items():
+                print(f"  {tracing.STAGE_NAMES.get(stage, stage)}: "
+                      f"{stats['p50']:.3f} / {stats['p95']:.3f} / {stats['p99']:.3f}")
+        if 'sequential' in self.stats:
+            sequential = self.stats['sequential']
+            print(f"\n顺序评估 (已评估 {sequential['evaluated']}/{sequential['total']}，置信水平 {sequential['confidence']:.0%}):")
+            for scenario, stats in sequential['scenarios'].items():
+                half = f"±{stats['ci_half_width']:.2f}" if stats['ci_half_width'] is not None else "样本不足"
+                print(f"  {scenario}: {stats['mean']} {half} ({stats['evaluated']}/{stats['total']})")
+            overall = sequential['overall']
+            if overall['mean'] is not None:
+                print(f"  整体: {overall['mean']} ±{overall['ci_half_width']:.2f}"
+                      + (f"，及格判定: {overall['decision']}" if overall['decision'] else ""))
+            if 'early_stop' in self.stats:
+                print(f"  提前停止: {self.stats['early_stop']}")
+        if 'sample' in self.stats:
+            sample = self.stats['sample']
+            overall = sample['overall']
+            print(f"\n抽样估计 (样本 {sample['size']}/{sample['population']}，置信水平 {sample['confidence']:.0%}):")
+            if overall['mean'] is not None:
+                half = f"±{overall['ci_half_width']:.2f}" if overall['ci_half_width'] is not None else "样本不足"
+                print(f"  测试集: {overall['mean']} {half}")
+            for stratum, stats in sample['strata'].items():
+                half = f"±{stats['ci_half_width']:.2f}" if stats['ci_half_width'] is not None else "样本不足"
+                print(f"  {stratum}: {stats['mean']} {half} ({stats['evaluated']}/{stats['population']})")
+        if 'comparison' in self.stats:
+            comparison = self.stats['comparison']
+            overall = comparison['overall']
+            print(f"\n与基线对比 (配对 {comparison['pairs']} 个，允许下降 {comparison['margin']} 分): "
+                  f"{VERDICT_NAMES[comparison['verdict']]}")
+            if overall['ci']:
+                print(f"  平均分变化: {overall['mean_delta']:+.2f} [{overall['ci'][0]:+.2f}, {overall['ci'][1]:+.2f}]，"
+                      f"p = {format_p_value(overall['p_value'])}")
+            for item in comparison['most_regressed'][:5]:
+                print(f"  {item['test_id']}: {item['baseline_score']} → {item['score']} ({item['delta']:+.1f})")
+            if comparison['stop_reason']:
+                print(f"  提前停止: {comparison['stop_reason']}")
+        if 'usage' in self.stats:
+            usage = self.stats['usage']
+            print("\nToken用量:")
+            print(f"  输入: {usage['prompt_tokens']} (缓存命中 {usage['cached_tokens']}，{usage['cache_hit_rate']:.1%})，"
+                  f"输出: {usage['completion_tokens']}")
+            print(f"  估算费用: {usage['cost']:.4f} {usage['currency']}")
+            if 'budget_exhausted' in self.stats:
+                print(f"  预算停止: {self.stats['budget_exhausted']}")
         
         print("="*50)
 
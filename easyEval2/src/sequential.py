@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+顺序评估模块
+按随机顺序评估测试用例，逐个更新各场景平均分的置信区间，
+在估计足够精确或及格判定已有结论时提前停止
+"""
+
+import math
+import threading
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Tuple
+
+from src.online_stats import RunningStats, t_quantile
+
+class SequentialMonitor:
+    """顺序评估的停止规则
+
+    每个场景维护平均分及其置信区间（t分布，按场景用例总数做有限总体校正）。满足以下任一条件时停止调度新用例：
+    - 每个场景都已评估完，或已评估至少 min_cases 个用例且置信区间半宽不超过 half_width
+    - 设置了及格线时，按场景分层加权的整体平均分的置信区间完全高于或低于及格线
+
+    注意：每完成一个用例都检查一次停止条件（多次查看），实际覆盖率会略低于名义置信水平，
+    需要严格保证时可提高 confidence。
+    """
+
+    def __init__(self, scenario_totals: Dict[str, int], half_width: Optional[float] = 1.0,
+                 confidence: float = 0.95, threshold: Optional[float] = None, min_cases: int = 10,
+                 seed: Optional[int] = None):
+        """初始化停止规则
+
+        Args:
+            scenario_totals: 各场景待评估的用例总数
+            half_width: 目标置信区间半宽（分），None 表示只按及格线判定
+            confidence: 置信水平
+            threshold: 及格线，None 表示不做及格判定
+            min_cases: 每个场景至少评估的用例数（场景用例不足时评估全部）
+            seed: 打乱评估顺序使用的随机种子，记录在摘要中以便复现
+        """
+        if not 0 < confidence < 1:
+            raise ValueError(f"置信水平应在0和1之间: {confidence}")
+        if half_width is None and threshold is None:
+            raise ValueError("至少需要设置置信区间半宽或及格线")
+        self.scenario_totals = dict(scenario_totals)
+        self.half_width = half_width
+        self.confidence = confidence
+        self.threshold = threshold
+        self.min_cases = max(min_cases, 2)
+        self.seed = seed
+        self._stats: Dict[str, RunningStats] = {scenario: RunningStats() for scenario in scenario_totals}
+        self._lock = threading.Lock()
+        self.stop_reason: Optional[str] = None
+
+    def add(self, scenario: str, score: float):
+        """加入一个已完成用例的分数"""
+        with self._lock:
+            self._stats.setdefault(scenario, RunningStats()).add(score)
+
+    def _interval(self, scenario: str) -> Tuple[Optional[float], Optional[float]]:
+        """场景的 (平均分, 置信区间半宽)，样本不足时半宽为 None"""
+        stats = self._stats[scenario]
+        total = max(self.scenario_totals.get(scenario, 0), stats.count)
+        if stats.count == 0:
+            return None, None
+        if stats.count >= total:
+            return stats.mean, 0.0
+        if stats.count < 2:
+            return stats.mean, None
+        se = math.sqrt(stats.variance / stats.count * (1 - stats.count / total))
+        return stats.mean, t_quantile((1 + self.confidence) / 2, stats.count - 1) * se
+
+    def _overall(self) -> Tuple[Optional[float], Optional[float]]:
+        """按场景用例数加权的整体平均分及其置信区间半宽"""
+        grand_total = sum(max(self.scenario_totals.get(s, 0), st.count) for s, st in self._stats.items())
+        if not grand_total:
+            return None, None
+        mean = 0.0
+        variance = 0.0
+        for scenario, stats in self._stats.items():
+            total = max(self.scenario_totals.get(scenario, 0), stats.count)
+            weight = total / grand_total
+            if stats.count == 0 or (stats.count < 2 and stats.count < total):
+                return None, None
+            mean += weight * stats.mean
+            if stats.count < total:
+                variance += weight ** 2 * stats.variance / stats.count * (1 - stats.count / total)
+        return mean, NormalDist().inv_cdf((1 + self.confidence) / 2) * math.sqrt(variance)
+
+    def _enough(self, scenario: str) -> bool:
+        stats = self._stats[scenario]
+        return stats.count >= min(self.min_cases, self.scenario_totals.get(scenario, 0))
+
+    def check(self) -> Optional[str]:
+        """检查是否可以停止，可以停止时返回原因"""
+        with self._lock:
+            if self.stop_reason:
+                return self.stop_reason
+            if not all(self._enough(scenario) for scenario in self._stats):
+                return None
+
+            if self.threshold is not None:
+                mean, half = self._overall()
+                if half is not None:
+                    if mean - half >= self.threshold:
+                        self.stop_reason = f"整体平均分 {mean:.1f}±{half:.1f} 高于及格线 {self.threshold}，判定通过"
+                    elif mean + half < self.threshold:
+                        self.stop_reason = f"整体平均分 {mean:.1f}±{half:.1f} 低于及格线 {self.threshold}，判定不通过"
+                    if self.stop_reason:
+                        return self.stop_reason
+
+            if self.half_width is not None:
+                widths = [self._interval(scenario)[1] for scenario in self._stats]
+                if all(width is not None and width <= self.half_width for width in widths):
+                    self.stop_reason = f"各场景平均分的置信区间半宽均不超过 {self.half_width} 分"
+            return self.stop_reason
+
+    def summary(self) -> Dict[str, Any]:
+        """各场景和整体的估计、置信区间及判定结果"""
+        with self._lock:
+            scenarios = {}
+            for scenario, stats in self._stats.items():
+                mean, half = self._interval(scenario)
+                scenarios[scenario] = {
+                    'evaluated': stats.count,
+                    'total': max(self.scenario_totals.get(scenario, 0), stats.count),
+                    'mean': round(mean, 3) if mean is not None else None,
+                    'ci_half_width': round(half, 3) if half is not None else None
+                }
+            mean, half = self._overall()
+            decision = None
+            if self.threshold is not None and half is not None:
+                decision = 'pass' if mean - half >= self.threshold else 'fail' if mean + half < self.threshold else 'undecided'
+            return {
+                'confidence': self.confidence,
+                'target_half_width': self.half_width,
+                'threshold': self.threshold,
+                'min_cases': self.min_cases,
+                'seed': self.seed,
+                'evaluated': sum(stats.count for stats in self._stats.values()),
+                'total': sum(item['total'] for item in scenarios.values()),
+                'scenarios': scenarios,
+                'overall': {
+                    'mean': round(mean, 3) if mean is not None else None,
+                    'ci_half_width': round(half, 3) if half is not None else None,
+                    'decision': decision
+                },
+                'stop_reason': self.stop_reason
+            }
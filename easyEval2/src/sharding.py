@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片评估模块
+按测试用例ID的稳定哈希把测试集分配到多个分片，并合并各分片的评估结果
+"""
+
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from src.journal import ResultJournal
+
+logger = logging.getLogger(__name__)
+
+# 合并时逐项相加的计数类统计
+_COUNTER_STATS = ('judge_cache', 'answer_store', 'judge_batch')
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """解析分片参数 "i/N"（i 从0开始）
+
+    Raises:
+        ValueError: 格式错误或 i 不在 [0, N) 范围内
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"分片格式应为 i/N，例如 0/4: {value}")
+    if count <= 0 or not 0 <= index < count:
+        raise ValueError(f"分片编号应满足 0 <= i < N: {value}")
+    return index, count
+
+def shard_of(test_id: str, count: int) -> int:
+    """计算测试用例所属的分片
+
+    使用测试用例ID的SHA-256哈希，与用例在测试集中的位置无关，
+    增删其他用例不会改变已有用例的分片归属。
+    """
+    digest = hashlib.sha256(test_id.encode('utf-8')).hexdigest()
+    return int(digest[:16], 16) % count
+
+def load_shard_results(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """读取一个分片的评估输出
+
+    支持 JSON 报告、JSONL 结果文件（流式输出或结果日志）和 *.summary.json 汇总文件。
+
+    Returns:
+        (运行统计, 结果列表)
+    """
+    path = Path(path)
+
+    if path.suffix == '.jsonl':
+        header, results = ResultJournal.load(str(path))
+        summary_file = path.with_name(path.name[:-len('.jsonl')] + '.summary.json')
+        if summary_file.exists():
+            with open(summary_file, 'r', encoding='utf-8') as f:
+                statistics = json.load(f)['metadata']['statistics']
+        else:
+            # 评估未正常结束时没有汇总文件，失败用例数无法得知
+            logger.warning(f"{path} 没有对应的汇总文件，按已完成用例数统计")
+            statistics = {'total_tests': len(results)}
+            if header.get('shard'):
+                statistics['shard'] = header['shard']
+        return statistics, results
+
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+
+    metadata = report.get('metadata', {})
+    if 'results' in report:
+        return metadata.get('statistics', {}), report['results']
+
+    if 'results_file' in metadata:
+        results_file = Path(metadata['results_file'])
+        if not results_file.exists():
+            results_file = path.parent / results_file.name
+        _, results = ResultJournal.load(str(results_file))
+        return metadata.get('statistics', {}), results
+
+    raise ValueError(f"无法识别的评估输出文件: {path}")
+
+def merge_shard_results(paths: List[str]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """合并多个分片的评估结果
+
+    结果按测试用例ID去重（重复时以后出现的为准），
+    运行统计中的用例数、API时间和缓存计数直接相加，计数统计中的其他字段（如回答复用策略、EasyChat版本）
+    各分片一致时保留，不一致时以逗号连接各分片的取值，平均分等汇总统计由调用方按合并后的结果重新计算。
+    重复用例、缺失分片等问题记录在统计的 merge_warnings 中。
+
+    Returns:
+        (合并后的运行统计, 合并后的结果列表)
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    warnings: List[str] = []
+    total_tests = 0
+    start_times, end_times, shards = [], [], []
+    counters: Dict[str, Dict[str, Any]] = {}
+    labels: Dict[Tuple[str, str], List[Any]] = {}
+
+    for path in paths:
+        statistics, results = load_shard_results(path)
+        for result in results:
+            if result['test_id'] in merged:
+                warnings.append(f"测试用例 {result['test_id']} 在多个分片中出现，使用 {path} 中的结果")
+            merged[result['test_id']] = result
+
+        total_tests += statistics.get('total_tests', len(results))
+        if statistics.get('start_time'):
+            start_times.append(statistics['start_time'])
+        if statistics.get('end_time'):
+            end_times.append(statistics['end_time'])
+        if statistics.get('shard'):
+            shards.append(statistics['shard'])
+
+        for key in _COUNTER_STATS:
+            for name, value in statistics.get(key, {}).items():
+                merged_stats = counters.setdefault(key, {})
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    merged_stats[name] = merged_stats.get(name, 0) + value
+                else:
+                    labels.setdefault((key, name), []).append(value)
+
+    for (key, name), values in labels.items():
+        distinct = list(dict.fromkeys(str(value) for value in values if value is not None))
+        counters[key][name] = ', '.join(distinct) if distinct else None
+        if len(distinct) > 1:
+            warnings.append(f"各分片的 {key}.{name} 不一致: {counters[key][name]}")
+
+    warnings.extend(_check_shard_coverage(shards))
+    for warning in warnings:
+        logger.warning(warning)
+
+    results = sorted(merged.values(), key=lambda r: r['test_id'])
+    completed = len(results)
+    total_tests = max(total_tests, completed)
+    statistics = {
+        'total_tests': total_tests,
+        'completed_tests': completed,
+        'failed_tests': total_tests - completed,
+        'average_score': sum(r['semantic_score'] for r in results) / completed if completed else 0.0,
+        'total_api_time': sum(r.get('api_response_time', 0.0) for r in results),
+        'start_time': min(start_times) if start_times else None,
+        'end_time': max(end_times) if end_times else None,
+        'merged_from': [str(p) for p in paths],
+        **counters
+    }
+    if shards:
+        statistics['shards'] = sorted(shards, key=lambda s: parse_shard(s)[0])
+    if warnings:
+        statistics['merge_warnings'] = warnings
+    return statistics, results
+
+def _check_shard_coverage(shards: List[str]) -> List[str]:
+    """检查分片是否完整、分片总数是否一致，返回发现的问题"""
+    if not shards:
+        return []
+
+    parsed = [parse_shard(s) for s in shards]
+    counts = {count for _, count in parsed}
+    if len(counts) > 1:
+        return [f"分片总数不一致: {sorted(counts)}"]
+
+    count = counts.pop()
+    indices = [index for index, _ in parsed]
+    warnings = [f"分片 {i}/{count} 出现多次" for i in sorted(set(indices)) if indices.count(i) > 1]
+    missing = sorted(set(range(count)) - set(indices))
+    if missing:
+        warnings.append(f"缺少分片: {', '.join(f'{i}/{count}' for i in missing)}")
+    return warnings
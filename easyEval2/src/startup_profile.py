@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析模块
+以 python -X importtime 重新运行同一命令，收集每个模块的导入耗时并按顶层包汇总，
+用于检查命令行工具的启动开销（只依赖标准库，可在导入其他模块之前使用）
+"""
+
+import re
+import sys
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+# -X importtime 的输出行: "import time: self [us] | cumulative | imported package"
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)\s*$')
+
+def profiling_active() -> bool:
+    """当前进程是否以 -X importtime 运行（即处于被分析的子进程中）"""
+    return 'importtime' in sys._xoptions
+
+def run_profiled(script: str, argv: Sequence[str]) -> Tuple[int, float, List[Tuple[str, int, int, int]]]:
+    """以 -X importtime 运行脚本，标准输出照常显示，其他标准错误输出原样转发
+
+    Args:
+        script: 脚本路径
+        argv: 脚本的命令行参数
+
+    Returns:
+        (退出码, 进程总耗时秒数, [(模块, 自身耗时微秒, 累计耗时微秒, 嵌套深度)])
+    """
+    import subprocess  # 只在分析启动耗时时需要
+
+    records = []
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-X', 'importtime', script, *argv],
+                               stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+    for line in process.stderr:
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            records.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+        elif not line.startswith('import time:'):
+            sys.stderr.write(line)
+    returncode = process.wait()
+    return returncode, time.perf_counter() - start, records
+
+def summarize(records: Sequence[Tuple[str, int, int, int]], top: int = 15) -> Dict[str, Any]:
+    """汇总导入耗时
+
+    Returns:
+        导入总耗时、模块数、按顶层包汇总的自身耗时（降序，最多 top 个）
+        和被直接导入（嵌套深度为0）的模块的累计耗时（降序，最多 top 个），耗时单位为秒
+    """
+    packages: Dict[str, List[float]] = {}
+    for module, self_us, _, _ in records:
+        stats = packages.setdefault(module.split('.')[0], [0, 0])
+        stats[0] += self_us
+        stats[1] += 1
+    roots = [(module, cumulative) for module, _, cumulative, depth in records if depth == 0]
+    return {
+        'import_seconds': sum(self_us for _, self_us, _, _ in records) / 1e6,
+        'modules': len(records),
+        'packages': [
+            {'package': package, 'seconds': self_us / 1e6, 'modules': count}
+            for package, (self_us, count) in sorted(packages.items(), key=lambda item: -item[1][0])[:top]
+        ],
+        'top_level': [
+            {'module': module, 'seconds': cumulative / 1e6}
+            for module, cumulative in sorted(roots, key=lambda item: -item[1])[:top]
+        ]
+    }
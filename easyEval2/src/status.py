@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行状态模块
+评估过程中维护最近一段时间的吞吐量、错误率、重试率、分阶段延迟百分位和平均分，
+并通过本地HTTP服务以JSON和Prometheus文本格式提供，便于在评估运行时从其他机器观察
+"""
+
+import json
+import time
+import logging
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional
+
+from src.online_stats import QuantileSketch, RunningStats
+
+# 滚动延迟报告的分位数
+LATENCY_QUANTILES = (50, 95, 99)
+
+class _Bucket:
+    """一秒内完成的用例统计"""
+
+    __slots__ = ('second', 'completed', 'failed', 'retries', 'scores', 'latencies')
+
+    def __init__(self, second: int):
+        self.second = second
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.scores = RunningStats()
+        self.latencies: Dict[str, QuantileSketch] = {}
+
+class RunMonitor:
+    """评估运行的实时状态
+
+    每个结束的用例（成功或失败）按完成时间计入一秒一个的分桶，只保留最近 window 秒的分桶，
+    查询时合并得到滚动的吞吐量、错误率、重试率、延迟百分位和平均分；
+    整轮的计数、平均分、流水线、限流器和Token用量直接读取评估器的统计。
+    """
+
+    def __init__(self, evaluator, window: float = 60.0):
+        """初始化运行状态
+
+        Args:
+            evaluator: 评估器，提供 stats / pipeline / running_summary / usage_meter 等统计
+            window: 滚动统计的时间窗口（秒）
+        """
+        if window <= 0:
+            raise ValueError(f"滚动统计窗口必须大于0: {window}")
+        self.evaluator = evaluator
+        self.window = window
+        self._buckets: Deque[_Bucket] = deque()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """开始新一轮评估时清空滚动统计"""
+        with self._lock:
+            self.started_at = time.time()
+            self._buckets.clear()
+            self.retries = 0
+
+    def _bucket(self, now: float) -> _Bucket:
+        second = int(now)
+        if not self._buckets or self._buckets[-1].second != second:
+            self._buckets.append(_Bucket(second))
+        self._expire(now)
+        return self._buckets[-1]
+
+    def _expire(self, now: float):
+        while self._buckets and self._buckets[0].second <= now - self.window:
+            self._buckets.popleft()
+
+    def record(self, result):
+        """记录一个结束的用例，result 为 None 表示失败"""
+        with self._lock:
+            bucket = self._bucket(time.time())
+            if result is None:
+                bucket.failed += 1
+                return
+            bucket.completed += 1
+            bucket.scores.add(result.semantic_score)
+            timings = result.timings or {}
+            retries = timings.get('retries', 0)
+            bucket.retries += retries
+            self.retries += retries
+            stages = dict(timings.get('stages', {}))
+            if 'wall_time' in timings:
+                stages['total'] = timings['wall_time']
+            for stage, seconds in stages.items():
+                sketch = bucket.latencies.get(stage)
+                if sketch is None:
+                    sketch = bucket.latencies[stage] = QuantileSketch()
+                sketch.add(seconds)
+
+    def _rolling(self, now: float) -> Dict[str, Any]:
+        """合并最近 window 秒的分桶"""
+        with self._lock:
+            self._expire(now)
+            buckets = list(self._buckets)
+        completed = sum(bucket.completed for bucket in buckets)
+        failed = sum(bucket.failed for bucket in buckets)
+        retries = sum(bucket.retries for bucket in buckets)
+        scores = RunningStats()
+        latencies: Dict[str, QuantileSketch] = {}
+        for bucket in buckets:
+            scores.merge(bucket.scores)
+            for stage, sketch in bucket.latencies.items():
+                latencies.setdefault(stage, QuantileSketch()).merge(sketch)
+
+        # 运行不足一个窗口时按实际运行时间计算速率
+        span = max(min(self.window, now - self.started_at), 1.0)
+        finished = completed + failed
+        return {
+            'window_seconds': self.window,
+            'cases_per_second': round(finished / span, 3),
+            'completed': completed,
+            'failed': failed,
+            'error_rate': round(failed / finished, 4) if finished else 0.0,
+            'retries_per_case': round(retries / completed, 3) if completed else 0.0,
+            'average_score': round(scores.mean, 3) if scores.count else None,
+            'latency': {stage: {**sketch.quantiles(LATENCY_QUANTILES), 'max': round(sketch.max, 6)}
+                        for stage, sketch in sorted(latencies.items())}
+        }
+
+    def _limiters(self) -> List[Dict[str, Any]]:
+        """评估服务限流器的当前速率和被限流次数"""
+        limiter = getattr(self.evaluator.api_client, 'rate_limiter', None)
+        return [limiter.snapshot()] if limiter else []
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前运行状态"""
+        now = time.time()
+        evaluator = self.evaluator
+        with evaluator._stats_lock:
+            stats = dict(evaluator.stats)
+            scores = evaluator.running_summary.scores.overall.stats
+            average = scores.mean if scores.count else None
+        finished = stats['completed_tests'] + stats['failed_tests']
+        elapsed = now - self.started_at
+        rolling = self._rolling(now)
+        drift = None
+        if average is not None and rolling['average_score'] is not None:
+            drift = round(rolling['average_score'] - average, 3)
+        usage = evaluator.usage_meter.totals
+
+        return {
+            'timestamp': round(now, 3),
+            'elapsed_seconds': round(elapsed, 3),
+            'finished': stats['end_time'] is not None,
+            'cases': {
+                'total': stats['total_tests'] if evaluator._total_known else None,
+                'completed': stats['completed_tests'],
+                'failed': stats['failed_tests'],
+                'in_flight': len(evaluator._traces),
+                'resumed': len(evaluator._resumed_ids)
+            },
+            'throughput': round(finished / elapsed, 3) if elapsed > 0 else 0.0,
+            'error_rate': round(stats['failed_tests'] / finished, 4) if finished else 0.0,
+            'retries': self.retries,
+            'average_score': round(average, 3) if average is not None else None,
+            'score_drift': drift,
+            'rolling': rolling,
+            'pipeline': evaluator.pipeline.snapshot() if evaluator.pipeline else None,
+            'rate_limiters': self._limiters(),
+            'usage': {
+                'total_tokens': usage['total_tokens'],
+                'cost': round(usage['cost'], 6),
+                'currency': evaluator.usage_meter.currency
+            },
+            'stopped': stats.get('early_stop') or stats.get('budget_exhausted')
+        }
+
+def _labels(labels: Dict[str, Any]) -> str:
+    """Prometheus标签，值中的反斜杠、双引号和换行需要转义"""
+    if not labels:
+        return ''
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+def to_prometheus(status: Dict[str, Any], prefix: str = 'easyeval') -> str:
+    """把运行状态转换为Prometheus文本格式（0.0.4）"""
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples):
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if not samples:
+            return
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{prefix}_{name}{_labels(labels)} {value}")
+
+    cases = status['cases']
+    rolling = status['rolling']
+    metric('cases_total', 'counter', 'Cases finished in this run.',
+           [({'status': 'completed'}, cases['completed']), ({'status': 'failed'}, cases['failed'])])
+    metric('cases_expected', 'gauge', 'Cases scheduled for this run, if known.', [({}, cases['total'])])
+    metric('cases_in_flight', 'gauge', 'Cases started but not yet finished.', [({}, cases['in_flight'])])
+    metric('cases_resumed', 'gauge', 'Cases restored from a journal or baseline.', [({}, cases['resumed'])])
+    metric('retries_total', 'counter', 'Request retries in this run.', [({}, status['retries'])])
+    metric('throughput_cases_per_second', 'gauge', 'Finished cases per second.',
+           [({'window': 'run'}, status['throughput']), ({'window': f"{rolling['window_seconds']:g}s"}, rolling['cases_per_second'])])
+    metric('error_rate', 'gauge', 'Failed share of finished cases.',
+           [({'window': 'run'}, status['error_rate']), ({'window': f"{rolling['window_seconds']:g}s"}, rolling['error_rate'])])
+    metric('retries_per_case', 'gauge', 'Retries per completed case in the rolling window.',
+           [({}, rolling['retries_per_case'])])
+    metric('score_average', 'gauge', 'Average semantic score.',
+           [({'window': 'run'}, status['average_score']), ({'window': f"{rolling['window_seconds']:g}s"}, rolling['average_score'])])
+    metric('stage_latency_seconds', 'gauge', 'Rolling per-stage latency quantiles.',
+           [({'stage': stage, 'quantile': f"{q / 100:g}"}, values[f'p{q}'])
+            for stage, values in rolling['latency'].items() for q in LATENCY_QUANTILES])
+
+    pipeline = status['pipeline']
+    if pipeline:
+        metric('pipeline_busy_workers', 'gauge', 'Busy pipeline workers.',
+               [({'stage': stage}, pipeline[stage]['busy']) for stage in ('answer', 'judge')])
+        metric('pipeline_utilization', 'gauge', 'Pipeline stage utilization.',
+               [({'stage': stage}, round(pipeline[stage]['utilization'], 4)) for stage in ('answer', 'judge')])
+        metric('pipeline_queue_depth', 'gauge', 'Answers waiting for the judge stage.', [({}, pipeline['queue_depth'])])
+
+    limiters = status['rate_limiters']
+    metric('rate_limit_requests_per_second', 'gauge', 'Current adaptive request rate.',
+           [({'limiter': limiter['name']}, limiter['requests_per_second']) for limiter in limiters])
+    metric('rate_limit_throttled_total', 'counter', 'Throttled responses from upstream.',
+           [({'limiter': limiter['name']}, limiter['throttled']) for limiter in limiters])
+    metric('rate_limit_wait_seconds_total', 'counter', 'Time spent waiting for the rate limiter.',
+           [({'limiter': limiter['name']}, round(limiter['total_wait_time'], 6)) for limiter in limiters])
+
+    usage = status['usage']
+    metric('tokens_total', 'counter', 'Judge tokens used in this run.', [({}, usage['total_tokens'])])
+    metric('cost_total', 'counter', 'Estimated judge cost in this run.', [({'currency': usage['currency']}, usage['cost'])])
+    return '\n'.join(lines) + '\n'
+
+class StatusServer:
+    """运行状态的HTTP服务
+
+    接口：
+        GET /status   -> JSON格式的运行状态（见 RunMonitor.snapshot）
+        GET /metrics  -> Prometheus文本格式
+    """
+
+    def __init__(self, monitor: RunMonitor, host: str = '127.0.0.1', port: int = 9108):
+        self.logger = logging.getLogger(__name__)
+        self.monitor = monitor
+
+        status_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                status_server.logger.debug(format % args)
+
+            def _send(self, code: int, data: bytes, content_type: str):
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path in ('/', '/status'):
+                    body = json.dumps(status_server.monitor.snapshot(), ensure_ascii=False)
+                    self._send(200, body.encode('utf-8'), 'application/json')
+                elif path == '/metrics':
+                    body = to_prometheus(status_server.monitor.snapshot())
+                    self._send(200, body.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+                else:
+                    self._send(404, b'{"error": "not found"}', 'application/json')
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.address = f"http://{host}:{self.server.server_address[1]}"
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        name='status-server', daemon=True)
+        self._thread.start()
+        self.logger.info(f"运行状态服务已启动: {self.address}")
+
+    def stop(self):
+        """停止服务"""
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试集索引模块
+把测试集编译为带索引的SQLite文件，按分类、优先级、场景和ID过滤及按位置切片时直接查索引，
+无需每次扫描整个测试集；源文件变化后自动重新编译
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.sharding import shard_of
+from src.suite_loader import iter_suite
+
+# 索引格式版本，格式变化时旧索引自动重建
+INDEX_VERSION = 1
+
+# 编译时每批写入的用例数
+BUILD_BATCH_SIZE = 5000
+
+class SuiteIndex:
+    """编译后的测试集
+
+    每个用例保存为一行，position 为用例在源文件中的位置（从0开始），
+    category / priority / scenario / test_id 列上建有索引。
+    源文件的大小和修改时间记录在 meta 表中，打开时不一致则重新编译。
+    """
+
+    SCHEMA = """
+        CREATE TABLE cases (
+            position INTEGER PRIMARY KEY,
+            test_id TEXT NOT NULL,
+            category TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            scenario TEXT NOT NULL,
+            payload TEXT NOT NULL
+        );
+        CREATE TABLE meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    INDEXES = """
+        CREATE INDEX idx_cases_test_id ON cases(test_id);
+        CREATE INDEX idx_cases_category ON cases(category, position);
+        CREATE INDEX idx_cases_priority ON cases(priority, position);
+        CREATE INDEX idx_cases_scenario ON cases(scenario, position);
+    """
+
+    def __init__(self, source: str, index_dir: str):
+        """打开测试集索引，索引不存在或已过期时重新编译
+
+        Args:
+            source: 测试集源文件（JSON 或 JSONL）
+            index_dir: 索引文件存放目录
+        """
+        self.logger = logging.getLogger(__name__)
+        self.source = Path(source).resolve()
+        digest = hashlib.sha256(str(self.source).encode('utf-8')).hexdigest()[:12]
+        self.path = Path(index_dir) / f"{self.source.stem}-{digest}.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.rebuilt = False
+
+        if not self._is_fresh():
+            self._build()
+            self.rebuilt = True
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.create_function('shard_of', 2, shard_of, deterministic=True)
+
+    def _source_signature(self) -> Dict[str, str]:
+        """源文件签名：大小和修改时间"""
+        stat = self.source.stat()
+        return {
+            'version': str(INDEX_VERSION),
+            'source': str(self.source),
+            'size': str(stat.st_size),
+            'mtime_ns': str(stat.st_mtime_ns)
+        }
+
+    def _is_fresh(self) -> bool:
+        """索引是否存在且与源文件一致"""
+        if not self.path.exists():
+            return False
+        try:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            try:
+                meta = dict(conn.execute('SELECT key, value FROM meta').fetchall())
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            return False
+        signature = self._source_signature()
+        return all(meta.get(key) == value for key, value in signature.items())
+
+    def _build(self):
+        """编译索引
+
+        写入临时文件后原子替换，其他进程（如并行的分片）始终读到完整的索引。
+        """
+        signature = self._source_signature()
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.unlink(missing_ok=True)
+
+        self.logger.info(f"编译测试集索引: {self.source} -> {self.path}")
+        conn = sqlite3.connect(str(tmp_path))
+        try:
+            conn.execute('PRAGMA journal_mode=OFF')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.executescript(self.SCHEMA)
+
+            count = 0
+            batch: List[Tuple[Any, ...]] = []
+            for position, case_data in enumerate(iter_suite(self.source)):
+                # 没有ID的用例按位置生成，与 SemanticEvaluator.iter_test_cases 一致
+                case_data.setdefault('id', f"test_{position + 1}")
+                batch.append((
+                    position,
+                    case_data['id'],
+                    case_data.get('category', 'general'),
+                    case_data.get('priority', 'medium'),
+                    case_data.get('scenario', 'general'),
+                    json.dumps(case_data, ensure_ascii=False)
+                ))
+                if len(batch) >= BUILD_BATCH_SIZE:
+                    conn.executemany('INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?)', batch)
+                    count += len(batch)
+                    batch = []
+            conn.executemany('INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?)', batch)
+            count += len(batch)
+
+            conn.executescript(self.INDEXES)
+            conn.executemany('INSERT INTO meta VALUES (?, ?)', signature.items())
+            conn.commit()
+        except BaseException:
+            conn.close()
+            tmp_path.unlink(missing_ok=True)
+            raise
+        conn.close()
+
+        os.replace(tmp_path, self.path)
+        self.logger.info(f"测试集索引编译完成，共 {count} 个用例")
+
+    @staticmethod
+    def _where(category: Optional[str] = None, priority: Optional[str] = None,
+               scenario: Optional[str] = None, ids: Optional[List[str]] = None,
+               shard: Optional[Tuple[int, int]] = None) -> Tuple[str, List[Any]]:
+        """构建过滤条件"""
+        clauses, params = [], []
+        for column, value in (('category', category), ('priority', priority), ('scenario', scenario)):
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if ids:
+            clauses.append(f"test_id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        if shard:
+            index, count = shard
+            clauses.append('shard_of(test_id, ?) = ?')
+            params.extend([count, index])
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def count(self, **filters) -> int:
+        """符合过滤条件的用例数"""
+        where, params = self._where(**filters)
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM cases{where}', params).fetchone()[0]
+
+    def query(self, skip: int = 0, limit: Optional[int] = None, **filters) -> Iterator[Dict[str, Any]]:
+        """按过滤条件和切片读取用例，按源文件中的顺序返回
+
+        Args:
+            skip: 跳过前N个符合条件的用例
+            limit: 最多返回的用例数
+            **filters: category / priority / scenario / ids / shard(index, count)
+        """
+        where, params = self._where(**filters)
+        if not where:
+            # 没有过滤条件时按位置直接定位，切片与测试集大小无关
+            sql = 'SELECT payload FROM cases WHERE position >= ? ORDER BY position LIMIT ?'
+            params = [skip, -1 if limit is None else limit]
+        else:
+            sql = f'SELECT payload FROM cases{where} ORDER BY position LIMIT ? OFFSET ?'
+            params += [-1 if limit is None else limit, skip]
+
+        # 独立游标逐行读取，不会一次取出全部结果
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        try:
+            for (payload,) in cursor:
+                yield json.loads(payload)
+        finally:
+            cursor.close()
+
+    def close(self):
+        """关闭索引"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试集流式读取模块
+逐个解析测试用例记录，内存占用与测试集大小无关，第一个用例读到即可开始评估
+"""
+
+import re
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+# 每次从文件读取的字符数
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'\s*')
+_decoder = json.JSONDecoder()
+
+def iter_suite(path: str, key: str = 'test_cases') -> Iterator[Dict[str, Any]]:
+    """逐个读取测试集中的用例记录
+
+    支持三种格式：
+    - JSONL：每行一个用例，可选的首行 {"metadata": {...}} 会被跳过
+    - JSON 列表：[{...}, {...}]
+    - 包含用例列表字段的 JSON 对象：{"metadata": {...}, "test_cases": [...]}
+
+    Raises:
+        ValueError: 文件格式不正确
+    """
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        yield from _iter_jsonl(path)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _StreamReader(f)
+        first = reader.peek()
+        if first == '[':
+            yield from _iter_array(reader)
+        elif first == '{':
+            yield from _iter_object_field(reader, key)
+        else:
+            raise ValueError("测试用例文件格式不正确")
+
+def _iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    """逐行读取JSONL测试集"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"测试用例文件第 {line_no} 行格式错误: {e}")
+            if not isinstance(record, dict):
+                raise ValueError(f"测试用例文件第 {line_no} 行不是JSON对象")
+            if set(record) == {'metadata'}:
+                continue
+            yield record
+
+def _iter_object_field(reader: '_StreamReader', key: str) -> Iterator[Dict[str, Any]]:
+    """逐个读取顶层对象中 key 字段的列表元素，其他字段（如 metadata）整体跳过"""
+    reader.expect('{')
+    found = False
+    while reader.peek() != '}':
+        name = reader.value()
+        if not isinstance(name, str):
+            raise ValueError("测试用例文件格式不正确")
+        reader.expect(':')
+        if name == key and reader.peek() == '[':
+            found = True
+            yield from _iter_array(reader)
+        else:
+            reader.value()
+        if reader.peek() == ',':
+            reader.pos += 1
+    if not found:
+        raise ValueError("测试用例文件格式不正确")
+
+def _iter_array(reader: '_StreamReader') -> Iterator[Any]:
+    """逐个读取JSON列表的元素"""
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError("测试用例文件格式不正确：列表元素之间缺少逗号")
+
+class _StreamReader:
+    """分块读取文件的增量JSON解析器
+
+    缓冲区中只保留尚未解析的部分，单个值不完整时再读入下一块。
+    """
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """丢弃已解析的部分并读入下一块，文件结束时返回 False"""
+        chunk = self.f.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """跳过空白并返回下一个字符，文件结束时返回空字符串"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str):
+        """读取一个指定的结构字符"""
+        if self.peek() != char:
+            raise ValueError(f"测试用例文件格式不正确：期望 '{char}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """解析下一个完整的JSON值"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # 值恰好结束在缓冲区末尾时可能被截断（如数字），需读入更多内容确认
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f"测试用例文件不完整或格式错误: {e.msg}")
+            self._fill()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阶段耗时追踪模块
+记录每个用例在各处理阶段的耗时、重试次数、收发字节数和评估模型的Token用量，汇总为每轮评估的分阶段延迟百分位，
+并可导出OpenTelemetry兼容的JSON追踪文件
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from src.online_stats import QuantileSketch, RunningStats
+
+# 阶段名称
+STAGE_NAMES = {
+    'answer_store': '查询回答存储',
+    'easychat': 'EasyChat请求',
+    'prompt_build': '构建提示词',
+    'cache_lookup': '查询评估缓存',
+    'rate_limit_wait': '限流等待',
+    'judge_request': '评估请求',
+    'parse': '解析评估结果',
+    'total': '用例总耗时'
+}
+
+class CaseTrace:
+    """单个用例的阶段耗时记录
+
+    获取回答和语义评估可能在不同的线程中进行，但同一用例的两个阶段先后执行，
+    因此记录本身不需要加锁。
+    """
+
+    __slots__ = ('test_id', 'spans', 'retries', 'bytes_out', 'bytes_in', 'usage')
+
+    def __init__(self, test_id: str):
+        self.test_id = test_id
+        self.spans: List[Dict[str, Any]] = []
+        self.retries = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.usage: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为保存在评估结果中的字典"""
+        stages: Dict[str, float] = {}
+        for span in self.spans:
+            stages[span['name']] = stages.get(span['name'], 0.0) + span['duration']
+        wall_time = 0.0
+        if self.spans:
+            wall_time = (max(s['start'] + s['duration'] for s in self.spans)
+                         - min(s['start'] for s in self.spans))
+        return {
+            'stages': {name: round(seconds, 6) for name, seconds in stages.items()},
+            'wall_time': round(wall_time, 6),
+            'retries': self.retries,
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'spans': self.spans
+        }
+
+_local = threading.local()
+
+def _active() -> tuple:
+    return getattr(_local, 'traces', ())
+
+@contextmanager
+def activate(*traces: CaseTrace):
+    """在当前线程中把之后记录的阶段耗时归入指定用例
+
+    批量评估时一次请求同时属于多个用例，传入多个记录即可。
+    """
+    previous = _active()
+    _local.traces = traces
+    try:
+        yield
+    finally:
+        _local.traces = previous
+
+@contextmanager
+def span(name: str, **attributes):
+    """记录一个阶段的耗时，当前线程没有关联用例时不做任何记录"""
+    traces = _active()
+    if not traces:
+        yield
+        return
+
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = {
+            'name': name,
+            'start': round(start_wall, 6),
+            'duration': round(time.perf_counter() - start, 6),
+            **attributes
+        }
+        if len(traces) > 1:
+            record['batch_size'] = len(traces)
+        for trace in traces:
+            trace.spans.append(record)
+
+def record_retry():
+    """记录一次重试"""
+    for trace in _active():
+        trace.retries += 1
+
+def record_bytes(sent: int, received: int):
+    """记录一次请求的收发字节数，批量请求按用例数平摊"""
+    traces = _active()
+    for trace in traces:
+        trace.bytes_out += round(sent / len(traces))
+        trace.bytes_in += round(received / len(traces))
+
+def record_usage(usage: Optional[Dict[str, int]]):
+    """记录一次评估请求的Token用量（见 usage.extract_usage），批量请求按用例数平摊"""
+    traces = _active()
+    if not usage:
+        return
+    for trace in traces:
+        for key, value in usage.items():
+            trace.usage[key] = trace.usage.get(key, 0) + round(value / len(traces))
+
+class StageStats:
+    """每轮评估的分阶段耗时统计
+
+    各阶段的次数、平均值和最大值按全部用例精确统计，百分位由可合并的分位数草图估计
+    （相对误差不超过1%），内存占用与用例数量无关。
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, RunningStats] = {}
+        self.sketches: Dict[str, QuantileSketch] = {}
+        self.cases = 0
+        self.retries = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self._lock = threading.Lock()
+
+    def _add_sample(self, stage: str, seconds: float):
+        if stage not in self.stages:
+            self.stages[stage] = RunningStats()
+            self.sketches[stage] = QuantileSketch()
+        self.stages[stage].add(seconds)
+        self.sketches[stage].add(seconds)
+
+    def add(self, timings: Dict[str, Any]):
+        """加入一个用例的阶段耗时（CaseTrace.to_dict 的结果）"""
+        with self._lock:
+            self.cases += 1
+            for stage, seconds in timings.get('stages', {}).items():
+                self._add_sample(stage, seconds)
+            self._add_sample('total', timings.get('wall_time', 0.0))
+            self.retries += timings.get('retries', 0)
+            self.bytes_out += timings.get('bytes_out', 0)
+            self.bytes_in += timings.get('bytes_in', 0)
+
+    def merge(self, other: 'StageStats') -> 'StageStats':
+        """把另一份统计（如另一个分片的统计）合并进来"""
+        with self._lock:
+            for stage, stats in other.stages.items():
+                if stage not in self.stages:
+                    self.stages[stage] = RunningStats()
+                    self.sketches[stage] = QuantileSketch()
+                self.stages[stage].merge(stats)
+                self.sketches[stage].merge(other.sketches[stage])
+            self.cases += other.cases
+            self.retries += other.retries
+            self.bytes_out += other.bytes_out
+            self.bytes_in += other.bytes_in
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        """分阶段的次数、平均值、p50/p95/p99和最大值（秒）"""
+        with self._lock:
+            stages = {}
+            for stage, stats in self.stages.items():
+                stages[stage] = {
+                    'count': stats.count,
+                    'mean': round(stats.mean, 6),
+                    **self.sketches[stage].quantiles((50, 95, 99)),
+                    'max': round(stats.max, 6)
+                }
+            return {
+                'cases': self.cases,
+                'stages': stages,
+                'retries': self.retries,
+                'bytes_out': self.bytes_out,
+                'bytes_in': self.bytes_in
+            }
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """转换为OTLP/JSON属性值"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+class TraceExporter:
+    """导出OpenTelemetry兼容的JSON追踪
+
+    每行一个OTLP/JSON格式的 ExportTraceServiceRequest（与OpenTelemetry Collector文件导出器的格式相同），
+    每个用例为一个trace：根span为整个用例，各阶段为其子span。逐行追加写入，不在内存中保留。
+    """
+
+    def __init__(self, path: str, service_name: str = 'easyEval2'):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def export(self, test_id: str, timings: Dict[str, Any], attributes: Optional[Dict[str, Any]] = None):
+        """导出一个用例的追踪"""
+        spans = timings.get('spans', [])
+        if not spans:
+            return
+
+        trace_id = os.urandom(16).hex()
+        root_id = os.urandom(8).hex()
+        start = min(s['start'] for s in spans)
+        end = max(s['start'] + s['duration'] for s in spans)
+        otlp_spans = [{
+            'traceId': trace_id,
+            'spanId': root_id,
+            'name': 'evaluate_case',
+            'kind': 1,
+            'startTimeUnixNano': str(int(start * 1e9)),
+            'endTimeUnixNano': str(int(end * 1e9)),
+            'attributes': _otlp_attributes({
+                'test_id': test_id,
+                'retries': timings.get('retries', 0),
+                'bytes_out': timings.get('bytes_out', 0),
+                'bytes_in': timings.get('bytes_in', 0),
+                **(attributes or {})
+            })
+        }]
+        for s in spans:
+            extra = {k: v for k, v in s.items() if k not in ('name', 'start', 'duration')}
+            otlp_spans.append({
+                'traceId': trace_id,
+                'spanId': os.urandom(8).hex(),
+                'parentSpanId': root_id,
+                'name': s['name'],
+                'kind': 1,
+                'startTimeUnixNano': str(int(s['start'] * 1e9)),
+                'endTimeUnixNano': str(int((s['start'] + s['duration']) * 1e9)),
+                'attributes': _otlp_attributes(extra)
+            })
+
+        request = {
+            'resourceSpans': [{
+                'resource': {'attributes': _otlp_attributes({'service.name': self.service_name})},
+                'scopeSpans': [{
+                    'scope': {'name': 'easyEval2.semantic_eval'},
+                    'spans': otlp_spans
+                }]
+            }]
+        }
+        line = json.dumps(request, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        """关闭追踪文件"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token用量与费用统计模块
+从评估模型响应的usage中读取输入/输出/缓存命中Token数，按价格表估算费用，
+汇总到用例、场景和整轮评估，并在预算即将用尽时通知停止调度新用例
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# 默认价格表：每百万Token的价格（与 COST_CURRENCY 的币种一致）
+# input 为未命中上下文缓存的输入，cached_input 为命中缓存的输入，output 为输出
+DEFAULT_PRICES = {
+    'deepseek-chat': {'input': 2.0, 'cached_input': 0.5, 'output': 8.0},
+    'deepseek-reasoner': {'input': 2.0, 'cached_input': 0.5, 'output': 8.0}
+}
+
+USAGE_FIELDS = ('prompt_tokens', 'completion_tokens', 'cached_tokens')
+
+def extract_usage(usage: Any) -> Optional[Dict[str, int]]:
+    """读取响应中的usage
+
+    缓存命中的输入Token数兼容DeepSeek的 prompt_cache_hit_tokens
+    和OpenAI的 prompt_tokens_details.cached_tokens 两种格式。
+
+    Returns:
+        {'prompt_tokens', 'completion_tokens', 'cached_tokens'}，响应没有usage时返回 None
+    """
+    if usage is None:
+        return None
+
+    def read(obj, name):
+        value = obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+        return value or 0
+
+    cached = read(usage, 'prompt_cache_hit_tokens')
+    if not cached:
+        details = usage.get('prompt_tokens_details') if isinstance(usage, dict) else getattr(usage, 'prompt_tokens_details', None)
+        if details:
+            cached = read(details, 'cached_tokens')
+
+    return {
+        'prompt_tokens': int(read(usage, 'prompt_tokens')),
+        'completion_tokens': int(read(usage, 'completion_tokens')),
+        'cached_tokens': int(cached)
+    }
+
+def load_price_table(spec: str) -> Dict[str, Dict[str, float]]:
+    """加载价格表
+
+    Args:
+        spec: JSON字符串或JSON文件路径，格式为 {"模型名": {"input": x, "cached_input": y, "output": z}}，
+              与默认价格表合并；为空时使用默认价格表
+
+    Raises:
+        ValueError: 格式错误
+    """
+    prices = {model: dict(price) for model, price in DEFAULT_PRICES.items()}
+    if not spec:
+        return prices
+
+    text = spec
+    if not spec.lstrip().startswith('{'):
+        try:
+            text = Path(spec).read_text(encoding='utf-8')
+        except OSError as e:
+            raise ValueError(f"无法读取价格表文件 {spec}: {e}")
+    try:
+        table = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"价格表不是有效的JSON: {e}")
+    if not isinstance(table, dict):
+        raise ValueError("价格表应为 {模型名: {input, cached_input, output}} 格式的对象")
+
+    for model, price in table.items():
+        if not isinstance(price, dict):
+            raise ValueError(f"模型 {model} 的价格应为对象")
+        entry = prices.setdefault(model, {'input': 0.0, 'cached_input': 0.0, 'output': 0.0})
+        for key in ('input', 'cached_input', 'output'):
+            if key in price:
+                entry[key] = float(price[key])
+        # 未单独配置缓存命中价格时按普通输入计价
+        if 'cached_input' not in price and 'input' in price and model not in DEFAULT_PRICES:
+            entry['cached_input'] = entry['input']
+    return prices
+
+def empty_usage() -> Dict[str, Any]:
+    """空的用量记录"""
+    return {'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0, 'total_tokens': 0, 'cost': 0.0}
+
+class UsageMeter:
+    """每轮评估的Token用量与费用统计
+
+    按场景和整轮累计用量，并根据已完成用例的平均用量预估进行中的用例，
+    判断再调度一个新用例是否会超出Token或费用预算。
+    """
+
+    def __init__(self, model: Optional[str], prices: Dict[str, Dict[str, float]],
+                 currency: str = 'CNY', max_tokens: int = 0, max_cost: float = 0.0):
+        """初始化统计
+
+        Args:
+            model: 评估模型名称，用于查询价格
+            prices: 价格表，见 load_price_table
+            currency: 币种
+            max_tokens: Token预算，0表示不限制
+            max_cost: 费用预算，0表示不限制
+        """
+        self.logger = logging.getLogger(__name__)
+        self.model = model
+        self.price = prices.get(model) if model else None
+        if model and self.price is None:
+            self.logger.warning(f"价格表中没有模型 {model} 的价格，费用按0估算")
+        self.currency = currency
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+
+        self.cases = 0
+        self.totals = empty_usage()
+        self.scenarios: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def has_budget(self) -> bool:
+        """是否设置了预算"""
+        return bool(self.max_tokens or self.max_cost)
+
+    def cost(self, usage: Dict[str, int]) -> float:
+        """按价格表估算一组用量的费用"""
+        if not self.price:
+            return 0.0
+        cached = usage.get('cached_tokens', 0)
+        uncached = max(usage.get('prompt_tokens', 0) - cached, 0)
+        return (uncached * self.price['input']
+                + cached * self.price['cached_input']
+                + usage.get('completion_tokens', 0) * self.price['output']) / 1_000_000
+
+    def case_usage(self, usage: Optional[Dict[str, int]]) -> Dict[str, Any]:
+        """由单个用例累计的用量生成保存在评估结果中的记录（含估算费用）"""
+        record = empty_usage()
+        if usage:
+            for key in USAGE_FIELDS:
+                record[key] = usage.get(key, 0)
+            record['total_tokens'] = record['prompt_tokens'] + record['completion_tokens']
+            record['cost'] = round(self.cost(usage), 8)
+        return record
+
+    def add(self, record: Dict[str, Any], scenario: str):
+        """加入一个用例的用量（case_usage 的结果），评估失败的用例也计入"""
+        with self._lock:
+            self.cases += 1
+            stats = self.scenarios.setdefault(scenario, {'cases': 0, **empty_usage()})
+            stats['cases'] += 1
+            for target in (self.totals, stats):
+                for key in (*USAGE_FIELDS, 'total_tokens', 'cost'):
+                    target[key] += record.get(key, 0)
+
+    @property
+    def has_usage(self) -> bool:
+        """是否已记录到实际用量，之前无法估算每个用例的用量"""
+        return self.totals['total_tokens'] > 0
+
+    def can_schedule(self, in_flight: int) -> bool:
+        """进行中的用例数为 in_flight 时是否可以再调度一个用例
+
+        还没有实际用量时只允许一个用例进行中；之后按已完成用例的平均用量，
+        进行中的用例加上新用例预计不超出预算时才允许调度，即进行中的用例数不超过剩余预算 / 平均用量。
+        没有进行中的用例时总是允许，是否停止由 check_budget 判断。
+        """
+        if not self.has_budget or in_flight <= 0:
+            return True
+        if not self.has_usage:
+            return False
+        return self.check_budget(in_flight) is None
+
+    def check_budget(self, in_flight: int = 0) -> Optional[str]:
+        """预估再调度一个用例后是否会超出预算
+
+        进行中的用例和新用例按已完成用例的平均用量估算。
+
+        Args:
+            in_flight: 已调度但尚未完成的用例数
+
+        Returns:
+            会超出预算时返回原因，否则返回 None
+        """
+        with self._lock:
+            pending = in_flight + 1
+            average_tokens = self.totals['total_tokens'] / self.cases if self.cases else 0
+            average_cost = self.totals['cost'] / self.cases if self.cases else 0
+            projected_tokens = self.totals['total_tokens'] + average_tokens * pending
+            projected_cost = self.totals['cost'] + average_cost * pending
+
+            if self.max_tokens and (projected_tokens > self.max_tokens or self.totals['total_tokens'] >= self.max_tokens):
+                return (f"Token用量 {self.totals['total_tokens']}（预计 {projected_tokens:.0f}）"
+                        f"将超出预算 {self.max_tokens}")
+            if self.max_cost and (projected_cost > self.max_cost or self.totals['cost'] >= self.max_cost):
+                return (f"费用 {self.totals['cost']:.4f}（预计 {projected_cost:.4f}）"
+                        f"将超出预算 {self.max_cost} {self.currency}")
+            return None
+
+    @staticmethod
+    def _report(stats: Dict[str, Any]) -> Dict[str, Any]:
+        """用量记录加上输入的上下文缓存命中率"""
+        report = {key: round(value, 6) if key == 'cost' else value for key, value in stats.items()}
+        report['cache_hit_rate'] = round(stats['cached_tokens'] / stats['prompt_tokens'], 4) if stats['prompt_tokens'] else 0.0
+        return report
+
+    def summary(self) -> Dict[str, Any]:
+        """整轮和各场景的用量、费用和上下文缓存命中率"""
+        with self._lock:
+            return {
+                'model': self.model,
+                'currency': self.currency,
+                'price_per_million': dict(self.price) if self.price else None,
+                'cases': self.cases,
+                **self._report(self.totals),
+                'scenarios': {scenario: self._report(stats) for scenario, stats in self.scenarios.items()},
+                'budget': {'max_tokens': self.max_tokens, 'max_cost': self.max_cost} if self.has_budget else None
+            }
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式工作队列模块
+协调者以租约方式向多个评估worker分发测试用例，worker失联后其用例自动重新分发
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from src.http_client import PooledHTTPClient
+from src.semantic_eval import TestCase
+
+class LeaseQueue:
+    """基于SQLite的租约队列
+
+    每个测试用例是一个任务，状态为 pending / leased / done / failed。
+    worker租用任务后需在租约到期前发送心跳续约，否则任务回到 pending 状态被重新分发。
+    队列保存在SQLite文件中，协调者重启后可以从中断处继续。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            test_id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            worker TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            updated_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60, max_attempts: int = 3):
+        """初始化队列
+
+        Args:
+            path: 队列数据库文件路径，已存在时继续使用其中的任务状态
+            lease_seconds: 租约时长，超过该时间未续约的任务会被重新分发
+            max_attempts: 单个任务的最大分发次数，超过后标记为失败
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(self.SCHEMA)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, position)')
+        self._conn.commit()
+
+    def add_tasks(self, tasks: Iterable[Dict[str, Any]]) -> int:
+        """加入任务，已存在的任务（如协调者重启后）保持原状态
+
+        Returns:
+            新加入的任务数
+        """
+        now = time.time()
+        with self._lock:
+            start = self._conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+            cursor = self._conn.executemany(
+                'INSERT OR IGNORE INTO tasks (test_id, position, payload, updated_at) VALUES (?, ?, ?, ?)',
+                ((task['id'], start + i, json.dumps(task, ensure_ascii=False), now)
+                 for i, task in enumerate(tasks)))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def _expire_leases(self, now: float):
+        """回收过期租约（需在持锁状态下调用）"""
+        expired = self._conn.execute(
+            "SELECT test_id, worker, attempts FROM tasks WHERE status = 'leased' AND lease_expires < ?",
+            (now,)).fetchall()
+        for test_id, worker, attempts in expired:
+            status = 'failed' if attempts >= self.max_attempts else 'pending'
+            self._conn.execute(
+                'UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL, error = ?, updated_at = ? '
+                'WHERE test_id = ?',
+                (status, f"worker {worker} 租约过期", now, test_id))
+            self.logger.warning(f"任务 {test_id} 的租约已过期 (worker: {worker})，"
+                                f"{'已达最大分发次数，标记为失败' if status == 'failed' else '重新分发'}")
+
+    def lease(self, worker: str, count: int = 1) -> List[Dict[str, Any]]:
+        """为worker租用最多 count 个待处理任务"""
+        now = time.time()
+        with self._lock:
+            self._expire_leases(now)
+            rows = self._conn.execute(
+                "SELECT test_id, payload FROM tasks WHERE status = 'pending' ORDER BY position LIMIT ?",
+                (count,)).fetchall()
+            for test_id, _ in rows:
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE test_id = ?",
+                    (worker, now + self.lease_seconds, now, test_id))
+            self._conn.commit()
+        return [json.loads(payload) for _, payload in rows]
+
+    def heartbeat(self, worker: str, test_ids: List[str]) -> List[str]:
+        """续约worker持有的任务
+
+        Returns:
+            续约成功的任务ID；不在其中的任务已被回收，worker应放弃
+        """
+        now = time.time()
+        renewed = []
+        with self._lock:
+            for test_id in test_ids:
+                cursor = self._conn.execute(
+                    "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                    "WHERE test_id = ? AND worker = ? AND status = 'leased'",
+                    (now + self.lease_seconds, now, test_id, worker))
+                if cursor.rowcount:
+                    renewed.append(test_id)
+            self._conn.commit()
+        return renewed
+
+    def complete(self, worker: str, test_id: str, result: Optional[Dict[str, Any]] = None,
+                 error: Optional[str] = None) -> bool:
+        """提交任务结果
+
+        Args:
+            worker: 提交结果的worker
+            test_id: 任务ID
+            result: 评估结果，为 None 表示该次评估失败
+            error: 失败原因
+
+        Returns:
+            结果是否被接受（任务已完成，或失败报告来自已失去租约的worker时不接受）
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, attempts, worker FROM tasks WHERE test_id = ?', (test_id,)).fetchone()
+            if row is None or row[0] in ('done', 'failed'):
+                return False
+            if result is None and row[2] != worker:
+                return False
+
+            if result is not None:
+                # 租约过期后才返回的结果同样有效
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'done', worker = ?, lease_expires = NULL, result = ?, "
+                    "error = NULL, updated_at = ? WHERE test_id = ?",
+                    (worker, json.dumps(result, ensure_ascii=False), now, test_id))
+            else:
+                status = 'failed' if row[1] >= self.max_attempts else 'pending'
+                self._conn.execute(
+                    'UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL, error = ?, '
+                    'updated_at = ? WHERE test_id = ?',
+                    (status, error or '评估失败', now, test_id))
+            self._conn.commit()
+        return True
+
+    def progress(self) -> Dict[str, Any]:
+        """获取各状态的任务数和活跃worker"""
+        with self._lock:
+            self._expire_leases(time.time())
+            self._conn.commit()
+            counts = dict(self._conn.execute(
+                'SELECT status, COUNT(*) FROM tasks GROUP BY status').fetchall())
+            workers = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT worker FROM tasks WHERE status = 'leased'").fetchall()]
+
+        progress = {status: counts.get(status, 0) for status in ('pending', 'leased', 'done', 'failed')}
+        progress['total'] = sum(progress.values())
+        progress['finished'] = progress['pending'] == 0 and progress['leased'] == 0
+        progress['active_workers'] = workers
+        return progress
+
+    def results(self) -> List[Dict[str, Any]]:
+        """按测试用例原始顺序返回已完成任务的结果"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM tasks WHERE status = 'done' ORDER BY position").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def statistics(self) -> Dict[str, Any]:
+        """由队列中的全部任务生成运行统计（与评估器的 stats 结构一致）"""
+        results = self.results()
+        with self._lock:
+            total, start, end = self._conn.execute(
+                'SELECT COUNT(*), MIN(updated_at), MAX(updated_at) FROM tasks').fetchone()
+            workers = dict(self._conn.execute(
+                "SELECT worker, COUNT(*) FROM tasks WHERE status = 'done' GROUP BY worker").fetchall())
+
+        completed = len(results)
+        return {
+            'total_tests': total,
+            'completed_tests': completed,
+            'failed_tests': total - completed,
+            'average_score': sum(r['semantic_score'] for r in results) / completed if completed else 0.0,
+            'total_api_time': sum(r.get('api_response_time', 0.0) for r in results),
+            'start_time': min((r['timestamp'] for r in results), default=None),
+            'end_time': datetime.fromtimestamp(end).isoformat() if end else None,
+            'workers': workers
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+class CoordinatorServer:
+    """工作队列协调者的HTTP服务
+
+    接口（JSON）：
+        POST /lease      {"worker", "count"}            -> {"tasks": [...], "finished": bool}
+        POST /heartbeat  {"worker", "test_ids"}         -> {"renewed": [...]}
+        POST /complete   {"worker", "test_id", "result", "error"} -> {"accepted": bool}
+        GET  /status                                     -> 队列进度
+    """
+
+    def __init__(self, queue: LeaseQueue, host: str = '127.0.0.1', port: int = 8765):
+        self.logger = logging.getLogger(__name__)
+        self.queue = queue
+
+        coordinator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                coordinator.logger.debug(format % args)
+
+            def _send(self, code: int, body: Dict[str, Any]):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == '/status':
+                    self._send(200, coordinator.queue.progress())
+                else:
+                    self._send(404, {'error': 'not found'})
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                    reply = coordinator.handle(self.path, body)
+                except KeyError as e:
+                    self._send(400, {'error': f"缺少参数: {e}"})
+                    return
+                except (ValueError, TypeError) as e:
+                    self._send(400, {'error': str(e)})
+                    return
+                if reply is None:
+                    self._send(404, {'error': 'not found'})
+                else:
+                    self._send(200, reply)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.address = f"http://{host}:{self.server.server_address[1]}"
+        self._thread: Optional[threading.Thread] = None
+
+    def handle(self, path: str, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """处理worker请求，未知接口返回 None"""
+        if path == '/lease':
+            tasks = self.queue.lease(body['worker'], int(body.get('count', 1)))
+            return {
+                'tasks': tasks,
+                'finished': not tasks and self.queue.progress()['finished'],
+                'lease_seconds': self.queue.lease_seconds
+            }
+        if path == '/heartbeat':
+            return {'renewed': self.queue.heartbeat(body['worker'], body['test_ids'])}
+        if path == '/complete':
+            accepted = self.queue.complete(body['worker'], body['test_id'],
+                                           body.get('result'), body.get('error'))
+            return {'accepted': accepted}
+        return None
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        name='queue-coordinator', daemon=True)
+        self._thread.start()
+        self.logger.info(f"工作队列协调者已启动: {self.address}")
+
+    def stop(self):
+        """停止服务"""
+        self.server.shutdown()
+        self.server.server_close()
+
+class QueueWorker:
+    """工作队列worker
+
+    从协调者租用测试用例，调用 evaluator.evaluate_single 评估后提交结果。
+    后台线程定期为进行中的用例续约；队列为空但仍有其他worker的用例未完成时继续等待，
+    以便接手失联worker被回收的用例。
+    """
+
+    def __init__(self, evaluator, coordinator_url: str, worker_id: Optional[str] = None,
+                 concurrency: int = 1, heartbeat_interval: float = 10.0, poll_interval: float = 2.0):
+        """初始化worker
+
+        Args:
+            evaluator: 提供 evaluate_single 的评估器
+            coordinator_url: 协调者地址
+            worker_id: worker标识，默认由主机名和进程号生成
+            concurrency: 同时评估的用例数
+            heartbeat_interval: 续约间隔秒数，不超过协调者租约时长的三分之一
+            poll_interval: 队列暂时为空时的轮询间隔秒数
+        """
+        self.logger = logging.getLogger(__name__)
+        self.evaluator = evaluator
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = max(concurrency, 1)
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.http = PooledHTTPClient(coordinator_url, pool_size=self.concurrency + 1)
+
+        self._lock = threading.Lock()
+        self._in_flight: set = set()
+        self._stop = threading.Event()
+        self.stats = {
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0
+        }
+
+    def _call(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """调用协调者接口"""
+        response = self.http.post(path, json={'worker': self.worker_id, **body})
+        response.raise_for_status()
+        return response.json()
+
+    def _heartbeat_loop(self):
+        """定期为进行中的用例续约"""
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                test_ids = list(self._in_flight)
+            if not test_ids:
+                continue
+            try:
+                renewed = set(self._call('/heartbeat', {'test_ids': test_ids})['renewed'])
+                lost = set(test_ids) - renewed
+                if lost:
+                    self.logger.warning(f"用例租约已被回收: {', '.join(sorted(lost))}")
+            except requests.exceptions.RequestException as e:
+                self.logger.warning(f"续约失败: {str(e)}")
+
+    def _work_loop(self, progress_callback=None):
+        """单个评估线程：租用、评估、提交，直到队列完成"""
+        while not self._stop.is_set():
+            try:
+                reply = self._call('/lease', {'count': 1})
+            except requests.exceptions.RequestException as e:
+                self.logger.warning(f"无法从协调者租用用例: {str(e)}")
+                self._stop.wait(self.poll_interval)
+                continue
+
+            # 续约间隔跟随协调者的租约时长，保证租约到期前至少续约两次
+            self.heartbeat_interval = min(self.heartbeat_interval, reply.get('lease_seconds', 60) / 3)
+
+            if not reply['tasks']:
+                if reply['finished']:
+                    return
+                # 其他worker仍有未完成的用例，等待其完成或租约过期后接手
+                self._stop.wait(self.poll_interval)
+                continue
+
+            test_case = TestCase(**reply['tasks'][0])
+            with self._lock:
+                self._in_flight.add(test_case.id)
+            try:
+                result = self.evaluator.evaluate_single(test_case)
+            except Exception as e:
+                self.logger.error(f"评估测试用例 {test_case.id} 时发生错误: {str(e)}")
+                result = None
+
+            try:
+                accepted = self._call('/complete', {
+                    'test_id': test_case.id,
+                    'result': result.to_dict() if result else None,
+                    'error': None if result else '评估失败'
+                })['accepted']
+            except requests.exceptions.RequestException as e:
+                # 提交失败时由租约过期机制重新分发该用例
+                self.logger.error(f"提交测试用例 {test_case.id} 的结果失败: {str(e)}")
+                accepted = False
+            finally:
+                with self._lock:
+                    self._in_flight.discard(test_case.id)
+
+            with self._lock:
+                if not accepted:
+                    self.stats['rejected'] += 1
+                elif result:
+                    self.stats['completed'] += 1
+                else:
+                    self.stats['failed'] += 1
+            if progress_callback:
+                progress_callback(test_case.id, result)
+
+    def run(self, progress_callback=None) -> Dict[str, int]:
+        """运行worker直到队列中的所有用例完成
+
+        Args:
+            progress_callback: 每处理完一个用例调用 progress_callback(test_id, result)
+
+        Returns:
+            本worker的处理统计
+        """
+        self.logger.info(f"worker {self.worker_id} 连接协调者 {self.http.base_url}，并发: {self.concurrency}")
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name='queue-heartbeat', daemon=True)
+        heartbeat.start()
+
+        threads = [
+            threading.Thread(target=self._work_loop, args=(progress_callback,),
+                             name=f'queue-worker-{i}', daemon=True)
+            for i in range(self.concurrency)
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            # 以短超时轮询 join，保证主线程能及时响应 Ctrl+C
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        finally:
+            self._stop.set()
+            self.http.close()
+
+        return dict(self.stats)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基线对比测试
+
+用固定的分数序列检查配对t检验、回归判定、Bonferroni校正、提前停止和恢复结果的去重，
+不调用任何外部服务。
+
+使用方法:
+    python -m pytest test_compare.py
+"""
+
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.compare import PairedComparison
+from src.online_stats import t_pvalue, t_quantile
+
+def make_comparison(deltas, scenario='general', **kwargs):
+    """基线分数均为80，本次分数为 80 + 差异"""
+    comparison = PairedComparison({f"c{i:03d}": 80 for i in range(len(deltas))}, **kwargs)
+    for i, delta in enumerate(deltas):
+        comparison.add(f"c{i:03d}", 80 + delta, scenario)
+    return comparison
+
+@pytest.mark.parametrize('deltas, verdict', [
+    ([-5, -7] * 10, 'regression'),
+    ([1, -1] * 10, 'no_regression'),
+    ([10, -12] * 10, 'undecided')
+])
+def test_verdict_against_margin(deltas, verdict):
+    """差异均值的置信区间与允许的下降幅度比较得出判定"""
+    summary = make_comparison(deltas, margin=1.0).summary()
+    assert summary['verdict'] == verdict
+    assert summary['pairs'] == 20
+
+def test_paired_t_statistics():
+    """差异均值、置信区间、t值和p值按配对t检验计算"""
+    deltas = [-5, -7] * 10
+    overall = make_comparison(deltas).summary()['overall']
+
+    sd = math.sqrt(20 / 19)
+    half = t_quantile(0.975, 19) * sd / math.sqrt(20)
+    assert overall['mean_delta'] == -6.0
+    assert overall['ci'] == [round(-6 - half, 3), round(-6 + half, 3)]
+    assert overall['t'] == round(-6 / (sd / math.sqrt(20)), 3)
+    assert overall['p_value'] < 1e-4
+
+def test_t_pvalue_two_sided():
+    """t分布双侧p值与查表值一致"""
+    assert t_pvalue(2.0, 10) == pytest.approx(0.0734, abs=1e-4)
+    assert t_pvalue(0.0, 10) == pytest.approx(1.0)
+
+def test_groups_use_bonferroni_correction():
+    """各场景的置信区间按分组数做Bonferroni校正"""
+    comparison = make_comparison([1, -1] * 5, scenario='a')
+    for i, delta in enumerate([1, -1] * 5):
+        comparison.baseline[f"b{i:03d}"] = 80
+        comparison.add(f"b{i:03d}", 80 + delta, 'b')
+
+    scenarios = comparison.summary()['scenarios']
+    half = t_quantile(1 - 0.05 / 2 / 2, 9) * math.sqrt(10 / 9) / math.sqrt(10)
+    assert scenarios['a']['ci'] == [round(-half, 3), round(half, 3)]
+    assert scenarios['a']['ci'] == scenarios['b']['ci']
+
+def test_early_stop_waits_for_min_pairs():
+    """提前停止在配对数达到 min_pairs 之前不给出结论"""
+    comparison = PairedComparison({f"c{i:03d}": 80 for i in range(30)}, early_stop=True, min_pairs=20)
+    for i in range(30):
+        comparison.add(f"c{i:03d}", 74 if i % 2 else 72, 'general')
+        if i + 1 < 20:
+            assert comparison.check() is None
+        elif i + 1 == 20:
+            assert '判定回归' in comparison.check()
+
+def test_check_disabled_without_early_stop():
+    """未启用提前停止时 check 不返回停止原因"""
+    assert make_comparison([-5, -7] * 10).check() is None
+
+def test_duplicates_and_unmatched_cases():
+    """重复加入的用例只计一次，基线中没有的用例只计数"""
+    comparison = make_comparison([-3, 2, 0])
+    comparison.add('c000', 10, 'general')
+    comparison.add('new', 50, 'general')
+    summary = comparison.summary()
+    assert (summary['pairs'], summary['unmatched']) == (3, 1)
+    assert (summary['improved'], summary['regressed'], summary['unchanged']) == (1, 1, 1)
+    assert summary['overall']['mean_delta'] == pytest.approx(-1 / 3, abs=1e-3)
+
+def test_most_regressed_keeps_largest_drops():
+    """只保留下降最多的 top 个用例，按下降幅度排列"""
+    summary = make_comparison([-1, -9, -4, 3, -6], top=2).summary()
+    assert [item['test_id'] for item in summary['most_regressed']] == ['c001', 'c004']
+    assert make_comparison([-1, -9], top=0).summary()['most_regressed'] == []
+
+@pytest.mark.parametrize('keep_results', [True, False])
+def test_resumed_results_counted_once(keep_results):
+    """从日志恢复的用例在启用对比时计入一次（结果和分数两个来源去重）"""
+    from src.semantic_eval import EvaluationResult, SemanticEvaluator
+
+    evaluator = SemanticEvaluator(use_local_api=True, use_cache=False, answer_policy='off')
+    evaluator.keep_results = keep_results
+    for i, score in enumerate([70, 75, 90]):
+        evaluator._adopt_result(EvaluationResult(
+            test_id=f"c{i:03d}", question=f"问题 {i}", answer=f"回答 {i}", semantic_score=score,
+            evaluation_reason='', dimension_scores={}, scenario='general', timestamp='2026-01-01T00:00:00'
+        ))
+
+    comparison = PairedComparison({'c000': 80, 'c001': 80, 'c002': 80})
+    evaluator.enable_comparison(comparison)
+    summary = comparison.summary()
+    assert summary['pairs'] == 3
+    assert summary['overall']['mean_delta'] == pytest.approx(-5 / 3, abs=1e-3)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评估结果解析测试
+
+覆盖 src/judge_output.py 的容错提取、本地修复和修复请求，不调用任何外部服务。
+
+使用方法:
+    python -m pytest test_judge_output.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.judge_output import EvaluationParser, normalize_evaluation
+
+DIMENSIONS = {'relevance': 26, 'accuracy': 22, 'completeness': 17, 'usefulness': 12, 'expression': 8}
+
+def evaluation(score=85, **extra):
+    """构造一个评估结果"""
+    return {'score': score, 'reason': '回答准确完整', 'dimensions': dict(DIMENSIONS), **extra}
+
+def test_plain_json_is_parsed_without_repairs():
+    """格式正确的输出直接解析，不记录修复项"""
+    parser = EvaluationParser()
+    result = parser.parse(json.dumps(evaluation(), ensure_ascii=False))
+    assert result == {'score': 85, 'reason': '回答准确完整', 'dimensions': DIMENSIONS}
+    assert parser.stats['parsed'] == 1
+
+def test_fenced_json_with_prose_and_trailing_comma():
+    """代码块包裹、前后有说明文字和尾随逗号时仍能提取"""
+    content = "评估如下：\n```json\n{\"score\": 85, \"reason\": \"好\",}\n```\n以上。"
+    result = EvaluationParser().parse(content)
+    assert result['score'] == 85
+    assert result['reason'] == '好'
+
+def test_prose_around_bare_json():
+    """说明文字中间的JSON对象可以提取"""
+    content = '根据评估标准，结果为 {"score": 70, "reason": "一般"} 供参考'
+    assert EvaluationParser().parse(content)['score'] == 70
+
+def test_chinese_dimension_names_and_string_scores():
+    """中文维度名和字符串分数在本地修复"""
+    data = {'score': '85分', 'reason': '好', 'dimensions': {
+        '相关性': '26', '准确性': 22, '完整性': 17, '有用性': 12, '表达质量': 8}}
+    result, repairs = normalize_evaluation(data)
+    assert result['score'] == 85
+    assert result['dimensions'] == DIMENSIONS
+    assert repairs == ['score_coerced']
+
+def test_nested_evaluation_object_is_unwrapped():
+    """包在 evaluation 字段中的结果被取出"""
+    result, repairs = normalize_evaluation({'evaluation': evaluation()})
+    assert result['score'] == 85
+    assert repairs == ['unwrapped']
+
+def test_dimension_sum_overrides_mismatched_score():
+    """维度之和与总分相差超过1分时以维度之和为准"""
+    result, repairs = normalize_evaluation(evaluation(score=60))
+    assert result['score'] == 85
+    assert 'score_from_dimensions' in repairs
+
+def test_missing_score_uses_dimension_sum():
+    """没有总分时以维度之和作为总分"""
+    data = evaluation()
+    del data['score']
+    result, repairs = normalize_evaluation(data)
+    assert result['score'] == 85
+    assert 'score_from_dimensions' in repairs
+
+def test_dimension_off_by_one_is_clamped_and_score_kept():
+    """单个维度超出满分1分时截断到满分，不把所有维度当作百分制折算"""
+    data = {'score': 88, 'reason': '好', 'dimensions': {
+        'relevance': 31, 'accuracy': 22, 'completeness': 18, 'usefulness': 12, 'expression': 5}}
+    result, repairs = normalize_evaluation(data)
+    assert result['score'] == 88
+    assert result['dimensions']['relevance'] == 30
+    assert repairs == ['dimensions_clamped']
+
+def test_percentage_dimensions_are_rescaled():
+    """维度按百分制给分（均值与总分相符）时按权重折算"""
+    data = {'score': 80, 'reason': '好', 'dimensions': {
+        'relevance': 80, 'accuracy': 84, 'completeness': 75, 'usefulness': 80, 'expression': 80}}
+    result, repairs = normalize_evaluation(data)
+    assert result['dimensions'] == {'relevance': 24, 'accuracy': 21, 'completeness': 15, 'usefulness': 12, 'expression': 8}
+    assert result['score'] == 80
+    assert repairs == ['dimensions_rescaled']
+
+def test_unusable_dimensions_are_dropped_and_score_kept():
+    """维度超出满分较多且不是百分制时丢弃维度，保留总分"""
+    data = {'score': 60, 'reason': '好', 'dimensions': {
+        'relevance': 50, 'accuracy': 22, 'completeness': 18, 'usefulness': 12, 'expression': 5}}
+    result, repairs = normalize_evaluation(data)
+    assert result == {'score': 60, 'reason': '好'}
+    assert repairs == ['dimensions_dropped']
+
+def test_incomplete_dimensions_are_dropped():
+    """维度不完整时丢弃维度，保留总分"""
+    data = evaluation()
+    del data['dimensions']['expression']
+    result, repairs = normalize_evaluation(data)
+    assert result['score'] == 85
+    assert 'dimensions' not in result
+    assert repairs == ['dimensions_dropped']
+
+def test_out_of_range_score_is_rejected():
+    """总分超出0-100时不接受"""
+    assert normalize_evaluation({'score': 120, 'reason': '好'})[0] is None
+
+def test_repair_request_is_last_resort():
+    """只有本地无法得到分数时才发送修复请求"""
+    calls = []
+
+    def repair(content):
+        calls.append(content)
+        return '{"score": 75, "reason": "整理后"}'
+
+    parser = EvaluationParser(repair)
+    assert parser.parse('{"score": 90, "reason": "好"}')['score'] == 90
+    assert calls == []
+
+    result = parser.parse('评分：七十五，理由：整理后')
+    assert result['score'] == 75
+    assert result['repairs'] == ['repair_request']
+    assert result['raw_response'] == '评分：七十五，理由：整理后'
+    assert len(calls) == 1
+    assert parser.stats['repair_requests'] == 1
+
+def test_unparseable_output_never_invents_a_score():
+    """修复请求也失败时返回 None，不编造分数"""
+    parser = EvaluationParser(lambda content: '仍然无法整理')
+    assert parser.parse('没有分数') is None
+    assert parser.stats['failed'] == 1
+
+def test_batch_items_follow_their_index():
+    """批量结果按编号对应问答对"""
+    content = json.dumps([{'index': 2, 'score': 60, 'reason': 'b'}, {'index': 1, 'score': 90, 'reason': 'a'}])
+    parsed = EvaluationParser().parse_batch(content, 2)
+    assert parsed[0]['score'] == 90
+    assert parsed[1]['score'] == 60
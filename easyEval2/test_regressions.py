@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回归测试
+
+覆盖分片合并、预算停止和提前停止统计等曾经出错的场景，不调用任何外部服务。
+
+使用方法:
+    python -m pytest test_regressions.py
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+def make_record(test_id, score, scenario='general'):
+    """构造一条评估结果记录"""
+    return {
+        'test_id': test_id,
+        'question': f"问题 {test_id}",
+        'answer': f"回答 {test_id}",
+        'semantic_score': score,
+        'evaluation_reason': '',
+        'dimension_scores': {},
+        'scenario': scenario,
+        'timestamp': '2026-01-01T00:00:00'
+    }
+
+def write_shard(path, shard, records, answer_store):
+    """写入一个分片的JSON报告"""
+    report = {
+        'metadata': {
+            'statistics': {
+                'total_tests': len(records),
+                'completed_tests': len(records),
+                'failed_tests': 0,
+                'shard': shard,
+                'answer_store': answer_store
+            }
+        },
+        'results': records
+    }
+    path.write_text(json.dumps(report, ensure_ascii=False), encoding='utf-8')
+
+def test_merge_keeps_answer_store_labels(tmp_path):
+    """合并启用回答复用的分片时保留策略和版本，报告和摘要都能生成"""
+    from src.sharding import merge_shard_results
+    import main
+
+    shards = [tmp_path / 'shard_0.json', tmp_path / 'shard_1.json']
+    write_shard(shards[0], '0/2', [make_record('a', 80), make_record('b', 70)],
+                {'policy': 'reuse', 'version': 'v1', 'hits': 1, 'misses': 1})
+    write_shard(shards[1], '1/2', [make_record('c', 90)],
+                {'policy': 'reuse', 'version': 'v1', 'hits': 0, 'misses': 1})
+
+    statistics, records = merge_shard_results([str(path) for path in shards])
+    assert statistics['answer_store'] == {'policy': 'reuse', 'version': 'v1', 'hits': 1, 'misses': 2}
+    assert len(records) == 3
+
+    output = tmp_path / 'merged.json'
+    main.run_merge(argparse.Namespace(inputs=[str(path) for path in shards], output=str(output), no_summary=False))
+    assert output.exists()
+    assert '回答复用' in (tmp_path / 'merged.md').read_text(encoding='utf-8')
+
+def make_evaluator():
+    """创建不发送任何请求的评估器"""
+    from src.semantic_eval import SemanticEvaluator
+    return SemanticEvaluator(use_local_api=True, use_cache=False, answer_policy='off')
+
+def fake_stages(evaluator, monkeypatch, tokens_per_case=350, delay=0.01):
+    """把回答获取和评估替换为本地实现，每个评估的用例记录固定的Token用量"""
+    import time
+    from config.config import config
+    from src.semantic_eval import EvaluationResult
+
+    def fetch_answer(test_case):
+        time.sleep(delay)
+        return f"回答 {test_case.id}"
+
+    def judge_answer(test_case, answer):
+        time.sleep(delay)
+        usage = {'prompt_tokens': tokens_per_case - 50, 'completion_tokens': 50, 'cached_tokens': 0}
+        evaluator.usage_meter.add(evaluator.usage_meter.case_usage(usage), test_case.scenario)
+        record = make_record(test_case.id, 80, test_case.scenario)
+        record['answer'] = answer
+        return EvaluationResult(**record)
+
+    monkeypatch.setattr(config.http, 'prewarm', False)
+    monkeypatch.setattr(evaluator, 'fetch_answer', fetch_answer)
+    monkeypatch.setattr(evaluator, 'judge_answer', judge_answer)
+
+def make_cases(count):
+    """构造 count 个测试用例"""
+    from src.semantic_eval import TestCase
+    return [TestCase(id=f"c{i:03d}", question=f"问题 {i}") for i in range(count)]
+
+def test_budget_limits_in_flight_cases(monkeypatch):
+    """并发评估时预算在第一个用例完成前就生效，Token用量不超出预算"""
+    evaluator = make_evaluator()
+    fake_stages(evaluator, monkeypatch)
+    evaluator.set_budget(max_tokens=2000)
+
+    evaluator.evaluate_batch(make_cases(100), concurrency=16)
+
+    assert evaluator.usage_meter.totals['total_tokens'] <= 2000
+    assert evaluator.stats['completed_tests'] == 5
+    assert 'budget_exhausted' in evaluator.stats
+
+def test_early_stop_counts_only_evaluated_cases(monkeypatch):
+    """提前停止后总数按实际评估的用例数统计，成功率不受未调度的用例影响"""
+    from src.sequential import SequentialMonitor
+
+    evaluator = make_evaluator()
+    fake_stages(evaluator, monkeypatch, delay=0)
+    evaluator.enable_sequential(SequentialMonitor({'general': 200}, half_width=1.0, min_cases=10, seed=0))
+
+    evaluator.evaluate_batch(make_cases(200), concurrency=1)
+
+    stats = evaluator.stats
+    assert 'early_stop' in stats
+    assert stats['failed_tests'] == 0
+    assert stats['total_tests'] == stats['completed_tests'] < 200
+    assert stats['not_scheduled'] == 200 - stats['completed_tests']
+    assert evaluator.get_summary()['performance_metrics']['success_rate'] == 100.0
+
+def test_incremental_refetches_answers_after_easychat_change():
+    """EasyChat版本与基线不同时不沿用基线中的回答，所有用例重新获取回答"""
+    evaluator = make_evaluator()
+    evaluator._easychat_version = 'v2'
+    cases = make_cases(3)
+    records = [{**make_record(tc.id, 80), 'question': tc.question, 'fingerprint': 'x'} for tc in cases]
+
+    evaluator.set_baseline(records, {'answer_store': {'policy': 'reuse', 'version': 'v1', 'hits': 0, 'misses': 3}})
+    assert [tc.id for tc in evaluator.plan_incremental(cases)] == [tc.id for tc in cases]
+    assert not evaluator._baseline_answers
+
+    evaluator.set_baseline(records, {'easychat_version': 'v2'})
+    list(evaluator.plan_incremental(cases))
+    assert set(evaluator._baseline_answers) == {tc.id for tc in cases}
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分层抽样测试
+
+覆盖样本量分配和整个测试集的分层估计，不调用任何外部服务。
+
+使用方法:
+    python -m pytest test_sampling.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.sampling import StratifiedSample, allocate
+from src import semantic_eval
+
+def make_suite(populations):
+    """按 {分类: 用例数} 构造测试集"""
+    return [semantic_eval.TestCase(id=f"{category}{i:04d}", question=f"问题 {i}", category=category)
+            for category, count in populations.items() for i in range(count)]
+
+def test_allocate_gives_every_stratum_two_cases():
+    """每层先分配2个用例，其余按层大小比例分配"""
+    allocation = allocate({'a': 1000, 'b': 500, 'c': 30, 'd': 20, 'e': 10, 'f': 5}, 30)
+    assert sum(allocation.values()) == 30
+    assert all(count >= 2 for count in allocation.values())
+    assert allocation['a'] > allocation['b'] > allocation['c']
+
+def test_allocate_small_strata_take_all_cases():
+    """层内用例不足2个时取全部，超出层大小的部分分配给其他层"""
+    allocation = allocate({'a': 100, 'b': 1, 'c': 3}, 10)
+    assert allocation['b'] == 1
+    assert allocation['c'] <= 3
+    assert sum(allocation.values()) == 10
+
+def test_allocate_neyman_favours_spread_strata():
+    """Neyman分配时分数波动大的层分到更多用例：每层2个之外的16个按 1:9 分配"""
+    allocation = allocate({'a': 100, 'b': 100}, 20, spreads={'a': 1.0, 'b': 9.0})
+    assert allocation == {'a': 4, 'b': 16}
+
+def test_allocate_rejects_size_below_two_per_stratum():
+    """样本量小于层数的2倍时报错，不会让部分层没有样本"""
+    with pytest.raises(ValueError, match='减少 --stratify'):
+        allocate({'a': 1000, 'b': 500, 'c': 30, 'd': 20, 'e': 10, 'f': 5}, 10)
+
+def test_draw_rejects_size_below_two_per_stratum():
+    """抽样时样本量不足同样报错"""
+    sample = StratifiedSample(5, ('category',), seed=0)
+    with pytest.raises(ValueError):
+        sample.draw(lambda: iter(make_suite({'a': 10, 'b': 10, 'c': 10})))
+
+def test_overall_weights_strata_by_population():
+    """整体平均分按层大小加权，置信区间按层内方差和有限总体校正计算"""
+    sample = StratifiedSample(20, ('category',), seed=0)
+    cases = sample.draw(lambda: iter(make_suite({'a': 100, 'b': 100})))
+    assert sample.quotas == {'a': 10, 'b': 10}
+
+    a_cases = [test_case for test_case in cases if test_case.category == 'a']
+    for i, test_case in enumerate(a_cases):
+        sample.add(test_case.id, 70 if i % 2 else 90)
+    for test_case in cases:
+        if test_case.category == 'b':
+            sample.add(test_case.id, 60)
+
+    # 层a方差 1000/9，方差项 0.5² × (1-10/100) × (1000/9)/10 = 2.5，层b方差为0，自由度为9
+    overall = sample.summary()['overall']
+    assert overall['mean'] == 70.0
+    assert overall['df'] == 9.0
+    assert overall['ci_half_width'] == pytest.approx(2.262 * 2.5 ** 0.5, abs=0.01)
+
+def test_overall_unknown_until_every_stratum_is_scored():
+    """有层还没有评估结果时不给出整体估计"""
+    sample = StratifiedSample(4, ('category',), seed=0)
+    cases = sample.draw(lambda: iter(make_suite({'a': 10, 'b': 10})))
+    for test_case in cases:
+        if test_case.category == 'a':
+            sample.add(test_case.id, 80)
+    assert sample.summary()['overall'] == {'mean': None, 'ci_half_width': None}
+
+def test_overall_exact_when_strata_fully_evaluated():
+    """每层都评估完时整体平均分没有抽样误差"""
+    sample = StratifiedSample(4, ('category',), seed=0)
+    cases = sample.draw(lambda: iter(make_suite({'a': 2, 'b': 2})))
+    for test_case, score in zip(cases, (80, 90, 60, 70)):
+        sample.add(test_case.id, score)
+    assert sample.summary()['overall'] == {'mean': 75.0, 'ci_half_width': 0.0}
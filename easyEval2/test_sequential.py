@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+顺序评估停止规则测试
+
+用固定的分数序列检查置信区间、有限总体校正、及格判定和最少用例数，不调用任何外部服务。
+
+使用方法:
+    python -m pytest test_sequential.py
+"""
+
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.online_stats import t_quantile
+from src.sequential import SequentialMonitor
+
+# 平均分80，样本方差 1000/9
+ALTERNATING = [70, 90] * 5
+
+def feed(monitor, scenario, scores):
+    """依次加入分数，返回第一次可以停止时已加入的分数个数"""
+    for count, score in enumerate(scores, 1):
+        monitor.add(scenario, score)
+        if monitor.check():
+            return count
+    return None
+
+def test_interval_uses_finite_population_correction():
+    """场景置信区间按 (1 - n/N) 做有限总体校正"""
+    monitor = SequentialMonitor({'general': 20}, half_width=None, threshold=50, min_cases=100)
+    feed(monitor, 'general', ALTERNATING)
+
+    scenario = monitor.summary()['scenarios']['general']
+    expected = t_quantile(0.975, 9) * math.sqrt(1000 / 9 / 10 * (1 - 10 / 20))
+    assert scenario['mean'] == 80.0
+    assert scenario['ci_half_width'] == pytest.approx(expected, abs=1e-3)
+
+def test_fully_evaluated_scenario_has_no_sampling_error():
+    """场景用例全部评估完时置信区间半宽为0"""
+    monitor = SequentialMonitor({'general': 10}, half_width=1.0, min_cases=2)
+    assert feed(monitor, 'general', ALTERNATING) == 10
+    assert monitor.summary()['scenarios']['general']['ci_half_width'] == 0.0
+
+def test_waits_for_min_cases():
+    """分数完全相同时半宽为0，仍要评估满 min_cases 个用例才停止"""
+    monitor = SequentialMonitor({'general': 1000}, half_width=1.0, min_cases=15)
+    assert feed(monitor, 'general', [80] * 50) == 15
+
+def test_waits_for_every_scenario():
+    """有场景还没有评估够时不停止"""
+    monitor = SequentialMonitor({'a': 100, 'b': 100}, half_width=1.0, min_cases=5)
+    assert feed(monitor, 'a', [80] * 20) is None
+    assert feed(monitor, 'b', [80] * 5) == 5
+
+@pytest.mark.parametrize('scores, decision', [([90, 92] * 10, 'pass'), ([40, 42] * 10, 'fail')])
+def test_threshold_decision(scores, decision):
+    """整体置信区间完全高于或低于及格线时停止并给出判定"""
+    monitor = SequentialMonitor({'general': 1000}, half_width=None, threshold=60, min_cases=10)
+    assert feed(monitor, 'general', scores) == 10
+    assert monitor.summary()['overall']['decision'] == decision
+    assert ('判定通过' if decision == 'pass' else '判定不通过') in monitor.stop_reason
+
+def test_threshold_undecided_while_interval_straddles():
+    """置信区间包含及格线时继续评估"""
+    monitor = SequentialMonitor({'general': 1000}, half_width=None, threshold=80, min_cases=10)
+    assert feed(monitor, 'general', ALTERNATING * 3) is None
+    assert monitor.summary()['overall']['decision'] == 'undecided'
+
+def test_overall_weights_scenarios_by_total():
+    """整体平均分按场景用例总数加权"""
+    monitor = SequentialMonitor({'a': 300, 'b': 100}, half_width=None, threshold=0, min_cases=2)
+    feed(monitor, 'a', [80, 80])
+    feed(monitor, 'b', [40, 40])
+    assert monitor.summary()['overall']['mean'] == 70.0
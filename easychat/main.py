@@ -14,6 +14,7 @@ EasyChat 2.0 - 基于 DeepSeek API 的流式问答程序
 
 import os
 import sys
+import hashlib
 import argparse
 import logging
 from datetime import datetime
@@ -74,18 +75,22 @@ def create_client(api_key, base_url):
     )
 
 
-def get_chat_response(client, message, system_prompt):
+def get_chat_response(client, message, system_prompt, messages=None):
     """
     获取单次聊天响应（非流式，用于API模式）
+    
+    messages 为调用方提供的完整消息列表（如评估端的评估提示词），提供时按原样发送，
+    不使用服务端的系统提示词。返回 (回答内容, Token用量)。
     """
     logger = logging.getLogger(__name__)
     logger.info(f"收到聊天请求，消息长度: {len(message)}")
     
     try:
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": message}
-        ]
+        if messages is None:
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": message}
+            ]
         
         response = client.chat.completions.create(
             model="deepseek-chat",
@@ -97,7 +102,8 @@ def get_chat_response(client, message, system_prompt):
         
         result = response.choices[0].message.content
         logger.info(f"API调用成功，响应长度: {len(result)}")
-        return result
+        usage = response.usage.model_dump() if getattr(response, 'usage', None) else None
+        return result, usage
     
     except Exception as e:
         logger.error(f"API调用失败: {str(e)}")
@@ -143,10 +149,14 @@ def create_flask_app():
     system_prompt = load_system_prompt()
     client = create_client(api_key, base_url)
     
+    # 服务版本标识：系统提示词和模型变化时随之变化，供评估端判断回答是否可复用
+    version = hashlib.sha256(f"deepseek-chat\n{system_prompt}".encode('utf-8')).hexdigest()[:16]
+    
     @app.route('/health', methods=['GET'])
     def health_check():
         """健康检查端点"""
-        return jsonify({"status": "ok"})
+        # features: messages 表示 /chat 接受完整的消息列表
+        return jsonify({"status": "ok", "version": version, "features": ["messages"]})
     
     @app.route('/chat', methods=['POST'])
     def chat():
@@ -166,10 +176,19 @@ def create_flask_app():
                 logger.warning("请求message为空")
                 return jsonify({"error": "message不能为空"}), 400
             
+            # 可选的完整消息列表
+            messages = data.get('messages')
+            if messages is not None and not (
+                    isinstance(messages, list) and messages and all(
+                        isinstance(m, dict) and m.get('role') in ('system', 'user', 'assistant')
+                        and isinstance(m.get('content'), str) for m in messages)):
+                logger.warning("请求messages格式错误")
+                return jsonify({"error": "messages应为包含role和content的消息列表"}), 400
+            
             # 获取AI响应
-            response = get_chat_response(client, message, system_prompt)
+            response, usage = get_chat_response(client, message, system_prompt, messages)
             logger.info("聊天请求处理成功")
-            return jsonify({"response": response})
+            return jsonify({"response": response, "usage": usage})
             
         except Exception as e:
             logger.error(f"聊天请求处理失败: {str(e)}")